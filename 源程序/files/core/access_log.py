@@ -0,0 +1,218 @@
+##########################################
+#            访问日志写入模块
+#             作者：李嘉
+#           学号：3123009043
+#          班级：23人工智能1班
+#         指导教师：苏畅、李剑锋
+###########################################
+"""
+追加式访问日志
+记录先放入内存中的有界缓冲区（文件操作只做一次追加），后台线程定时或攒够一批后
+以 JSON Lines 格式追加到日志段文件；日志段超过大小或时长后轮换，只保留最近的若干段。
+fsync 策略：none（交给操作系统）、batch（每批写入后）、rotate（关闭日志段时）
+"""
+
+import os
+import json
+import time
+import atexit
+import datetime
+import threading
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# (时间戳, 文件路径, 操作, 用户名, 是否成功)
+LogEntry = Tuple[float, str, str, str, bool]
+
+FSYNC_POLICIES = ('none', 'batch', 'rotate')
+
+
+def entry_to_dict(entry: LogEntry) -> Dict:
+    """转换为 system_log.json 中的记录格式"""
+    timestamp, file_path, operation, username, success = entry
+    return {
+        'timestamp': datetime.datetime.fromtimestamp(timestamp).isoformat(),
+        'file_path': file_path,
+        'operation': operation,
+        'username': username,
+        'success': success
+    }
+
+
+class AccessLogWriter:
+    """缓冲 + 后台批量写入 + 按大小/时长轮换的访问日志"""
+
+    SEGMENT_PREFIX = 'access-'
+    SEGMENT_SUFFIX = '.jsonl'
+
+    def __init__(self, directory: str, flush_interval: float = 1.0, batch_size: int = 256,
+                 max_buffer: int = 10000, segment_max_bytes: int = 4 * 1024 * 1024,
+                 segment_max_age: float = 24 * 3600, max_segments: int = 30, fsync: str = 'batch'):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_age = segment_max_age
+        self.max_segments = max_segments
+        if fsync not in FSYNC_POLICIES:
+            print(f"未知的 fsync 策略 {fsync}，使用 batch")
+            fsync = 'batch'
+        self.fsync = fsync
+
+        self._buffer: deque = deque()
+        self._write_lock = threading.Lock()
+        self._fp = None
+        self._segment_path: Optional[str] = None
+        self._segment_size = 0
+        self._segment_opened = 0.0
+
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+        # 统计信息
+        self.written = 0
+        self.dropped = 0  # 缓冲区满且写盘失败时丢弃的记录数
+        self.flush_count = 0
+
+    def start(self):
+        """启动后台写入线程，并保证进程退出时写出缓冲区"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='access-log-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+        with self._write_lock:
+            self._close_segment()
+
+    def append(self, entry: LogEntry):
+        """追加一条记录（只放入缓冲区，不做格式化和文件操作）"""
+        buffer = self._buffer
+        if len(buffer) >= self.max_buffer:
+            # 缓冲区已满：由调用线程直接写盘（背压），内存有上限且记录不丢失，写盘失败时才丢弃最旧的记录
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"写入访问日志失败: {e}")
+                buffer.popleft()
+                self.dropped += 1
+        buffer.append(entry)
+        if len(buffer) == self.batch_size:
+            self._wake.set()
+
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def _run(self):
+        while not self._stopped:
+            if self._wake.wait(self.flush_interval):
+                self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"写入访问日志失败: {e}")
+
+    def flush(self) -> int:
+        """把缓冲区中的记录写入当前日志段，返回写入的记录数"""
+        with self._write_lock:
+            buffer = self._buffer
+            entries = []
+            while buffer:
+                entries.append(buffer.popleft())
+            if not entries:
+                return 0
+            data = ''.join(json.dumps(entry_to_dict(entry), ensure_ascii=False, separators=(',', ':')) + '\n'
+                           for entry in entries).encode('utf-8')
+            fp = self._current_segment()
+            fp.write(data)
+            fp.flush()
+            if self.fsync == 'batch':
+                os.fsync(fp.fileno())
+            self._segment_size += len(data)
+            self.written += len(entries)
+            self.flush_count += 1
+            return len(entries)
+
+    def _current_segment(self):
+        now = time.time()
+        if self._fp is not None and (self._segment_size >= self.segment_max_bytes
+                                     or now - self._segment_opened >= self.segment_max_age):
+            self._close_segment()
+        if self._fp is None:
+            os.makedirs(self.directory, exist_ok=True)
+            name = datetime.datetime.fromtimestamp(now).strftime('%Y%m%d-%H%M%S-%f')
+            self._segment_path = os.path.join(self.directory, self.SEGMENT_PREFIX + name + self.SEGMENT_SUFFIX)
+            self._fp = open(self._segment_path, 'ab')
+            self._segment_size = self._fp.tell()
+            self._segment_opened = now
+            self._prune_segments()
+        return self._fp
+
+    def _close_segment(self):
+        if self._fp is None:
+            return
+        if self.fsync != 'none':
+            self._fp.flush()
+            os.fsync(self._fp.fileno())
+        self._fp.close()
+        self._fp = None
+        self._segment_path = None
+
+    def _prune_segments(self):
+        """只保留最近的 max_segments 个日志段"""
+        segments = self.segments()
+        for path in segments[:-self.max_segments] if self.max_segments > 0 else []:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"删除旧访问日志失败: {e}")
+
+    def segments(self) -> List[str]:
+        """按时间顺序排列的日志段文件（文件名中的时间保证字典序即时间序）"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                      if name.startswith(self.SEGMENT_PREFIX) and name.endswith(self.SEGMENT_SUFFIX))
+
+    def read_entries(self) -> Iterator[Dict]:
+        """按时间顺序读出已写入日志段的记录（末尾写了一半的行忽略）"""
+        self.flush()
+        for path in self.segments():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            yield json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+            except OSError as e:
+                print(f"读取访问日志失败: {e}")
+
+    def remove_segments_before(self, cutoff: float):
+        """删除最后修改时间早于 cutoff（时间戳）的日志段，当前正在写入的日志段除外"""
+        with self._write_lock:
+            for path in self.segments():
+                if path == self._segment_path:
+                    continue
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError as e:
+                    print(f"删除旧访问日志失败: {e}")
+
+    def stats(self) -> Dict:
+        return {
+            'written': self.written,
+            'pending': self.pending(),
+            'dropped': self.dropped,
+            'flushes': self.flush_count,
+            'segments': len(self.segments()),
+        }
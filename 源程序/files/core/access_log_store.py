@@ -0,0 +1,225 @@
+##########################################
+#            访问日志存储模块
+#             作者：李嘉
+#           学号：3123009043
+#          班级：23人工智能1班
+#         指导教师：苏畅、李剑锋
+###########################################
+"""
+按列存放的内存访问日志
+每条记录拆成并行的定长数组（浮点时间戳、操作编号、用户编号、路径编号、成功位），
+用户名、路径和操作名只保存一份（字符串驻留），数组按固定条数分块，超出上限时整块丢弃最旧的记录。
+每条记录约占 17 字节，而原来的字典记录（含 ISO 时间字符串）每条要数百字节。
+查询先按块的时间范围跳过整块，块内用二分查找定位时间范围，用户和路径按整数编号比较
+"""
+
+import bisect
+import datetime
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .access_log import LogEntry, entry_to_dict
+
+
+class _Interner:
+    """字符串 <-> 整数编号"""
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+    def intern(self, value: str) -> int:
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(value)
+            self._ids[value] = string_id
+        return string_id
+
+    def lookup(self, value: str) -> Optional[int]:
+        return self._ids.get(value)
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+class _Chunk:
+    """一块记录的各列"""
+
+    __slots__ = ('timestamps', 'operations', 'users', 'paths', 'success', 'ordered')
+
+    def __init__(self):
+        self.timestamps = array('d')
+        self.operations = array('B')
+        self.users = array('I')
+        self.paths = array('I')
+        self.success = bytearray()  # 按位存放，每字节8条
+        self.ordered = True         # 时间戳是否非递减（导入乱序的旧日志时为False，查询时逐条比较）
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def append(self, timestamp: float, operation_id: int, user_id: int, path_id: int, success: bool):
+        index = len(self.timestamps)
+        if index and timestamp < self.timestamps[-1]:
+            self.ordered = False
+        self.timestamps.append(timestamp)
+        self.operations.append(operation_id)
+        self.users.append(user_id)
+        self.paths.append(path_id)
+        if index % 8 == 0:
+            self.success.append(0)
+        if success:
+            self.success[index >> 3] |= 1 << (index & 7)
+
+    def succeeded(self, index: int) -> bool:
+        return bool(self.success[index >> 3] & (1 << (index & 7)))
+
+    def time_range(self, start: Optional[float], end: Optional[float]) -> range:
+        """块内时间戳落在 [start, end) 的下标范围（只在 ordered 时有效）"""
+        low = 0 if start is None else bisect.bisect_left(self.timestamps, start)
+        high = len(self.timestamps) if end is None else bisect.bisect_left(self.timestamps, end)
+        return range(low, high)
+
+    def nbytes(self) -> int:
+        return sum(column.itemsize * len(column) for column in
+                   (self.timestamps, self.operations, self.users, self.paths)) + len(self.success)
+
+
+class AccessLogStore:
+    """按列存放、分块的访问日志，保留最近的 max_entries 条（整块丢弃，最多多出一块）"""
+
+    MAX_OPERATIONS = 256  # 操作编号用一个字节保存
+
+    def __init__(self, max_entries: int = 100000, chunk_size: int = 4096):
+        self.chunk_size = chunk_size
+        self.max_entries = max_entries
+        self._chunks: List[_Chunk] = []
+        self._count = 0
+        self._operations = _Interner()
+        self._users = _Interner()
+        self._paths = _Interner()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, timestamp: float, file_path: str, operation: str, username: str, success: bool = True):
+        operation_id = self._operations.intern(operation)
+        if operation_id >= self.MAX_OPERATIONS:
+            raise ValueError(f"操作类型过多: {operation}")
+        if not self._chunks or len(self._chunks[-1]) >= self.chunk_size:
+            if self._chunks and self._count - len(self._chunks[0]) >= self.max_entries:
+                # 丢弃最旧的一块后仍有 max_entries 条
+                self._count -= len(self._chunks.pop(0))
+            self._chunks.append(_Chunk())
+        self._chunks[-1].append(timestamp, operation_id, self._users.intern(username or ''),
+                                self._paths.intern(file_path), bool(success))
+        self._count += 1
+
+    def _entry(self, chunk: _Chunk, index: int) -> LogEntry:
+        return (chunk.timestamps[index], self._paths.strings[chunk.paths[index]],
+                self._operations.strings[chunk.operations[index]],
+                self._users.strings[chunk.users[index]], chunk.succeeded(index))
+
+    def iter_entries(self) -> Iterator[LogEntry]:
+        """按写入顺序返回 (时间戳, 文件路径, 操作, 用户名, 是否成功)"""
+        for chunk in list(self._chunks):
+            for index in range(len(chunk)):
+                yield self._entry(chunk, index)
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None,
+              username: Optional[str] = None, path: Optional[str] = None,
+              path_prefix: Optional[str] = None) -> List[LogEntry]:
+        """
+        按时间范围 [start, end)、用户、路径（或路径前缀）过滤，条件之间为"与"
+        用户和路径先换成编号，未出现过的用户或路径直接返回空列表
+        """
+        user_id = path_ids = None
+        if username is not None:
+            user_id = self._users.lookup(username)
+            if user_id is None:
+                return []
+        if path is not None:
+            path_id = self._paths.lookup(path)
+            if path_id is None:
+                return []
+            path_ids = {path_id}
+        elif path_prefix is not None:
+            path_ids = {path_id for path_id, value in enumerate(self._paths.strings)
+                        if value == path_prefix or value.startswith(path_prefix.rstrip('/') + '/')}
+            if not path_ids:
+                return []
+
+        results = []
+        for chunk in list(self._chunks):
+            if not len(chunk):
+                continue
+            if chunk.ordered:
+                if (start is not None and chunk.timestamps[-1] < start) or \
+                        (end is not None and chunk.timestamps[0] >= end):
+                    continue
+                indexes: Iterable[int] = chunk.time_range(start, end)
+            else:
+                timestamps = chunk.timestamps
+                indexes = [i for i in range(len(chunk))
+                           if (start is None or timestamps[i] >= start) and (end is None or timestamps[i] < end)]
+            if user_id is not None:
+                users = chunk.users
+                indexes = [i for i in indexes if users[i] == user_id]
+            if path_ids is not None:
+                paths = chunk.paths
+                indexes = [i for i in indexes if paths[i] in path_ids]
+            results.extend(self._entry(chunk, i) for i in indexes)
+        return results
+
+    def remove_before(self, cutoff: float):
+        """删除时间早于 cutoff 的记录"""
+        if any(not chunk.ordered for chunk in self._chunks):
+            # 有乱序的块时逐条筛选重建
+            kept = [entry for entry in self.iter_entries() if entry[0] >= cutoff]
+            self.clear()
+            for entry in kept:
+                self.append(*entry)
+            return
+        while self._chunks and (not len(self._chunks[0]) or self._chunks[0].timestamps[-1] < cutoff):
+            self._count -= len(self._chunks.pop(0))
+        if self._chunks and self._chunks[0].timestamps[0] < cutoff:
+            # 第一块只有前一部分过期：重建这一块
+            first = self._chunks.pop(0)
+            self._count -= len(first)
+            rebuilt = _Chunk()
+            for index in range(bisect.bisect_left(first.timestamps, cutoff), len(first)):
+                rebuilt.append(first.timestamps[index], first.operations[index], first.users[index],
+                               first.paths[index], first.succeeded(index))
+            self._chunks.insert(0, rebuilt)
+            self._count += len(rebuilt)
+
+    def clear(self):
+        self._chunks = []
+        self._count = 0
+
+    def memory_usage(self) -> int:
+        """各列数组占用的字节数（不含驻留的字符串）"""
+        return sum(chunk.nbytes() for chunk in self._chunks)
+
+    # system_log.json 格式的导入导出
+
+    def export_entries(self, limit: Optional[int] = None) -> List[Dict]:
+        """导出为 system_log.json 中 access_log 的记录格式，limit 为只导出最近的条数"""
+        entries = list(self.iter_entries())
+        if limit is not None:
+            entries = entries[-limit:] if limit > 0 else []
+        return [entry_to_dict(entry) for entry in entries]
+
+    def import_entries(self, logs: Iterable[Dict]) -> int:
+        """导入 system_log.json 格式的记录，返回导入的条数（时间格式错误的记录跳过）"""
+        imported = 0
+        for log in logs:
+            try:
+                timestamp = datetime.datetime.fromisoformat(log['timestamp']).timestamp()
+                self.append(timestamp, log.get('file_path', ''), log.get('operation', ''),
+                            log.get('username', ''), log.get('success', True))
+            except (KeyError, TypeError, ValueError):
+                continue
+            imported += 1
+        return imported
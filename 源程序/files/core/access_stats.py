@@ -0,0 +1,212 @@
+##########################################
+#            访问统计模块
+#             作者：李嘉
+#           学号：3123009043
+#          班级：23人工智能1班
+#         指导教师：苏畅、李剑锋
+###########################################
+"""
+访问日志的预聚合统计
+每条记录在写入时累加到当前分钟桶和小时桶（按操作、用户计数，路径用 Space-Saving 保留访问最多的前 K 个），
+"最近 N 小时" 的摘要只需合并相应的桶（默认分钟桶覆盖最近25小时，小时桶覆盖最近30天），与日志条数无关
+"""
+
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+
+class SpaceSaving:
+    """
+    Space-Saving 频繁项统计：最多跟踪 capacity 个键，新键挤掉计数最小的键并继承其计数（记为误差上限）
+    计数相同的键放在同一个桶中，增加计数和淘汰都是 O(1)
+    """
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._buckets: Dict[int, Dict[str, None]] = {}  # 计数 -> 具有该计数的键（有序字典当作有序集合）
+        self._min_count = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def _move(self, key: str, old_count: int, new_count: int):
+        if old_count:
+            bucket = self._buckets[old_count]
+            del bucket[key]
+            if not bucket:
+                del self._buckets[old_count]
+        self._buckets.setdefault(new_count, {})[key] = None
+        self._counts[key] = new_count
+
+    def offer(self, key: str, count: int = 1):
+        old_count = self._counts.get(key)
+        if old_count is not None:
+            self._move(key, old_count, old_count + count)
+            if old_count == self._min_count and old_count not in self._buckets:
+                self._min_count = min(self._buckets) if count > 1 else old_count + 1
+            return
+        if len(self._counts) < self.capacity:
+            self._errors[key] = 0
+            self._move(key, 0, count)
+            if len(self._counts) == 1 or count < self._min_count:
+                self._min_count = count
+            elif self._min_count not in self._buckets:
+                self._min_count = min(self._buckets)
+            return
+        # 淘汰计数最小的键中最早进入该计数的一个
+        bucket = self._buckets[self._min_count]
+        victim = next(iter(bucket))
+        del bucket[victim]
+        if not bucket:
+            del self._buckets[self._min_count]
+        del self._counts[victim]
+        del self._errors[victim]
+        self._errors[key] = self._min_count
+        self._move(key, 0, self._min_count + count)
+        if self._min_count not in self._buckets:
+            self._min_count = self._min_count + 1 if count == 1 else min(self._buckets)
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        ranked = sorted(self._counts.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:n] if n else ranked
+
+    def merge_into(self, totals: Dict[str, int]):
+        for key, count in self._counts.items():
+            totals[key] = totals.get(key, 0) + count
+
+    def to_list(self) -> List:
+        return [[key, count, self._errors[key]] for key, count in self._counts.items()]
+
+    @classmethod
+    def from_list(cls, items: List, capacity: int = 100) -> 'SpaceSaving':
+        summary = cls(capacity)
+        for key, count, error in sorted(items, key=lambda item: item[1], reverse=True)[:capacity]:
+            summary.offer(key, count)
+            summary._errors[key] = error
+        return summary
+
+
+class _Bucket:
+    """一个时间段内的计数"""
+
+    __slots__ = ('start', 'total', 'operations', 'users', 'paths')
+
+    def __init__(self, start: int, top_k: int):
+        self.start = start
+        self.total = 0
+        self.operations: Dict[str, int] = {}
+        self.users: Dict[str, int] = {}
+        self.paths = SpaceSaving(top_k)
+
+    def add(self, file_path: str, operation: str, username: str):
+        self.total += 1
+        self.operations[operation] = self.operations.get(operation, 0) + 1
+        self.users[username] = self.users.get(username, 0) + 1
+        self.paths.offer(file_path)
+
+    def to_dict(self) -> Dict:
+        return {'start': self.start, 'total': self.total, 'operations': self.operations,
+                'users': self.users, 'paths': self.paths.to_list()}
+
+    @classmethod
+    def from_dict(cls, data: Dict, top_k: int) -> '_Bucket':
+        bucket = cls(data['start'], top_k)
+        bucket.total = data.get('total', 0)
+        bucket.operations = dict(data.get('operations', {}))
+        bucket.users = dict(data.get('users', {}))
+        bucket.paths = SpaceSaving.from_list(data.get('paths', []), top_k)
+        return bucket
+
+
+class AccessStats:
+    """按分钟和小时滚动的访问计数，以及全部时间内访问最多的路径"""
+
+    def __init__(self, minute_buckets: int = 25 * 60, hour_buckets: int = 30 * 24, top_k: int = 100):
+        self.top_k = top_k
+        self._minutes: deque = deque(maxlen=minute_buckets)
+        self._hours: deque = deque(maxlen=hour_buckets)
+        self.heavy_hitters = SpaceSaving(top_k)  # 全部时间内访问最多的路径
+        self.last_timestamp = 0.0  # 已计入的最新记录的时间，加载时据此补计日志中更新的记录
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _current(buckets: deque, start: int, top_k: int) -> _Bucket:
+        if buckets and buckets[-1].start == start:
+            return buckets[-1]
+        bucket = _Bucket(start, top_k)
+        if not buckets or buckets[-1].start < start:
+            buckets.append(bucket)
+            return bucket
+        # 时间早于最新的桶（例如导入旧日志或系统时间回拨）：找到对应的桶，太旧的不再计入
+        for existing in reversed(buckets):
+            if existing.start == start:
+                return existing
+        return bucket
+
+    def record(self, timestamp: float, file_path: str, operation: str, username: str):
+        seconds = int(timestamp)
+        with self._lock:
+            self._current(self._minutes, seconds - seconds % 60, self.top_k).add(file_path, operation, username)
+            self._current(self._hours, seconds - seconds % 3600, self.top_k).add(file_path, operation, username)
+            self.heavy_hitters.offer(file_path)
+            if timestamp > self.last_timestamp:
+                self.last_timestamp = timestamp
+
+    def summary(self, since: float, limit: int = 10) -> Dict:
+        """
+        合并起点不早于 since 所在分钟的桶（分钟桶覆盖不到 since 时改用小时桶，精确到小时），
+        返回操作、用户计数和访问最多的路径；路径计数来自各桶的 Space-Saving 摘要，是近似值（可能偏高）
+        """
+        since = int(since)
+        with self._lock:
+            if self._minutes and since >= self._minutes[0].start:
+                start, buckets = since - since % 60, self._minutes
+            else:
+                start, buckets = since - since % 3600, self._hours
+            total = 0
+            operations: Dict[str, int] = {}
+            users: Dict[str, int] = {}
+            paths: Dict[str, int] = {}
+            for bucket in reversed(buckets):
+                if bucket.start < start:
+                    break
+                total += bucket.total
+                for operation, count in bucket.operations.items():
+                    operations[operation] = operations.get(operation, 0) + count
+                for username, count in bucket.users.items():
+                    users[username] = users.get(username, 0) + count
+                bucket.paths.merge_into(paths)
+        return {
+            'total_operations': total,
+            'operation_stats': operations,
+            'user_stats': users,
+            'most_accessed_files': sorted(paths.items(), key=lambda item: (-item[1], item[0]))[:limit],
+        }
+
+    def clear(self):
+        with self._lock:
+            self._minutes.clear()
+            self._hours.clear()
+            self.heavy_hitters = SpaceSaving(self.top_k)
+            self.last_timestamp = 0.0
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'minutes': [bucket.to_dict() for bucket in self._minutes],
+                'hours': [bucket.to_dict() for bucket in self._hours],
+                'heavy_hitters': self.heavy_hitters.to_list(),
+                'last_timestamp': self.last_timestamp,
+            }
+
+    def load_dict(self, data: Dict):
+        with self._lock:
+            self._minutes.clear()
+            self._minutes.extend(_Bucket.from_dict(item, self.top_k) for item in data.get('minutes', []))
+            self._hours.clear()
+            self._hours.extend(_Bucket.from_dict(item, self.top_k) for item in data.get('hours', []))
+            self.heavy_hitters = SpaceSaving.from_list(data.get('heavy_hitters', []), self.top_k)
+            self.last_timestamp = data.get('last_timestamp', 0.0)
@@ -0,0 +1,85 @@
+##########################################
+#            文件内容存储模块
+#             作者：李嘉
+#           学号：3123009043
+#          班级：23人工智能1班
+#         指导教师：苏畅、李剑锋
+###########################################
+"""
+按内容寻址的文件内容存储
+文件内容以 sha256 摘要为键保存在 blobs 目录下，相同内容只保存一份，
+目录树中的文件节点只记录摘要（blob）和大小，读取内容时才按需加载
+"""
+
+import os
+import hashlib
+from typing import Iterable, Optional, Set
+
+
+class BlobStore:
+    """按内容寻址的文件内容存储（blobs/摘要前两位/摘要）"""
+
+    def __init__(self, blob_dir: str, fsync: bool = False):
+        self.blob_dir = blob_dir
+        self.fsync = fsync
+        self._known: Set[str] = set()  # 已确认存在于磁盘上的摘要，避免重复检查文件
+        # 统计信息
+        self.blobs_written = 0
+        self.bytes_written = 0
+
+    def _blob_path(self, key: str) -> str:
+        return os.path.join(self.blob_dir, key[:2], key)
+
+    def put(self, content: str) -> str:
+        """保存内容并返回其摘要；内容已存在时不重复写入"""
+        data = content.encode('utf-8')
+        key = hashlib.sha256(data).hexdigest()
+        if key in self._known:
+            return key
+        blob_path = self._blob_path(key)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            tmp_path = blob_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, blob_path)
+            self.blobs_written += 1
+            self.bytes_written += len(data)
+        self._known.add(key)
+        return key
+
+    def get(self, key: str) -> Optional[str]:
+        """按摘要读取内容，不存在时返回None"""
+        try:
+            with open(self._blob_path(key), 'rb') as f:
+                return f.read().decode('utf-8')
+        except (OSError, ValueError) as e:
+            print(f"读取文件内容失败: {key}, {e}")
+            return None
+
+    def exists(self, key: str) -> bool:
+        return key in self._known or os.path.exists(self._blob_path(key))
+
+    def collect_garbage(self, live_keys: Iterable[str]) -> int:
+        """删除不再被任何文件引用的内容（以及写入中途残留的临时文件），返回删除的个数"""
+        if not os.path.isdir(self.blob_dir):
+            return 0
+        live_keys = set(live_keys)
+        removed = 0
+        for prefix in os.listdir(self.blob_dir):
+            prefix_dir = os.path.join(self.blob_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if name in live_keys:
+                    continue
+                try:
+                    os.remove(os.path.join(prefix_dir, name))
+                    self._known.discard(name)
+                    removed += 1
+                except OSError as e:
+                    print(f"清理文件内容失败: {name}, {e}")
+        return removed
@@ -0,0 +1,329 @@
+##########################################
+#            文件内容缓存模块
+#             作者：李嘉
+#           学号：3123009043
+#          班级：23人工智能1班
+#         指导教师：苏畅、李剑锋
+###########################################
+"""
+按字节数限制大小的文件内容缓存
+SegmentedLRUCache：分段LRU，新条目先进入试用段，再次命中后升入保护段；
+WTinyLFUCache：在分段LRU前加一个小的窗口段，条目离开窗口时用频率草图（计数会定期减半衰减）
+与主缓存中将被淘汰的条目比较访问频率，频率更高才准入。
+所有操作都是 O(1)（频率草图的减半为均摊 O(1)），不再在超出限制时排序整个缓存
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class FrequencySketch:
+    """Count-Min 频率草图：4 行计数器，每个计数最大 15，累计增加 sample_size 次后全部减半"""
+
+    DEPTH = 4
+    MAX_COUNT = 15
+    _SEEDS = (0x9E3779B1, 0x85EBCA77, 0xC2B2AE3D, 0x27D4EB2F)
+
+    def __init__(self, width: int = 4096):
+        size = 1
+        while size < width:
+            size <<= 1
+        self._mask = size - 1
+        self._rows = [[0] * size for _ in range(self.DEPTH)]
+        self.sample_size = size * 10
+        self._additions = 0
+
+    def _indexes(self, key) -> List[int]:
+        h = hash(key)
+        return [((h ^ seed) * 0x01000193 >> 7) & self._mask for seed in self._SEEDS]
+
+    def frequency(self, key) -> int:
+        return min(row[i] for row, i in zip(self._rows, self._indexes(key)))
+
+    def increment(self, key):
+        indexes = self._indexes(key)
+        current = min(row[i] for row, i in zip(self._rows, indexes))
+        if current >= self.MAX_COUNT:
+            return
+        # 只增加最小的计数器（保守更新），减少冲突带来的高估
+        for row, i in zip(self._rows, indexes):
+            if row[i] == current:
+                row[i] += 1
+        self._additions += 1
+        if self._additions >= self.sample_size:
+            self._reset()
+
+    def _reset(self):
+        """所有计数减半，使过去的热点逐渐冷却"""
+        for row in self._rows:
+            for i, count in enumerate(row):
+                if count:
+                    row[i] = count >> 1
+        self._additions //= 2
+
+
+class _Segment:
+    """一个LRU段：有序字典（最久未用的在最前）和已用字节数"""
+
+    __slots__ = ('entries', 'bytes', 'capacity')
+
+    def __init__(self, capacity: int):
+        self.entries: 'OrderedDict[Any, Tuple[Any, int]]' = OrderedDict()
+        self.bytes = 0
+        self.capacity = capacity
+
+    def push(self, key, value, size: int):
+        self.entries[key] = (value, size)
+        self.bytes += size
+
+    def pop(self, key) -> Tuple[Any, int]:
+        value, size = self.entries.pop(key)
+        self.bytes -= size
+        return value, size
+
+    def pop_oldest(self) -> Tuple[Any, Any, int]:
+        key, (value, size) = self.entries.popitem(last=False)
+        self.bytes -= size
+        return key, value, size
+
+    def oldest(self):
+        return next(iter(self.entries))
+
+
+class SegmentedLRUCache:
+    """分段LRU缓存（试用段 + 保护段），容量按字节计算"""
+
+    policy = 'slru'
+
+    def __init__(self, capacity: int, protected_ratio: float = 0.8):
+        self.capacity = capacity
+        self._protected = _Segment(int(capacity * protected_ratio))
+        self._probation = _Segment(capacity)
+        self._segments: Dict[Any, _Segment] = {}  # 键 -> 所在的段
+        self._lock = threading.RLock()
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0  # 未被准入或超过容量而没有缓存的条目
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    def __contains__(self, key) -> bool:
+        return key in self._segments
+
+    @property
+    def size(self) -> int:
+        """已缓存的字节数"""
+        return sum(segment.bytes for segment in self._all_segments())
+
+    def _all_segments(self) -> List[_Segment]:
+        return [self._probation, self._protected]
+
+    def get(self, key, is_valid: Optional[Callable[[Any], bool]] = None) -> Optional[Any]:
+        """读取条目；is_valid 返回False的条目视为过期，删除并按未命中处理"""
+        with self._lock:
+            segment = self._segments.get(key)
+            self._record_access(key)
+            if segment is not None and is_valid is not None and not is_valid(segment.entries[key][0]):
+                self._remove(key)
+                segment = None
+            if segment is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            value, _ = segment.entries[key]
+            self._on_hit(key, segment)
+            return value
+
+    def peek(self, key) -> Optional[Any]:
+        """读取条目但不计入命中统计，也不改变淘汰顺序"""
+        segment = self._segments.get(key)
+        return segment.entries[key][0] if segment is not None else None
+
+    def put(self, key, value, size: int) -> bool:
+        """缓存条目，返回是否被缓存"""
+        with self._lock:
+            if key in self._segments:
+                self._remove(key)
+            if size > self.capacity:
+                self.rejections += 1
+                return False
+            return self._insert(key, value, size)
+
+    def pop(self, key) -> Optional[Any]:
+        with self._lock:
+            if key not in self._segments:
+                return None
+            return self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            for segment in self._all_segments():
+                segment.entries.clear()
+                segment.bytes = 0
+            self._segments.clear()
+
+    def keys(self) -> List:
+        return list(self._segments)
+
+    def items(self) -> Iterator[Tuple[Any, Any, int]]:
+        """按从冷到热的顺序返回 (键, 值, 字节数)"""
+        for segment in self._all_segments():
+            for key, (value, size) in list(segment.entries.items()):
+                yield key, value, size
+
+    def frequency(self, key) -> int:
+        """条目的访问频率估计：保护段中的条目至少被命中过一次"""
+        segment = self._segments.get(key)
+        return 2 if segment is self._protected else (1 if segment is not None else 0)
+
+    def restore_frequency(self, key, count: int):
+        """恢复之前记录的访问频率（预热时使用），分段LRU不记录频率"""
+        pass
+
+    def stats(self) -> Dict:
+        return {
+            'policy': self.policy,
+            'entries': len(self),
+            'size': self.size,
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'rejections': self.rejections,
+        }
+
+    def _remove(self, key):
+        segment = self._segments.pop(key)
+        return segment.pop(key)[0]
+
+    def _record_access(self, key):
+        pass
+
+    def _on_hit(self, key, segment: _Segment):
+        if segment is self._protected:
+            segment.entries.move_to_end(key)
+            return
+        # 试用段中的条目再次命中：升入保护段，保护段超出容量时把最久未用的条目降回试用段
+        value, size = segment.pop(key)
+        self._protected.push(key, value, size)
+        self._segments[key] = self._protected
+        while self._protected.bytes > self._protected.capacity and len(self._protected.entries) > 1:
+            old_key, old_value, old_size = self._protected.pop_oldest()
+            self._probation.push(old_key, old_value, old_size)
+            self._segments[old_key] = self._probation
+
+    def _main_bytes(self) -> int:
+        return self._probation.bytes + self._protected.bytes
+
+    def _main_capacity(self) -> int:
+        return self.capacity
+
+    def _main_victim(self) -> Optional[Tuple[Any, _Segment]]:
+        """主缓存中下一个要淘汰的条目：优先试用段，其次保护段"""
+        for segment in (self._probation, self._protected):
+            if segment.entries:
+                return segment.oldest(), segment
+        return None
+
+    def _evict(self, key, segment: _Segment):
+        segment.pop(key)
+        del self._segments[key]
+        self.evictions += 1
+
+    def _insert(self, key, value, size: int) -> bool:
+        while self._main_bytes() + size > self._main_capacity():
+            victim_key, segment = self._main_victim()
+            self._evict(victim_key, segment)
+        self._probation.push(key, value, size)
+        self._segments[key] = self._probation
+        return True
+
+
+class WTinyLFUCache(SegmentedLRUCache):
+    """W-TinyLFU：窗口LRU + 频率草图准入 + 分段LRU主缓存"""
+
+    policy = 'tinylfu'
+
+    def __init__(self, capacity: int, window_ratio: float = 0.01, protected_ratio: float = 0.8,
+                 sketch_width: int = 4096):
+        super().__init__(capacity)
+        window_capacity = max(1, int(capacity * window_ratio))
+        self._window = _Segment(window_capacity)
+        self._protected.capacity = int((capacity - window_capacity) * protected_ratio)
+        self._sketch = FrequencySketch(sketch_width)
+
+    def _all_segments(self) -> List[_Segment]:
+        return [self._window, self._probation, self._protected]
+
+    def _main_capacity(self) -> int:
+        return self.capacity - self._window.capacity
+
+    def _record_access(self, key):
+        self._sketch.increment(key)
+
+    def frequency(self, key) -> int:
+        return self._sketch.frequency(key)
+
+    def restore_frequency(self, key, count: int):
+        with self._lock:
+            for _ in range(min(count, FrequencySketch.MAX_COUNT) - self._sketch.frequency(key)):
+                self._sketch.increment(key)
+
+    def _on_hit(self, key, segment: _Segment):
+        if segment is self._window:
+            segment.entries.move_to_end(key)
+        else:
+            super()._on_hit(key, segment)
+
+    def _insert(self, key, value, size: int) -> bool:
+        self._sketch.increment(key)
+        self._window.push(key, value, size)
+        self._segments[key] = self._window
+        admitted = True
+        # 窗口超出容量时，最久未用的条目作为候选进入主缓存
+        while self._window.bytes > self._window.capacity and self._window.entries:
+            candidate_key, candidate_value, candidate_size = self._window.pop_oldest()
+            del self._segments[candidate_key]
+            if self._admit(candidate_key, candidate_size):
+                self._probation.push(candidate_key, candidate_value, candidate_size)
+                self._segments[candidate_key] = self._probation
+            else:
+                self.rejections += 1
+                admitted = admitted and candidate_key != key
+        return admitted
+
+    def _admit(self, candidate_key, candidate_size: int) -> bool:
+        """候选条目的访问频率高于将被淘汰的条目时才准入，必要时淘汰多个条目腾出空间"""
+        if candidate_size > self._main_capacity():
+            return False
+        needed = self._main_bytes() + candidate_size - self._main_capacity()
+        if needed <= 0:
+            return True
+        # 先按淘汰顺序找出需要淘汰的条目，全部比候选条目冷时才真正淘汰
+        candidate_frequency = self._sketch.frequency(candidate_key)
+        victims = []
+        for segment in (self._probation, self._protected):
+            for victim_key, (_, victim_size) in segment.entries.items():
+                if needed <= 0:
+                    break
+                if self._sketch.frequency(victim_key) >= candidate_frequency:
+                    return False
+                victims.append((victim_key, segment))
+                needed -= victim_size
+        for victim_key, segment in victims:
+            self._evict(victim_key, segment)
+        return True
+
+
+def create_cache(policy: str, capacity: int):
+    """按名称创建缓存：tinylfu（默认）或 slru"""
+    if policy == 'slru':
+        return SegmentedLRUCache(capacity)
+    if policy != 'tinylfu':
+        print(f"未知的缓存策略 {policy}，使用 tinylfu")
+    return WTinyLFUCache(capacity)
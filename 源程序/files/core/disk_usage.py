@@ -0,0 +1,182 @@
+##########################################
+#            磁盘使用汇总模块
+#             作者：李嘉
+#           学号：3123009043
+#          班级：23人工智能1班
+#         指导教师：苏畅、李剑锋
+###########################################
+"""
+按目录增量维护的磁盘使用汇总
+每个目录记录其整棵子树的文件数、目录数、总字节数、各扩展名文件数和各所有者的文件数与字节数，
+修改目录树时只沿祖先链更新受影响的汇总，整棵树或任一目录的统计都可以直接读取，无需遍历
+"""
+
+from typing import Dict, Optional, Tuple
+
+FileInfo = Tuple[Optional[str], str, int]  # (扩展名, 所有者, 大小)
+
+
+def file_info(node: Dict) -> FileInfo:
+    name = node.get('name', '')
+    ext = name.split('.')[-1].lower() if '.' in name else None
+    return ext, node.get('owner', 'unknown'), node.get('size', 0)
+
+
+class DirectoryUsage:
+    """一个目录的汇总（不含目录自身；direct_* 只统计直接子项）"""
+
+    __slots__ = ('files', 'dirs', 'size', 'ext_counts', 'owners',
+                 'direct_files', 'direct_dirs', 'direct_size')
+
+    def __init__(self):
+        self.files = 0
+        self.dirs = 0
+        self.size = 0
+        self.ext_counts: Dict[str, int] = {}
+        self.owners: Dict[str, list] = {}  # 所有者 -> [文件数, 字节数]
+        self.direct_files = 0
+        self.direct_dirs = 0
+        self.direct_size = 0
+
+    def add_file(self, info: FileInfo, sign: int = 1):
+        ext, owner, size = info
+        self.files += sign
+        self.size += sign * size
+        if ext is not None:
+            count = self.ext_counts.get(ext, 0) + sign
+            if count:
+                self.ext_counts[ext] = count
+            else:
+                self.ext_counts.pop(ext, None)
+        totals = self.owners.setdefault(owner, [0, 0])
+        totals[0] += sign
+        totals[1] += sign * size
+        if not totals[0]:
+            del self.owners[owner]
+
+    def add_directory(self, other: 'DirectoryUsage', sign: int = 1):
+        """把子目录 other（连同它自身）计入或移出本目录的汇总"""
+        self.files += sign * other.files
+        self.dirs += sign * (other.dirs + 1)
+        self.size += sign * other.size
+        for ext, count in other.ext_counts.items():
+            count = self.ext_counts.get(ext, 0) + sign * count
+            if count:
+                self.ext_counts[ext] = count
+            else:
+                self.ext_counts.pop(ext, None)
+        for owner, (files, size) in other.owners.items():
+            totals = self.owners.setdefault(owner, [0, 0])
+            totals[0] += sign * files
+            totals[1] += sign * size
+            if not totals[0]:
+                del self.owners[owner]
+
+    def to_dict(self) -> Dict:
+        return {
+            'files': self.files,
+            'dirs': self.dirs,
+            'size': self.size,
+            'file_type_stats': dict(self.ext_counts),
+            'user_stats': {owner: {'files': files, 'size': size}
+                           for owner, (files, size) in self.owners.items()},
+        }
+
+
+class DiskUsageRollups:
+    """
+    以节点编号为键保存各目录的汇总（不写入目录树，保存的文件格式不变），
+    通过文件系统的修改监听器增量更新
+    """
+
+    def __init__(self, file_system):
+        self.file_system = file_system
+        self._dirs: Dict[int, DirectoryUsage] = {}  # 目录编号 -> 汇总
+        self._files: Dict[int, FileInfo] = {}       # 文件编号 -> 计入汇总时的 (扩展名, 所有者, 大小)
+        root_node = file_system.file_system.get('root')
+        if root_node:
+            self._build(root_node)
+        file_system.add_listener(self._on_file_system_change)
+
+    def _build(self, node: Dict):
+        """为子树中的每个目录计算汇总（后序遍历）"""
+        if node.get('type') != 'dir':
+            self._files[node['id']] = file_info(node)
+            return
+        stack = [(node, False)]
+        while stack:
+            current, visited = stack.pop()
+            if not visited:
+                stack.append((current, True))
+                stack.extend((child, False) for child in current.get('children', [])
+                             if child.get('type') == 'dir')
+                continue
+            usage = DirectoryUsage()
+            for child in current.get('children', []):
+                if child.get('type') == 'dir':
+                    usage.add_directory(self._dirs[child['id']])
+                    usage.direct_dirs += 1
+                else:
+                    info = file_info(child)
+                    self._files[child['id']] = info
+                    usage.add_file(info)
+                    usage.direct_files += 1
+                    usage.direct_size += info[2]
+            self._dirs[current['id']] = usage
+
+    def _drop(self, node: Dict):
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            self._dirs.pop(current.get('id'), None)
+            self._files.pop(current.get('id'), None)
+            stack.extend(current.get('children', []))
+
+    def _propagate(self, node: Dict, sign: int):
+        """把 node 整棵子树计入（sign=1）或移出（sign=-1）所有祖先的汇总"""
+        node_id = node.get('id')
+        is_dir = node.get('type') == 'dir'
+        usage = self._dirs.get(node_id)
+        info = self._files.get(node_id)
+        if (usage if is_dir else info) is None:
+            return
+        direct = True
+        for ancestor in self.file_system.iter_ancestors(node):
+            ancestor_usage = self._dirs.get(ancestor['id'])
+            if ancestor_usage is None:
+                continue
+            if is_dir:
+                ancestor_usage.add_directory(usage, sign)
+                if direct:
+                    ancestor_usage.direct_dirs += sign
+            else:
+                ancestor_usage.add_file(info, sign)
+                if direct:
+                    ancestor_usage.direct_files += sign
+                    ancestor_usage.direct_size += sign * info[2]
+            direct = False
+
+    def _on_file_system_change(self, event: str, node: Dict):
+        if event == 'add':
+            self._build(node)
+            self._propagate(node, 1)
+        elif event in ('removing', 'moving'):
+            # 摘下节点之前从原来的祖先中减去
+            self._propagate(node, -1)
+        elif event == 'remove':
+            self._drop(node)
+        elif event == 'move':
+            if node.get('type') != 'dir':
+                # 移动时可能同时改名，扩展名随之变化
+                self._files[node['id']] = file_info(node)
+            self._propagate(node, 1)
+        elif event in ('rename', 'update') and node.get('type') != 'dir':
+            info = file_info(node)
+            if info != self._files.get(node.get('id')):
+                self._propagate(node, -1)
+                self._files[node['id']] = info
+                self._propagate(node, 1)
+
+    def get(self, node: Dict) -> Optional[DirectoryUsage]:
+        """目录的汇总，不是目录或未登记时返回None"""
+        return self._dirs.get(node.get('id'))
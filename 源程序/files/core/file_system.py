@@ -14,18 +14,69 @@ import os
 import datetime
 import hashlib
 import shutil
-import copy
-from typing import Dict, List, Optional, Tuple
+import functools
+import threading
+import configparser
+from typing import Callable, Dict, List, Optional, Tuple
 
 # 导入系统监控器
 from .system_monitor import SystemMonitor
+from .journal import FileSystemJournal
+from .save_scheduler import SaveScheduler
+from .blob_store import BlobStore
+from .user_registry import UserRegistry
+from .permissions import PermissionEngine
+from .disk_usage import DiskUsageRollups
+
+
+def _synchronized(method):
+    """在文件系统锁内执行，避免修改操作与后台保存线程同时访问目录树"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class FileSystem:
     def __init__(self, data_dir):
         self.data_dir = data_dir
+        self._lock = threading.RLock()
         self.fs_file = os.path.join(data_dir, 'filesystem.json')
         self.users_file = os.path.join(data_dir, 'users.json')
+        # 用户数据缓存：只在 users.json 变化时重新读取
+        self.user_registry = UserRegistry(self.users_file)
+        self.config = self._load_config()
+        # 修改监听器：listener(event, node)，供系统监控器等增量维护索引
+        self._listeners: List[Callable[[str, Dict], None]] = []
+
+        # 存储模式：journal（追加操作日志）或 snapshot（每次修改重写整个文件）
+        self.storage_mode = self.config.get('Storage', 'storage_mode', fallback='journal')
+        fsync = self.config.getboolean('Storage', 'journal_fsync', fallback=False)
+        self.journal = None
+        if self.storage_mode == 'journal':
+            self.journal = FileSystemJournal(
+                self.fs_file,
+                compact_threshold=self.config.getint('Storage', 'journal_compact_threshold', fallback=4 * 1024 * 1024),
+                fsync=fsync)
+        # 快照模式下写出的快照数和字节数（日志模式的统计在 journal 中）
+        self.snapshot_count = 0
+        self.snapshot_bytes = 0
+        # 文件内容单独按摘要存放，目录树中只保存摘要和大小
+        self.blob_store = BlobStore(os.path.join(data_dir, 'blobs'), fsync=fsync)
+
         self.file_system = self.load_file_system()
+
+        # 延迟保存：第一次修改后 auto_save_interval 秒内或累计 save_batch_size 次修改后统一写盘
+        self.save_scheduler = None
+        auto_save_interval = self.config.getfloat('General', 'auto_save_interval', fallback=60)
+        if auto_save_interval > 0:
+            self.save_scheduler = SaveScheduler(
+                self._flush_pending,
+                interval=auto_save_interval,
+                max_pending=self.config.getint('Storage', 'save_batch_size', fallback=100),
+                min_interval=self.config.getfloat('Storage', 'save_min_interval', fallback=1.0))
+            self.save_scheduler.start()
         
         # 剪贴板
         self.clipboard = {
@@ -34,34 +85,213 @@ class FileSystem:
             'source_path': None  # 源路径
         }
         
+        # 访问权限引擎（内置规则 + 目录的访问控制列表）
+        self.permissions = PermissionEngine(self)
+
+        # 各目录的磁盘使用汇总（随修改沿祖先链增量更新）
+        self.disk_usage = DiskUsageRollups(self)
+
         # 初始化系统监控器
         self.system_monitor = SystemMonitor(self)
 
-    def _get_node_by_path(self, path: str) -> Optional[Dict]:
-        """通过路径获取节点，只沿着目录走"""
-        if path == '/':
-            return self.file_system.get('root')
+    def _load_config(self) -> configparser.ConfigParser:
+        """加载 data/config.ini 配置"""
+        config = configparser.ConfigParser()
+        config_file = os.path.join(self.data_dir, 'config.ini')
+        try:
+            config.read(config_file, encoding='utf-8')
+        except Exception as e:
+            print(f"加载配置文件失败: {e}")
+        return config
+
+    @staticmethod
+    def _join_path(parent_path: str, name: str) -> str:
+        return f"/{name}" if parent_path == '/' else f"{parent_path}/{name}"
+
+    @staticmethod
+    def _normalize_path(path: str) -> str:
+        return '/' + '/'.join(p for p in path.split('/') if p)
+
+    def _rebuild_index(self) -> bool:
+        """
+        根据目录树重建节点表、父节点链接和每个目录的 名称->子项 索引，
+        同时刷新所有节点的派生字段 path；返回是否为节点分配了新的编号
+        """
+        self._nodes: Dict[int, Dict] = {}        # 节点编号 -> 节点
+        self._parents: Dict[int, int] = {}       # 节点编号 -> 父目录编号
+        self._child_maps: Dict[int, Dict[str, Dict[str, Dict]]] = {}  # 目录编号 -> {名称: {类型: 子项}}
+        self._path_cache: Dict[int, str] = {}    # 节点编号 -> 路径（按需计算）
+        self._path_index: Dict[str, Dict] = {}   # 目录路径 -> 目录节点（按需缓存）
+        self._ids_assigned = False
+        root_node = self.file_system.get('root')
+        if root_node:
+            self._index_subtree(root_node, None)
+        return self._ids_assigned
 
-        parts = [p for p in path.split('/') if p]
-        current_node = self.file_system.get('root')
-        if not current_node:
+    def _index_subtree(self, node: Dict, parent_node: Optional[Dict]):
+        """
+        登记节点及其所有后代：分配编号、记录父节点链接、建立名称索引并刷新 path
+        没有编号或编号已被其他节点占用（例如复制出的副本）时分配新编号
+        """
+        path = '/' if parent_node is None else self._join_path(self._path_of(parent_node), node.get('name'))
+        stack = [(node, parent_node, path)]
+        while stack:
+            current, parent, current_path = stack.pop()
+            node_id = current.get('id')
+            if not isinstance(node_id, int) or self._nodes.get(node_id, current) is not current:
+                node_id = self._next_id
+                current['id'] = node_id
+                self._ids_assigned = True
+            self._next_id = max(self._next_id, node_id + 1)
+            self._nodes[node_id] = current
+            if parent is not None:
+                self._parents[node_id] = parent['id']
+            current['path'] = current_path
+            self._path_cache[node_id] = current_path
+            if current.get('type') != 'dir':
+                continue
+            if not isinstance(current.get('children'), list):
+                current['children'] = []
+            child_map = {}
+            for child in current['children']:
+                if not isinstance(child, dict):
+                    continue
+                # 同名同类型的重复项只有第一个可以通过名称访问
+                child_map.setdefault(child.get('name'), {}).setdefault(child.get('type'), child)
+                stack.append((child, current, self._join_path(current_path, child.get('name'))))
+            self._child_maps[node_id] = child_map
+
+    def _unindex_subtree(self, node: Dict):
+        """把已脱离目录树的节点及其后代移出节点表"""
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            node_id = current.get('id')
+            if self._nodes.get(node_id) is not current:
+                continue
+            del self._nodes[node_id]
+            self._parents.pop(node_id, None)
+            self._path_cache.pop(node_id, None)
+            if self._child_maps.pop(node_id, None) is not None:
+                stack.extend(c for c in current.get('children', []) if isinstance(c, dict))
+        if node.get('type') == 'dir':
+            self._invalidate_paths()
+
+    def _invalidate_paths(self):
+        """目录被改名、移动或删除后，丢弃所有缓存的路径（之后按需重新计算）"""
+        self._path_cache = {}
+        self._path_index = {}
+
+    def _is_indexed(self, node: Optional[Dict]) -> bool:
+        return bool(node) and self._nodes.get(node.get('id')) is node
+
+    def _link_name(self, parent_node: Dict, child: Dict):
+        """在父目录的名称索引中登记子项"""
+        child_map = self._child_maps.get(parent_node['id'])
+        if child_map is not None:
+            child_map.setdefault(child.get('name'), {}).setdefault(child.get('type'), child)
+
+    def _unlink_name(self, parent_node: Dict, child: Dict):
+        """从父目录的名称索引中移除子项，若有同名同类型的重复项则由它接替"""
+        child_map = self._child_maps.get(parent_node['id'])
+        if child_map is None:
+            return
+        name, item_type = child.get('name'), child.get('type')
+        entry = child_map.get(name, {})
+        if entry.get(item_type) is not child:
+            return
+        del entry[item_type]
+        if not entry:
+            del child_map[name]
+        for other in parent_node.get('children', []):
+            if other is not child and isinstance(other, dict) \
+                    and other.get('name') == name and other.get('type') == item_type:
+                self._link_name(parent_node, other)
+                break
+
+    def _path_of(self, node: Dict) -> Optional[str]:
+        """沿父节点链接计算节点路径（带缓存），不在目录树中的节点返回None"""
+        node_id = node.get('id')
+        path = self._path_cache.get(node_id)
+        if path is not None and self._nodes.get(node_id) is node:
+            return path
+        if not self._is_indexed(node):
             return None
+        # 向上找到最近的已缓存祖先，再向下拼出路径
+        names = []
+        current_id = node_id
+        while current_id not in self._path_cache:
+            parent_id = self._parents.get(current_id)
+            if parent_id is None:
+                self._path_cache[current_id] = '/'
+                break
+            names.append(self._nodes[current_id].get('name'))
+            current_id = parent_id
+        path = self._path_cache[current_id]
+        for name in reversed(names):
+            path = self._join_path(path, name)
+        self._path_cache[node_id] = path
+        return path
 
-        for part in parts:
-            found = False
-            # 确保children是列表且只包含字典类型
-            children = current_node.get("children", [])
-            if not isinstance(children, list):
-                return None
-                
-            for child in children:
-                if isinstance(child, dict) and child.get("name") == part and child.get("type") == "dir":
-                    current_node = child
-                    found = True
-                    break
-            if not found:
+    def get_node_path(self, node: Dict) -> Optional[str]:
+        """返回节点的当前路径，并刷新节点上的派生字段 path"""
+        path = self._path_of(node)
+        if path is not None:
+            node['path'] = path
+        return path
+
+    def _refresh_paths(self, node: Dict):
+        """刷新节点及其所有后代的派生字段 path（交给界面遍历整棵子树之前调用）"""
+        path = self._path_of(node)
+        if path is None:
+            return
+        stack = [(node, path)]
+        while stack:
+            current, current_path = stack.pop()
+            current['path'] = current_path
+            for child in current.get('children', []):
+                if isinstance(child, dict):
+                    stack.append((child, self._join_path(current_path, child.get('name'))))
+
+    def _get_node_by_path(self, path: str) -> Optional[Dict]:
+        """通过路径获取目录节点：先查路径缓存，未命中时按名称索引逐级查找（O(深度)）"""
+        path = self._normalize_path(path)
+        node = self._path_index.get(path)
+        if node is None:
+            node = self.file_system.get('root')
+            for part in path.split('/'):
+                if not part:
+                    continue
+                node = self._get_child(node, part, 'dir')
+                if node is None:
+                    return None
+            if node is None:
                 return None
-        return current_node
+            self._path_index[path] = node
+        node['path'] = path
+        return node
+
+    def _get_child(self, parent_node: Dict, child_name: str, child_type: str = None) -> Optional[Dict]:
+        """在父节点中查找子项（名称索引，O(1)）"""
+        if not parent_node:
+            return None
+        child_map = self._child_maps.get(parent_node.get('id')) if self._is_indexed(parent_node) else None
+        if child_map is None:
+            # 不在目录树中的节点（如剪贴板中的副本）退化为线性查找
+            result = self._find_child_in_node(parent_node, child_name, child_type)
+            return result[1] if result else None
+        entry = child_map.get(child_name)
+        if not entry:
+            return None
+        if child_type is not None:
+            return entry.get(child_type)
+        if len(entry) == 1:
+            return next(iter(entry.values()))
+        # 同名的文件和目录并存时，按原有语义返回列表中靠前的一个
+        for child in parent_node['children']:
+            if child is entry.get('file') or child is entry.get('dir'):
+                return child
+        return None
 
     def _find_child_in_node(self, parent_node: Dict, child_name: str, child_type: str = None) -> Optional[Tuple[int, Dict]]:
         """在父节点中查找子项，返回其索引和数据"""
@@ -79,44 +309,91 @@ class FileSystem:
         return None
 
     def load_file_system(self) -> Dict:
-        """加载文件系统数据"""
-        if not os.path.exists(self.fs_file):
-            fs_data = {
-                "root": {
-                    "name": "root", "type": "dir", "path": "/",
-                    "created": self.get_current_time(), "modified": self.get_current_time(),
-                    "children": []
-                }
-            }
+        """加载文件系统数据（日志模式下在快照之上重放操作日志）"""
+        snapshot_exists = os.path.exists(self.fs_file)
+        snapshot_seq = 0
+        self._next_id = 1
+        if not snapshot_exists:
+            fs_data = self._new_file_system_data()
         else:
             try:
                 with open(self.fs_file, 'r', encoding='utf-8') as f:
                     fs_data = json.load(f)
+                snapshot_seq = fs_data.pop('journal_seq', 0)
+                self._next_id = max(1, fs_data.pop('next_id', 1))
             except (json.JSONDecodeError, FileNotFoundError) as e:
                 print(f"加载文件系统失败: {e}, 将创建新的文件系统。")
-                fs_data = {
-                    "root": {
-                        "name": "root", "type": "dir", "path": "/",
-                        "created": self.get_current_time(), "modified": self.get_current_time(),
-                        "children": []
-                    }
-                }
+                fs_data = self._new_file_system_data()
+
+        replayed = 0
+        self.file_system = fs_data
+        ids_assigned = self._rebuild_index()
+        if self.journal:
+            for record in self.journal.read_records(after_seq=snapshot_seq):
+                try:
+                    self._apply_record(record)
+                    replayed += 1
+                except Exception as e:
+                    print(f"重放操作日志失败: {e}, 记录: {record.get('seq')}")
+            self.journal.seq = max(self.journal.seq, snapshot_seq)
 
         # 确保 /home 和 /home/shared 目录存在
-        self._ensure_required_directories(fs_data)
+        changed = self._ensure_required_directories(fs_data)
+        if changed:
+            self._rebuild_index()
+        # 旧格式的数据没有节点编号、文件内容内联在节点中，转换后立即写出快照使其固定下来
+        changed = self._store_inline_contents() or changed or ids_assigned
         
-        self.save_file_system(fs_data)
+        if not self.journal:
+            self.save_file_system(fs_data)
+        elif not snapshot_exists or changed or self.journal.corrupted:
+            # 结构被修正或日志尾部损坏时立即写出新快照
+            self.compact_journal(background=False)
+        if replayed:
+            print(f"已重放 {replayed} 条操作日志")
+
+        # 此时磁盘上的快照和日志与内存一致，可以清理不再被引用的文件内容
+        live_blobs = {node['blob'] for node in self._nodes.values() if 'blob' in node}
+        self.blob_store.collect_garbage(live_blobs)
         return fs_data
 
+    def _store_inline_contents(self) -> bool:
+        """把内联在节点中的文件内容（旧格式数据或旧日志记录）移入内容存储，返回是否有修改"""
+        changed = False
+        for node in self._nodes.values():
+            if node.get('type') == 'file' and 'content' in node:
+                content = node.pop('content') or ''
+                node['blob'] = self.blob_store.put(content)
+                node.setdefault('size', len(content))
+                changed = True
+        return changed
+
+    def _read_content(self, file_node: Dict) -> Optional[str]:
+        """按需从内容存储读取文件内容"""
+        if 'blob' in file_node:
+            return self.blob_store.get(file_node['blob'])
+        return file_node.get('content', '')
+
+    def _new_file_system_data(self) -> Dict:
+        return {
+            "root": {
+                "name": "root", "type": "dir", "path": "/",
+                "created": self.get_current_time(), "modified": self.get_current_time(),
+                "children": []
+            }
+        }
+
     def _ensure_required_directories(self, fs_data):
-        """确保必要的目录存在"""
+        """确保必要的目录存在，返回是否修改了目录结构"""
+        changed = False
         try:
             root_node = fs_data.get('root')
             if not root_node:
-                return
+                return changed
             # 强制children为list
             if not isinstance(root_node.get('children'), list):
                 root_node['children'] = []
+                changed = True
             
             # 确保home_node为dict且children为list
             # 查找home_node
@@ -134,11 +411,16 @@ class FileSystem:
                     "children": []
                 }
                 root_node['children'].append(home_node)
+                changed = True
             # 强制children为list
             if not isinstance(home_node.get('children'), list):
                 home_node['children'] = []
+                changed = True
             # 清理home_node['children']，只保留dict类型，并删除users文件夹
-            home_node['children'] = [c for c in home_node['children'] if isinstance(c, dict) and c.get('name') != 'users']
+            home_children = [c for c in home_node['children'] if isinstance(c, dict) and c.get('name') != 'users']
+            if len(home_children) != len(home_node['children']):
+                home_node['children'] = home_children
+                changed = True
             
             # 检查并创建 /home/shared 目录
             shared_exists = False
@@ -155,6 +437,7 @@ class FileSystem:
                     "children": []
                 }
                 home_node['children'].append(shared_node)
+                changed = True
             
             # 为每个用户创建主目录（包括admin）
             users = self._load_users()
@@ -173,6 +456,7 @@ class FileSystem:
                         "children": []
                     }
                     home_node['children'].append(user_node)
+                    changed = True
             
             # 确保 /system 目录存在（用于存储加密信息等系统文件）
             system_exists = False
@@ -189,18 +473,17 @@ class FileSystem:
                     "children": []
                 }
                 root_node['children'].append(system_node)
+                changed = True
         except Exception as e:
             print(f"创建用户目录失败: {e}")
             import traceback
             traceback.print_exc()
+        return changed
 
     def _load_users(self):
         """加载所有用户名列表"""
-        if not os.path.exists(self.users_file):
-            return []
         try:
-            with open(self.users_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = self.user_registry.get_data()
             
             # 处理不同的JSON格式
             if isinstance(data, dict):
@@ -219,10 +502,16 @@ class FileSystem:
             print(f"加载用户列表失败: {e}")
             return []
 
+    @_synchronized
     def save_file_system(self, fs_data=None):
         """保存文件系统数据"""
         if fs_data is None:
             fs_data = self.file_system
+
+        if self.journal and fs_data is self.file_system:
+            # 日志模式下完整保存即一次同步合并
+            self.compact_journal(background=False)
+            return
             
         os.makedirs(self.data_dir, exist_ok=True)
         try:
@@ -232,11 +521,12 @@ class FileSystem:
                 shutil.copy2(self.fs_file, backup_file)
             
             # 尝试序列化数据，检查是否有循环引用
-            json_str = json.dumps(fs_data, indent=2, ensure_ascii=False)
+            if fs_data is self.file_system:
+                self._refresh_paths(fs_data['root'])
+            json_str = self._serialize_file_system(dict(fs_data, next_id=self._next_id), indent=2)
             
             # 写入文件
-            with open(self.fs_file, 'w', encoding='utf-8') as f:
-                f.write(json_str)
+            self._write_file_system(json_str)
                 
             # 如果成功，删除备份
             if os.path.exists(backup_file):
@@ -255,24 +545,283 @@ class FileSystem:
                 shutil.copy2(backup_file, self.fs_file)
                 print("已恢复备份文件")
     
+    def _serialize_file_system(self, fs_data: Dict, indent: Optional[int] = None) -> str:
+        return json.dumps(fs_data, indent=indent, ensure_ascii=False)
+
+    def _write_file_system(self, json_str: str):
+        """快照模式下整个写入 filesystem.json"""
+        with open(self.fs_file, 'w', encoding='utf-8') as f:
+            f.write(json_str)
+        self.snapshot_count += 1
+        self.snapshot_bytes += len(json_str.encode('utf-8'))
+
+    @_synchronized
+    def compact_journal(self, background: bool = True):
+        """把内存中的文件系统写成新快照，并丢弃已被快照覆盖的操作日志"""
+        if not self.journal:
+            return
+        try:
+            # 在当前线程序列化，保证快照与日志序号一致；写盘交给后台线程
+            # path 只是派生字段，写盘前统一刷新，加载时会重新计算
+            self._refresh_paths(self.file_system['root'])
+            snapshot = dict(self.file_system, journal_seq=self.journal.seq, next_id=self._next_id)
+            snapshot_json = self._serialize_file_system(snapshot)
+        except (RecursionError, ValueError) as e:
+            print(f"生成文件系统快照失败: {e}")
+            return
+        self.journal.compact(snapshot_json, background)
+
+    def _commit(self, *records: Dict):
+        """
+        持久化一次修改：日志模式下记录立即编码暂存，快照模式下只标记为脏，
+        由保存调度器批量写盘；未启用延迟保存时立即写盘
+        """
+        if self.journal:
+            try:
+                self.journal.stage(list(records))
+            except Exception as e:
+                print(f"写入操作日志失败: {e}")
+                return
+        if self.save_scheduler:
+            self.save_scheduler.mark_dirty()
+            return
+        try:
+            self._flush_pending()
+        except Exception as e:
+            print(f"保存文件系统失败: {e}")
+
+    @_synchronized
+    def _flush_pending(self):
+        """把所有暂存的修改写盘（由保存调度器调用）"""
+        if not self.journal:
+            self.save_file_system()
+            return
+        self.journal.flush()
+        if self.journal.needs_compaction():
+            self.compact_journal()
+
+    def flush(self) -> bool:
+        """立即写出所有尚未保存的修改，关闭窗口和退出程序时调用"""
+        self.system_monitor.save_content_index()
+        self.system_monitor.save_cache_manifest()
+        self.system_monitor.save_access_data()
+        self.system_monitor.access_log_writer.flush()
+        if self.save_scheduler:
+            return self.save_scheduler.flush()
+        return False
+
+    def _apply_record(self, record: Dict):
+        """在内存中的文件系统上重放一条操作日志记录"""
+        op = record.get('op')
+        parent_path = record['parent']
+        parent_node = self._get_node_by_path(parent_path)
+        if not parent_node:
+            raise ValueError(f"父目录不存在: {parent_path}")
+        time = record.get('time')
+        if op == 'add':
+            self._apply_add(parent_node, record['node'], time)
+        elif op == 'remove':
+            self._apply_remove(parent_node, record['name'], record['type'], time)
+        elif op == 'rename':
+            self._apply_rename(parent_node, record['name'], record['type'], record['new_name'], time)
+        elif op == 'update':
+            self._apply_update(parent_node, record['name'], record['type'], record['fields'], time)
+        elif op in ('move', 'copy'):
+            target_node = self._get_node_by_path(record['target'])
+            if not target_node:
+                raise ValueError(f"目标目录不存在: {record['target']}")
+            if op == 'move':
+                self._apply_move(parent_node, record['name'], record['type'], target_node, record['new_name'], time)
+            else:
+                self._apply_copy(parent_node, record['name'], record['type'], target_node, record['new_name'], time)
+        else:
+            raise ValueError(f"未知的操作类型: {op}")
+
+    def _apply_add(self, parent_node: Dict, node: Dict, time: str = None):
+        """把节点（及其子树）加入父目录并登记到索引"""
+        if "children" not in parent_node:
+            parent_node["children"] = []
+        parent_node["children"].append(node)
+        self._index_subtree(node, parent_node)
+        self._link_name(parent_node, node)
+        if time:
+            parent_node["modified"] = time
+        self._notify('add', node)
+
+    def _apply_remove(self, parent_node: Dict, name: str, item_type: str, time: str = None) -> Optional[Dict]:
+        """从父目录移除子项，返回被移除的节点"""
+        child_node = self._get_child(parent_node, name, item_type)
+        if not child_node:
+            return None
+        self._notify('removing', child_node)
+        self._unlink_name(parent_node, child_node)
+        self._detach_from_children(parent_node, child_node)
+        self._unindex_subtree(child_node)
+        if time:
+            parent_node['modified'] = time
+        self._notify('remove', child_node)
+        return child_node
+
+    def _apply_rename(self, parent_node: Dict, old_name: str, item_type: str, new_name: str, time: str) -> bool:
+        """
+        重命名子项：只修改节点名称和父目录的名称索引（O(1)），
+        后代的路径由父节点链接按需计算，不再逐个改写
+        """
+        child_node = self._get_child(parent_node, old_name, item_type)
+        if not child_node:
+            return False
+
+        self._unlink_name(parent_node, child_node)
+        child_node['name'] = new_name
+        child_node['modified'] = time
+        self._link_name(parent_node, child_node)
+
+        if item_type == 'dir':
+            self._invalidate_paths()
+        else:
+            self._path_cache.pop(child_node['id'], None)
+        self.get_node_path(child_node)
+        parent_node["modified"] = time
+        self._notify('rename', child_node)
+        return True
+
+    def _apply_move(self, source_parent: Dict, name: str, item_type: str, target_parent: Dict,
+                    new_name: str, time: str = None) -> Optional[Dict]:
+        """
+        移动子项：从源目录摘下节点、改名后挂到目标目录（只改父节点链接，与子树大小无关）
+        不允许把目录移动到它自己或其后代之下，成功时返回被移动的节点
+        """
+        node = self._get_child(source_parent, name, item_type)
+        if not node or self._is_ancestor_or_self(node, target_parent):
+            return None
+
+        self._notify('moving', node)
+        self._unlink_name(source_parent, node)
+        self._detach_from_children(source_parent, node)
+        node['name'] = new_name
+        if "children" not in target_parent:
+            target_parent["children"] = []
+        target_parent["children"].append(node)
+        self._parents[node['id']] = target_parent['id']
+        self._link_name(target_parent, node)
+
+        if item_type == 'dir':
+            self._invalidate_paths()
+        else:
+            self._path_cache.pop(node['id'], None)
+        self.get_node_path(node)
+        if time:
+            source_parent['modified'] = time
+            target_parent['modified'] = time
+        self._notify('move', node)
+        return node
+
+    def _apply_copy(self, source_parent: Dict, name: str, item_type: str, target_parent: Dict,
+                    new_name: str, time: str = None) -> Optional[Dict]:
+        """复制子项到目标目录，返回新节点"""
+        node = self._get_child(source_parent, name, item_type)
+        if not node:
+            return None
+        clone = self._clone_subtree(node, new_name, time)
+        self._apply_add(target_parent, clone, time)
+        return clone
+
+    def _clone_subtree(self, node: Dict, new_name: str, time: str = None) -> Dict:
+        """
+        写时复制：只新建目录结构的节点，文件节点与原节点引用同一份内容（相同的摘要）
+        之后 write_file 给任一方写入新内容时只改变该节点的摘要，另一方不受影响
+        """
+        def clone_node(source):
+            clone = {key: value for key, value in source.items() if key not in ('id', 'path', 'children')}
+            if time:
+                clone['modified'] = time
+            return clone
+
+        root_clone = clone_node(node)
+        root_clone['name'] = new_name
+        stack = [(node, root_clone)]
+        while stack:
+            source, clone = stack.pop()
+            if source.get('type') != 'dir':
+                continue
+            clone['children'] = []
+            for child in source.get('children', []):
+                child_clone = clone_node(child)
+                clone['children'].append(child_clone)
+                stack.append((child, child_clone))
+        return root_clone
+
+    def _detach_from_children(self, parent_node: Dict, child_node: Dict):
+        """按对象身份从父目录的children列表中移除子项"""
+        children = parent_node['children']
+        for index, child in enumerate(children):
+            if child is child_node:
+                del children[index]
+                break
+
+    def _is_ancestor_or_self(self, node: Dict, other: Dict) -> bool:
+        """node 是否为 other 本身或其祖先（沿父节点链接向上查找，O(深度)）"""
+        node_id = node.get('id')
+        current_id = other.get('id')
+        while current_id is not None:
+            if current_id == node_id:
+                return True
+            current_id = self._parents.get(current_id)
+        return False
+
+    def _apply_update(self, parent_node: Dict, name: str, item_type: str, fields: Dict, time: str = None) -> bool:
+        """更新子项的属性（内容、隐藏状态等）"""
+        child_node = self._get_child(parent_node, name, item_type)
+        if not child_node:
+            return False
+        child_node.update(fields)
+        if time:
+            parent_node['modified'] = time
+        self._notify('update', child_node)
+        return True
+
+    def add_listener(self, listener: Callable[[str, Dict], None]):
+        """
+        注册修改监听器，每次修改目录树后调用 listener(event, node)
+        event 为 add / remove / rename / move / update，node 为受影响的节点（add/remove 时为整棵子树的根）；
+        另外在摘下节点之前发出 removing / moving，此时节点仍在原位置，可沿祖先链扣除其统计，
+        不关心的事件应直接忽略
+        """
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str, Dict], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, event: str, node: Dict):
+        for listener in self._listeners:
+            try:
+                listener(event, node)
+            except Exception as e:
+                print(f"修改监听器执行失败: {e}")
+
+    def get_node_by_id(self, node_id: int) -> Optional[Dict]:
+        """按节点编号查找目录树中的节点"""
+        return self._nodes.get(node_id)
+
+    def iter_ancestors(self, node: Dict):
+        """从父目录开始依次向上返回所有祖先节点"""
+        parent_id = self._parents.get(node.get('id'))
+        while parent_id is not None:
+            parent = self._nodes.get(parent_id)
+            if parent is None:
+                return
+            yield parent
+            parent_id = self._parents.get(parent_id)
+
     def get_current_time(self) -> str:
         """获取当前时间字符串"""
         return datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
     def load_users(self) -> Dict:
-        """加载用户数据"""
-        try:
-            with open(self.users_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                # 确保返回的是字典格式
-                if isinstance(data, dict):
-                    return data
-                else:
-                    print("用户数据格式错误，返回空字典")
-                    return {}
-        except Exception as e:
-            print(f"加载用户数据失败: {e}")
-            return {}
+        """加载用户数据（来自缓存，返回的字典不应修改）"""
+        return self.user_registry.get_users()
     
     def verify_user_password(self, username: str, password: str) -> bool:
         """验证用户密码"""
@@ -291,24 +840,94 @@ class FileSystem:
     
     def check_access_permission(self, current_user: str, target_path: str) -> bool:
         """检查访问权限"""
-        # 管理员可以访问所有路径
-        if self.is_admin(current_user):
-            return True
-            
-        # 用户总是可以访问自己的目录
-        if target_path == f"/home/{current_user}" or target_path.startswith(f"/home/{current_user}/"):
-            return True
-            
-        # 用户总是可以访问共享目录
-        if target_path == "/home/shared" or target_path.startswith("/home/shared/"):
-            return True
-            
-        # 用户总是可以访问home目录（但只能看到自己的目录和共享目录）
-        if target_path == "/home":
-            return True
-            
-        # 其他情况需要密码验证
-        return False
+        return self.permissions.check(current_user, target_path)
+
+    def _access_checker(self, current_user: str) -> Callable[[str], bool]:
+        """返回判断 current_user 能否访问某路径的函数（权限只编译一次，便于批量检查）"""
+        return self.permissions.checker(current_user)
+
+    @_synchronized
+    def set_item_acl(self, path: str, item_name: str, users: List[str], current_user: str = None) -> bool:
+        """
+        设置目录的访问控制列表：users 中的用户可以访问该目录及其所有后代，users 为空时取消
+        只有管理员或目录位于自己主目录之下的用户可以设置
+        """
+        item_path = self._join_path(self._normalize_path(path), item_name)
+        user_home = f"/home/{current_user}"
+        if current_user and not (self.is_admin(current_user) or item_path.startswith(user_home + "/")):
+            return False
+
+        parent_node = self._get_node_by_path(path)
+        if not parent_node or not self._get_child(parent_node, item_name, 'dir'):
+            return False
+
+        time = self.get_current_time()
+        users = sorted(set(users))
+        fields = {'acl': {'users': users} if users else None, 'modified': time}
+        self._apply_update(parent_node, item_name, 'dir', fields, time)
+        if current_user:
+            self.system_monitor.log_file_access(item_path, "set_acl", current_user)
+        self._commit({"op": "update", "parent": path, "name": item_name, "type": "dir",
+                      "fields": fields, "time": time})
+        return True
+
+    def get_item_acl(self, path: str, item_name: str) -> List[str]:
+        """返回目录的访问控制列表中的用户"""
+        parent_node = self._get_node_by_path(path)
+        child_node = self._get_child(parent_node, item_name, 'dir') if parent_node else None
+        if not child_node:
+            return []
+        return list((child_node.get('acl') or {}).get('users', []))
+
+    def get_directory_usage(self, path: str) -> Optional[Dict]:
+        """
+        目录整棵子树的统计（不含目录自身）：files、dirs、size、file_type_stats、user_stats，
+        直接读取增量维护的汇总，目录不存在时返回None
+        """
+        node = self._get_node_by_path(path)
+        usage = self.disk_usage.get(node) if node else None
+        return usage.to_dict() if usage else None
+
+    def search_items(self, query: str, scope_path: str = '/', current_user: str = None,
+                     show_hidden: bool = True):
+        """
+        在 scope_path 之下按名称搜索文件和目录（使用系统监控器的名称索引）
+        结果按 完全匹配、前缀匹配、包含匹配 的顺序逐个返回，调用方可以边搜索边显示；
+        和逐层浏览一样，只返回 current_user 有权访问其所在目录的项目
+        """
+        return self._filter_search_results(self.system_monitor.search_nodes(query), scope_path,
+                                           current_user, show_hidden)
+
+    def search_content(self, query: str, scope_path: str = '/', current_user: str = None,
+                       show_hidden: bool = True, limit: int = None):
+        """
+        在 scope_path 之下按文件内容搜索（全文索引，BM25 排序，双引号括起的部分按短语匹配）
+        与 search_items 一样逐个返回有权访问的文件节点
+        """
+        return self._filter_search_results(self.system_monitor.search_content(query, limit), scope_path,
+                                           current_user, show_hidden)
+
+    def _filter_search_results(self, nodes, scope_path: str, current_user: str, show_hidden: bool):
+        """按搜索范围、访问权限和隐藏状态过滤搜索结果，并刷新结果的 path"""
+        scope_path = self._normalize_path(scope_path)
+        scope_prefix = scope_path.rstrip('/') + '/'
+        can_access = None
+        if current_user and not self.permissions.check_subtree(current_user, scope_path):
+            # 整个搜索范围都可访问时无需逐个检查
+            can_access = self._access_checker(current_user)
+            if not can_access(scope_path):
+                return
+        for node in nodes:
+            item_path = self.get_node_path(node)
+            if not item_path or not item_path.startswith(scope_prefix):
+                continue
+            parent_path = item_path[:item_path.rfind('/')] or '/'
+            if can_access and not can_access(parent_path):
+                continue
+            if not show_hidden and self.system_monitor.is_hidden(node):
+                continue
+            node['path'] = item_path
+            yield node
     
     def is_admin(self, username: str) -> bool:
         """检查用户是否为管理员"""
@@ -322,21 +941,23 @@ class FileSystem:
             print(f"检查管理员权限失败: {e}")
             return False
     
+    @_synchronized
     def create_user_directory(self, username: str) -> bool:
         """为用户创建目录"""
         try:
-            home_dir = self.file_system["root"]["children"]["home"]
-            if username not in home_dir["children"]:
-                home_dir["children"][username] = {
+            home_dir = self._get_node_by_path("/home")
+            if home_dir and not self._get_child(home_dir, username, "dir"):
+                time = self.get_current_time()
+                user_node = {
                     "name": username,
                     "type": "dir",
                     "path": f"/home/{username}",
-                    "created": self.get_current_time(),
-                    "modified": self.get_current_time(),
+                    "created": time,
+                    "modified": time,
                     "children": []
                 }
-                home_dir["modified"] = self.get_current_time()
-                self.save_file_system()
+                self._apply_add(home_dir, user_node, time)
+                self._commit({"op": "add", "parent": "/home", "node": user_node, "time": time})
                 return True
             return False
         except Exception as e:
@@ -356,6 +977,10 @@ class FileSystem:
         
         # Get all children and filter hidden items if needed
         all_children = list(parent_node.get("children", []))
+        # 刷新派生字段 path（目录改名后后代的 path 不会立即改写）
+        dir_path = parent_node['path']
+        for child in all_children:
+            child['path'] = self._join_path(dir_path, child.get('name'))
         if not show_hidden:
             # Filter out hidden items
             visible_children = [child for child in all_children if not child.get('hidden', False)]
@@ -363,6 +988,7 @@ class FileSystem:
         else:
             return all_children
 
+    @_synchronized
     def create_item(self, path: str, item_name: str, item_type: str, content: str = "") -> bool:
         """通用创建文件或目录方法, 自动处理重名"""
         parent_node = self._get_node_by_path(path)
@@ -370,14 +996,7 @@ class FileSystem:
             return False
 
         # Auto-rename if an item with the same name and type exists
-        final_name = item_name
-        counter = 1
-        while self._find_child_in_node(parent_node, final_name, item_type) is not None:
-            base_name, ext = os.path.splitext(item_name)
-            final_name = f"{base_name} - 副本" if counter == 1 else f"{base_name} - 副本{counter}"
-            if ext:
-                final_name += ext
-            counter += 1
+        final_name = self._unique_name(parent_node, item_name, item_type)
         
         new_item_path = os.path.join(path, final_name).replace('\\', '/')
         if new_item_path.startswith('//'):
@@ -393,14 +1012,26 @@ class FileSystem:
         if item_type == 'dir':
             new_item["children"] = []
         else: # file
-            new_item["content"] = content
+            new_item["blob"] = self.blob_store.put(content)
             new_item["size"] = len(content)
         
-        parent_node["children"].append(new_item)
-        parent_node["modified"] = self.get_current_time()
-        self.save_file_system()
+        time = self.get_current_time()
+        self._apply_add(parent_node, new_item, time)
+        self._commit({"op": "add", "parent": path, "node": new_item, "time": time})
         return True
 
+    def _unique_name(self, parent_node: Dict, item_name: str, item_type: str) -> str:
+        """目标目录中已有同名同类型项目时，生成“xxx - 副本N”形式的新名称"""
+        final_name = item_name
+        counter = 1
+        while self._get_child(parent_node, final_name, item_type) is not None:
+            base_name, ext = os.path.splitext(item_name)
+            final_name = f"{base_name} - 副本" if counter == 1 else f"{base_name} - 副本{counter}"
+            if ext:
+                final_name += ext
+            counter += 1
+        return final_name
+
     def create_file(self, path: str, filename: str, content: str = "", current_user: str = None) -> bool:
         success = self.create_item(path, filename, "file", content)
         if success and current_user:
@@ -409,6 +1040,7 @@ class FileSystem:
             self.system_monitor.log_file_access(f"{path}/{filename}", "create", current_user, False)
         return success
 
+    @_synchronized
     def create_file_with_content(self, file_path: str, content: Dict, current_user: str = None) -> bool:
         """创建带有内容的文件"""
         try:
@@ -427,7 +1059,7 @@ class FileSystem:
                 return False
             
             # 检查是否已存在
-            existing = self._find_child_in_node(parent_node, filename, "file")
+            existing = self._get_child(parent_node, filename, "file")
             if existing:
                 return False
             
@@ -436,7 +1068,7 @@ class FileSystem:
                 "name": filename,
                 "type": "file",
                 "path": file_path,
-                "content": content.get("content", ""),
+                "blob": self.blob_store.put(content.get("content", "")),
                 "size": content.get("size", 0),
                 "created": self.get_current_time(),
                 "modified": self.get_current_time(),
@@ -445,16 +1077,14 @@ class FileSystem:
             
             # 添加特殊属性
             for key, value in content.items():
-                if key not in ["name", "type", "path", "content", "size", "created", "modified", "hidden"]:
+                if key not in ["id", "name", "type", "path", "content", "blob", "size", "created", "modified", "hidden"]:
                     file_node[key] = value
             
             # 添加到父节点
-            if "children" not in parent_node:
-                parent_node["children"] = []
-            parent_node["children"].append(file_node)
+            self._apply_add(parent_node, file_node)
             
             # 保存文件系统
-            self.save_file_system()
+            self._commit({"op": "add", "parent": parent_path, "node": file_node})
             return True
             
         except Exception as e:
@@ -469,6 +1099,7 @@ class FileSystem:
             self.system_monitor.log_file_access(f"{path}/{dirname}", "create_dir", current_user, False)
         return success
 
+    @_synchronized
     def delete_item(self, path: str, item_name: str, item_type: str, current_user: str = None) -> bool:
         if not self.check_access_permission(current_user, path): 
             if current_user:
@@ -481,67 +1112,39 @@ class FileSystem:
                 self.system_monitor.log_file_access(f"{path}/{item_name}", "delete", current_user, False)
             return False
         
-        child_info = self._find_child_in_node(parent_node, item_name, item_type)
-        if not child_info:
+        child_node = self._get_child(parent_node, item_name, item_type)
+        if not child_node:
             if current_user:
                 self.system_monitor.log_file_access(f"{path}/{item_name}", "delete", current_user, False)
             return False
         
-        index, child_node = child_info
-        
         # 记录删除日志
         if current_user:
             self.system_monitor.log_file_access(f"{path}/{item_name}", "delete", current_user)
         
-        # 如果是文件，从缓存中删除
-        if item_type == "file":
-            file_path = f"{path}/{item_name}"
-            if file_path in self.system_monitor.file_cache:
-                self.system_monitor.current_cache_size -= self.system_monitor.file_cache[file_path]['size']
-                del self.system_monitor.file_cache[file_path]
-        
-        del parent_node['children'][index]
-        parent_node['modified'] = self.get_current_time()
-        self.save_file_system()
+        time = self.get_current_time()
+        self._apply_remove(parent_node, item_name, item_type, time)
+        self._commit({"op": "remove", "parent": path, "name": item_name, "type": item_type, "time": time})
         return True
 
+    @_synchronized
     def rename_item(self, path: str, old_name: str, new_name: str, item_type: str, current_user: str = None) -> bool:
         if not self.check_access_permission(current_user, path): return False
         
         parent_node = self._get_node_by_path(path)
         
         # Check if new name for the same type already exists
-        if self._find_child_in_node(parent_node, new_name, item_type):
+        if self._get_child(parent_node, new_name, item_type):
             return False # Or handle with auto-renaming
             
-        child_info = self._find_child_in_node(parent_node, old_name, item_type)
-        if not child_info:
+        time = self.get_current_time()
+        if not self._apply_rename(parent_node, old_name, item_type, new_name, time):
             return False
-            
-        _, child_node = child_info
-        
-        # Update name and path
-        child_node['name'] = new_name
-        child_node['modified'] = self.get_current_time()
-        
-        # Important: must also recursively update path for all children if it's a directory
-        def update_paths_recursive(node, old_base, new_base):
-            node['path'] = node['path'].replace(old_base, new_base, 1)
-            if node['type'] == 'dir':
-                for child in node.get('children', []):
-                    update_paths_recursive(child, old_base, new_base)
-
-        old_item_path = child_node['path']
-        new_item_path = os.path.join(path, new_name).replace('\\', '/')
-        if new_item_path.startswith('//'):
-            new_item_path = new_item_path[1:]
-
-        update_paths_recursive(child_node, old_item_path, new_item_path)
-        
-        parent_node["modified"] = self.get_current_time()
-        self.save_file_system()
+        self._commit({"op": "rename", "parent": path, "name": old_name, "type": item_type,
+                      "new_name": new_name, "time": time})
         return True
     
+    @_synchronized
     def write_file(self, path: str, filename: str, content: str, current_user: str = None) -> bool:
         # 添加调试信息
         print(f"write_file调试信息:")
@@ -563,28 +1166,26 @@ class FileSystem:
                 self.system_monitor.log_file_access(f"{path}/{filename}", "write", current_user, False)
             return False
         
-        child_info = self._find_child_in_node(parent_node, filename, 'file')
-        if not child_info:
+        if not self._get_child(parent_node, filename, 'file'):
             print(f"  文件节点未找到")
             if current_user:
                 self.system_monitor.log_file_access(f"{path}/{filename}", "write", current_user, False)
             return False
         
-        _, child_node = child_info
-        child_node['content'] = content
-        child_node['size'] = len(content)
-        child_node['modified'] = self.get_current_time()
-        parent_node['modified'] = self.get_current_time()
+        time = self.get_current_time()
+        fields = {'blob': self.blob_store.put(content), 'size': len(content), 'modified': time}
+        self._apply_update(parent_node, filename, 'file', fields, time)
         
         # 记录写入日志
         if current_user:
             self.system_monitor.log_file_access(f"{path}/{filename}", "write", current_user)
         
-        # 更新缓存
-        self.system_monitor.cache_file_content(f"{path}/{filename}", content)
+        # 更新缓存（新内容的摘要作为缓存版本）
+        self.system_monitor.cache_file_content(self._get_child(parent_node, filename, 'file'), content)
         
         print(f"  准备保存到JSON文件")
-        self.save_file_system()
+        self._commit({"op": "update", "parent": path, "name": filename, "type": "file",
+                      "fields": fields, "time": time})
         print(f"  保存完成")
         return True
     
@@ -595,11 +1196,6 @@ class FileSystem:
             if current_user:
                 self.system_monitor.log_file_access(file_path, "read", current_user)
             
-            # 先尝试从缓存获取
-            cached_content = self.system_monitor.get_cached_content(file_path)
-            if cached_content is not None:
-                return cached_content
-            
             # 解析路径
             path_parts = file_path.split('/')
             filename = path_parts[-1]
@@ -619,17 +1215,25 @@ class FileSystem:
                 return None
             
             # 查找文件
-            result = self._find_child_in_node(parent_node, filename, "file")
-            if not result:
+            file_node = self._get_child(parent_node, filename, "file")
+            if not file_node:
+                if current_user:
+                    self.system_monitor.log_file_access(file_path, "read", current_user, False)
+                return None
+
+            # 通过权限检查并找到节点后才查询缓存（缓存按节点编号和内容摘要区分）
+            cached_content = self.system_monitor.get_cached_content(file_node)
+            if cached_content is not None:
+                return cached_content
+
+            content = self._read_content(file_node)
+            if content is None:
                 if current_user:
                     self.system_monitor.log_file_access(file_path, "read", current_user, False)
                 return None
-            
-            _, file_node = result
-            content = file_node.get("content", "")
             
             # 缓存文件内容
-            self.system_monitor.cache_file_content(file_path, content)
+            self.system_monitor.cache_file_content(file_node, content)
             
             return content
             
@@ -657,11 +1261,9 @@ class FileSystem:
                 return None
             
             # 查找项目
-            result = self._find_child_in_node(parent_node, item_name)
-            if not result:
-                return None
-            
-            _, item_node = result
+            item_node = self._get_child(parent_node, item_name)
+            if item_node:
+                self.get_node_path(item_node)
             return item_node
             
         except Exception as e:
@@ -672,18 +1274,6 @@ class FileSystem:
         """读取文件内容（别名方法）"""
         return self.get_file_content(file_path, current_user)
 
-    def _recursively_update_paths(self, node: Dict, new_base_path: str):
-        """递归更新节点及其所有子节点的路径"""
-        node['path'] = os.path.join(new_base_path, node['name']).replace('\\', '/')
-        if node['path'].startswith('//'):
-            node['path'] = node['path'][1:]
-        
-        node['modified'] = self.get_current_time()
-        
-        if node['type'] == 'dir':
-            for child in node.get('children', []):
-                self._recursively_update_paths(child, node['path'])
-
     def copy_items(self, source_path: str, items: List[Dict], current_user: str = None) -> bool:
         """将项目复制到剪贴板，items是包含name和type的字典列表"""
         if not self.check_access_permission(current_user, source_path):
@@ -697,11 +1287,11 @@ class FileSystem:
         self.clipboard['source_path'] = source_path
         self.clipboard['items'] = []
 
+        # 剪贴板只保存节点引用，粘贴时才生成副本
         for item_info in items:
-            child_info = self._find_child_in_node(source_node, item_info['name'], item_info['type'])
-            if child_info:
-                _, child_node = child_info
-                self.clipboard['items'].append(copy.deepcopy(child_node))
+            child_node = self._get_child(source_node, item_info['name'], item_info['type'])
+            if child_node:
+                self.clipboard['items'].append(child_node)
         
         return len(self.clipboard['items']) > 0
 
@@ -716,6 +1306,7 @@ class FileSystem:
             return True
         return False
 
+    @_synchronized
     def paste_items(self, target_path: str, current_user: str = None) -> bool:
         """粘贴剪贴板中的项目"""
         if not self.check_access_permission(current_user, target_path):
@@ -728,54 +1319,54 @@ class FileSystem:
             return False
 
         is_cut = self.clipboard['type'] == 'cut'
-        source_path = self.clipboard['source_path']
+        time = self.get_current_time()
+        records = []
 
-        for item_snapshot in self.clipboard['items']:
-            original_name = item_snapshot['name']
-            item_type = item_snapshot['type']
-            final_name = original_name
-            
-            # Auto-rename if an item with the same name and type exists in the target
-            counter = 1
-            while self._find_child_in_node(target_node, final_name, item_type):
-                base_name, ext = os.path.splitext(original_name)
-                final_name = f"{base_name} - 副本" if counter == 1 else f"{base_name} - 副本{counter}"
-                if ext:
-                    final_name += ext
-                counter += 1
-            
-            # Update the name and recursively update all paths inside the snapshot
-            item_snapshot['name'] = final_name
-            self._recursively_update_paths(item_snapshot, target_path)
+        for node in self.clipboard['items']:
+            # 剪贴板中是节点引用：按节点当前所在的目录操作，复制后已被删除的节点跳过
+            if not self._is_indexed(node):
+                continue
+            source_node = self._nodes.get(self._parents.get(node['id']))
+            if source_node is None:
+                continue
+            item_name, item_type = node['name'], node['type']
+            source_path = self._path_of(source_node)
 
-            # Add the (potentially renamed) item to the target node
-            target_node['children'].append(item_snapshot)
+            if is_cut:
+                # 剪切后粘贴就是移动：直接把原节点挂到目标目录下，不复制子树
+                if source_node is target_node:
+                    continue
+                final_name = self._unique_name(target_node, item_name, item_type)
+                if self._apply_move(source_node, item_name, item_type, target_node, final_name, time):
+                    records.append({"op": "move", "parent": source_path, "name": item_name, "type": item_type,
+                                    "target": target_path, "new_name": final_name, "time": time})
+                continue
 
-        target_node['modified'] = self.get_current_time()
+            # Auto-rename if an item with the same name and type exists in the target
+            final_name = self._unique_name(target_node, item_name, item_type)
+            records.append(self._copy_node(node, source_node, source_path, target_node, target_path,
+                                           final_name, time))
 
-        # If it was a 'cut', remove the originals from the source
         if is_cut:
-            source_node = self._get_node_by_path(source_path)
-            if source_node:
-                items_to_delete = self.clipboard['items'] # Use the original item info from clipboard
-                
-                indices_to_delete = []
-                for item_to_delete in items_to_delete:
-                    # We need the original name to find it in the source
-                    child_info = self._find_child_in_node(source_node, item_to_delete['name'], item_to_delete['type'])
-                    if child_info:
-                        indices_to_delete.append(child_info[0])
-                
-                # Delete by index in reverse order to avoid index shifting issues
-                for index in sorted(indices_to_delete, reverse=True):
-                    del source_node['children'][index]
-
-                source_node['modified'] = self.get_current_time()
             self.clear_clipboard()
-
-        self.save_file_system()
+        else:
+            target_node['modified'] = time
+        self._commit(*records)
         return True
 
+    def _copy_node(self, node: Dict, source_node: Dict, source_path: str, target_node: Dict,
+                   target_path: str, new_name: str, time: str) -> Dict:
+        """把节点的写时复制副本加入目标目录，返回对应的操作日志记录"""
+        item_type = node['type']
+        clone = self._clone_subtree(node, new_name, time)
+        self._apply_add(target_node, clone, time)
+        if self._get_child(source_node, node['name'], item_type) is node:
+            # 日志只记录复制关系，重放时从源节点重新生成副本，不必序列化整棵子树
+            return {"op": "copy", "parent": source_path, "name": node['name'], "type": item_type,
+                    "target": target_path, "new_name": new_name, "time": time}
+        # 同名重复项无法按名称定位，只能记录完整节点
+        return {"op": "add", "parent": target_path, "node": clone, "time": time}
+
     def clear_clipboard(self):
         self.clipboard = {'type': None, 'items': [], 'source_path': None}
 
@@ -791,22 +1382,30 @@ class FileSystem:
     def get_full_tree(self):
         """返回整个文件系统的树状结构数据"""
         # The structure is already a tree
-        return self.file_system 
+        self._refresh_paths(self.file_system['root'])
+        return self.file_system
+
+    def get_directory_tree(self, path: str) -> Optional[Dict]:
+        """返回某个目录的子树（刷新其中所有节点的路径），供界面遍历显示"""
+        node = self._get_node_by_path(path)
+        if node:
+            self._refresh_paths(node)
+        return node
 
+    @_synchronized
     def set_item_hidden(self, path: str, item_name: str, item_type: str, hidden: bool, current_user: str = None) -> bool:
         """设置文件或文件夹的隐藏状态"""
         if not self.check_access_permission(current_user, path): return False
         
         parent_node = self._get_node_by_path(path)
-        child_info = self._find_child_in_node(parent_node, item_name, item_type)
-        if not child_info:
+        if not self._get_child(parent_node, item_name, item_type):
             return False
             
-        _, child_node = child_info
-        child_node['hidden'] = hidden
-        child_node['modified'] = self.get_current_time()
-        parent_node['modified'] = self.get_current_time()
-        self.save_file_system()
+        time = self.get_current_time()
+        fields = {'hidden': hidden, 'modified': time}
+        self._apply_update(parent_node, item_name, item_type, fields, time)
+        self._commit({"op": "update", "parent": path, "name": item_name, "type": item_type,
+                      "fields": fields, "time": time})
         return True
 
     def is_item_hidden(self, path: str, item_name: str, item_type: str) -> bool:
@@ -815,11 +1414,10 @@ class FileSystem:
         if not parent_node:
             return False
             
-        child_info = self._find_child_in_node(parent_node, item_name, item_type)
-        if not child_info:
+        child_node = self._get_child(parent_node, item_name, item_type)
+        if not child_node:
             return False
             
-        _, child_node = child_info
         return child_node.get('hidden', False)
 
     def hide_item(self, path: str, item_name: str, item_type: str, current_user: str = None) -> bool:
@@ -830,6 +1428,7 @@ class FileSystem:
         """显示文件或文件夹（取消隐藏）"""
         return self.set_item_hidden(path, item_name, item_type, False, current_user)
 
+    @_synchronized
     def copy_item(self, source_path: str, target_path: str, current_user: str = None) -> bool:
         """复制单个项目"""
         try:
@@ -837,6 +1436,9 @@ class FileSystem:
             source_info = self.get_item_info(source_path, current_user)
             if not source_info:
                 return False
+            source_node = self._nodes.get(self._parents.get(source_info.get('id')))
+            if source_node is None:
+                return False
             
             # 解析目标路径
             target_parts = target_path.split('/')
@@ -852,43 +1454,67 @@ class FileSystem:
             if not target_parent_node:
                 return False
             
-            # 创建新的项目节点
-            new_item = copy.deepcopy(source_info)
-            new_item["name"] = target_name
-            new_item["path"] = target_path
-            new_item["modified"] = self.get_current_time()
-            
-            # 如果是目录，递归更新子项目的路径
-            if new_item["type"] == "dir":
-                self._recursively_update_paths(new_item, target_path)
-            
-            # 添加到目标父节点
-            if "children" not in target_parent_node:
-                target_parent_node["children"] = []
-            target_parent_node["children"].append(new_item)
+            # 创建写时复制的副本并添加到目标父节点（加入目录树时分配新编号并刷新路径）
+            record = self._copy_node(source_info, source_node, self._path_of(source_node), target_parent_node,
+                                     target_parent_path, target_name, self.get_current_time())
             
             # 保存文件系统
-            self.save_file_system()
+            self._commit(record)
             return True
             
         except Exception as e:
             print(f"复制项目失败: {e}")
             return False
 
-    def move_item(self, source_path: str, target_path: str, current_user: str = None) -> bool:
-        """移动单个项目"""
+    @_synchronized
+    def move_item(self, source_path: str, target_path: str, current_user: str = None, item_type: str = None) -> bool:
+        """
+        移动单个项目到 target_path（目标的完整路径，可同时改名）
+        只把节点从源目录摘下挂到目标目录，不复制内容；目标已有同名项目时自动重命名
+        """
         try:
-            # 先复制
-            if not self.copy_item(source_path, target_path, current_user):
+            source_parent_path, source_name = self._split_path(source_path)
+            target_parent_path, target_name = self._split_path(target_path)
+            target_name = target_name or source_name
+
+            # 检查源目录和目标目录的权限
+            if current_user and not (self.check_access_permission(current_user, source_parent_path)
+                                     and self.check_access_permission(current_user, target_parent_path)):
+                self.system_monitor.log_file_access(source_path, "move", current_user, False)
                 return False
-            
-            # 再删除源项目
-            source_parts = source_path.split('/')
-            source_name = source_parts[-1]
-            source_parent_path = '/'.join(source_parts[:-1]) if len(source_parts) > 1 else '/'
-            
-            return self.delete_item(source_parent_path, source_name, "file" if source_path.endswith('.txt') else "dir", current_user)
+
+            source_parent = self._get_node_by_path(source_parent_path)
+            target_parent = self._get_node_by_path(target_parent_path)
+            if not source_parent or not target_parent:
+                return False
+
+            # 类型取自节点本身，而不是根据扩展名猜测
+            node = self._get_child(source_parent, source_name, item_type)
+            if not node:
+                return False
+            item_type = node['type']
+            if source_parent is target_parent and target_name == source_name:
+                return True
+
+            final_name = self._unique_name(target_parent, target_name, item_type)
+            time = self.get_current_time()
+            if not self._apply_move(source_parent, source_name, item_type, target_parent, final_name, time):
+                if current_user:
+                    self.system_monitor.log_file_access(source_path, "move", current_user, False)
+                return False
+
+            if current_user:
+                self.system_monitor.log_file_access(source_path, "move", current_user)
+            self._commit({"op": "move", "parent": source_parent_path, "name": source_name, "type": item_type,
+                          "target": target_parent_path, "new_name": final_name, "time": time})
+            return True
             
         except Exception as e:
             print(f"移动项目失败: {e}")
-            return False 
\ No newline at end of file
+            return False
+
+    def _split_path(self, item_path: str) -> Tuple[str, str]:
+        """把路径拆分为（父目录路径，名称）"""
+        item_path = self._normalize_path(item_path)
+        parent_path, _, name = item_path.rpartition('/')
+        return parent_path or '/', name
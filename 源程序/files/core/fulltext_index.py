@@ -0,0 +1,185 @@
+##########################################
+#            全文索引模块
+#             作者：李嘉
+#           学号：3123009043
+#          班级：23人工智能1班
+#         指导教师：苏畅、李剑锋
+###########################################
+"""
+文件内容的全文倒排索引
+中文按相邻两个字切分（二元组），英文和数字按单词切分，记录每个词出现的位置，
+查询按 BM25 打分排序，双引号括起的部分作为短语，要求各词连续出现
+"""
+
+import re
+import math
+from typing import Dict, List, Optional, Tuple
+
+_CJK = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'  # 中日韩统一表意文字
+_TOKEN_RE = re.compile(f'[{_CJK}]+|[^\\W{_CJK}]+')
+_CJK_RE = re.compile(f'[{_CJK}]')
+_PHRASE_RE = re.compile(r'"([^"]*)"')
+
+
+def tokenize(text: str) -> List[Tuple[str, int]]:
+    """把文本切分为 (词, 位置) 列表：中文连续片段切成二元组，其他按单词"""
+    tokens = []
+    position = 0
+    for match in _TOKEN_RE.finditer(text.lower()):
+        run = match.group()
+        if _CJK_RE.match(run):
+            if len(run) == 1:
+                tokens.append((run, position))
+                position += 1
+            else:
+                for i in range(len(run) - 1):
+                    tokens.append((run[i:i + 2], position))
+                    position += 1
+        else:
+            tokens.append((run, position))
+            position += 1
+    return tokens
+
+
+class FullTextIndex:
+    """以文档编号（文件节点编号）为键的倒排索引"""
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, int]] = {}       # 词 -> {文档编号: 词频}
+        self._doc_terms: Dict[int, Dict[str, List[int]]] = {} # 文档编号 -> {词: 出现位置}
+        self._doc_lengths: Dict[int, int] = {}
+        self._doc_blobs: Dict[int, Optional[str]] = {}        # 文档编号 -> 建索引时的内容摘要
+        self._blob_docs: Dict[str, int] = {}                  # 内容摘要 -> 任一使用该内容的文档
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._doc_terms
+
+    def doc_ids(self) -> List[int]:
+        return list(self._doc_terms)
+
+    def blob_of(self, doc_id: int) -> Optional[str]:
+        return self._doc_blobs.get(doc_id)
+
+    def terms_for_blob(self, blob: str) -> Optional[Dict[str, List[int]]]:
+        """已有文档使用同一内容时直接复用它的切分结果（复制的文件无需重新读取和切分）"""
+        doc_id = self._blob_docs.get(blob)
+        if doc_id is None or self._doc_blobs.get(doc_id) != blob:
+            return None
+        return self._doc_terms.get(doc_id)
+
+    @staticmethod
+    def analyze(text: str) -> Dict[str, List[int]]:
+        terms: Dict[str, List[int]] = {}
+        for term, position in tokenize(text):
+            terms.setdefault(term, []).append(position)
+        return terms
+
+    def add_document(self, doc_id: int, terms: Dict[str, List[int]], blob: Optional[str] = None):
+        """登记文档（terms 由 analyze 得到，视为只读，可在内容相同的文档间共享）"""
+        if doc_id in self._doc_terms:
+            self.remove_document(doc_id)
+        self._doc_terms[doc_id] = terms
+        length = sum(len(positions) for positions in terms.values())
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+        self._doc_blobs[doc_id] = blob
+        if blob is not None:
+            self._blob_docs[blob] = doc_id
+        for term, positions in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = len(positions)
+
+    def remove_document(self, doc_id: int):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(doc_id, 0)
+        blob = self._doc_blobs.pop(doc_id, None)
+        if blob is not None and self._blob_docs.get(blob) == doc_id:
+            del self._blob_docs[blob]
+        for term in terms:
+            docs = self._postings.get(term)
+            if docs is None:
+                continue
+            docs.pop(doc_id, None)
+            if not docs:
+                del self._postings[term]
+
+    def _expand_term(self, term: str) -> List[str]:
+        """单个汉字在索引中只出现在二元组里，查询时展开为包含它的所有词"""
+        if len(term) == 1 and _CJK_RE.match(term):
+            return [indexed for indexed in self._postings if term in indexed]
+        return [term] if term in self._postings else []
+
+    def _has_phrase(self, doc_id: int, phrase: List[Tuple[str, int]]) -> bool:
+        """文档中是否按查询中的相对位置连续出现短语的所有词"""
+        terms = self._doc_terms[doc_id]
+        first_term, first_offset = phrase[0]
+        rest = []
+        for term, offset in phrase[1:]:
+            if term not in terms:
+                return False
+            rest.append((set(terms[term]), offset - first_offset))
+        for start in terms.get(first_term, ()):
+            if all(start + delta in positions for positions, delta in rest):
+                return True
+        return False
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        BM25 排序查询，返回 (文档编号, 得分) 列表
+        双引号括起的短语必须完整出现，其余的词只影响得分
+        """
+        phrases = [tokenize(phrase) for phrase in _PHRASE_RE.findall(query)]
+        phrases = [phrase for phrase in phrases if phrase]
+        terms = {term for term, _ in tokenize(_PHRASE_RE.sub(' ', query))}
+        for phrase in phrases:
+            terms.update(term for term, _ in phrase)
+        if not terms or not self._doc_terms:
+            return []
+
+        doc_count = len(self._doc_terms)
+        avg_length = self._total_length / doc_count or 1.0
+        scores: Dict[int, float] = {}
+        for query_term in terms:
+            for term in self._expand_term(query_term):
+                docs = self._postings[term]
+                idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, tf in docs.items():
+                    norm = self.K1 * (1 - self.B + self.B * self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.K1 + 1) / (tf + norm)
+
+        if phrases:
+            scores = {doc_id: score for doc_id, score in scores.items()
+                      if all(self._has_phrase(doc_id, phrase) for phrase in phrases)}
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit else ranked
+
+    def to_dict(self) -> Dict:
+        """序列化：内容相同的文档只保存一份切分结果（没有内容摘要的文档不保存，下次重新建立）"""
+        docs = {}
+        blob_terms = {}
+        for doc_id, terms in self._doc_terms.items():
+            blob = self._doc_blobs.get(doc_id)
+            if blob is None:
+                continue
+            docs[str(doc_id)] = blob
+            blob_terms.setdefault(blob, terms)
+        return {'version': 1, 'docs': docs, 'terms': blob_terms}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'FullTextIndex':
+        index = cls()
+        if data.get('version') != 1:
+            return index
+        blob_terms = data.get('terms', {})
+        for doc_id, blob in data.get('docs', {}).items():
+            if blob in blob_terms:
+                index.add_document(int(doc_id), blob_terms[blob], blob)
+        return index
@@ -0,0 +1,177 @@
+##########################################
+#            操作日志（预写日志）模块
+#             作者：李嘉
+#           学号：3123009043
+#          班级：23人工智能1班
+#         指导教师：苏畅、李剑锋
+###########################################
+"""
+文件系统的追加式操作日志
+每次修改只向日志末尾追加一条JSON记录，启动时在快照之上重放，
+日志超过阈值后由后台线程把快照写回 filesystem.json 并丢弃旧日志
+"""
+
+import os
+import json
+import threading
+from typing import Dict, Iterator, List, Optional
+
+
+class FileSystemJournal:
+    """追加式操作日志（JSON Lines格式）"""
+
+    def __init__(self, fs_file: str, compact_threshold: int = 4 * 1024 * 1024, fsync: bool = False):
+        self.fs_file = fs_file
+        self.journal_file = os.path.splitext(fs_file)[0] + '.journal'
+        # 正在合并的旧日志段，合并完成前启动时仍需重放
+        self.compacting_file = self.journal_file + '.compacting'
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+
+        self.seq = 0           # 最后一条记录的序号
+        self.size = 0          # 当前日志段的字节数
+        self.corrupted = False # 重放时是否遇到损坏的记录
+        # 统计信息
+        self.bytes_written = 0    # 追加到日志的字节数
+        self.snapshot_count = 0   # 写出的快照数
+        self.snapshot_bytes = 0   # 写出的快照字节数
+        self._fp = None
+        self._pending: List[bytes] = []  # 已编码但尚未写盘的记录（批量提交）
+        self._lock = threading.Lock()
+        self._compaction_thread: Optional[threading.Thread] = None
+
+    def read_records(self, after_seq: int = 0) -> Iterator[Dict]:
+        """按顺序读出序号大于after_seq的记录，遇到损坏的行（写入中途崩溃）即停止"""
+        if os.path.exists(self.journal_file):
+            self.size = os.path.getsize(self.journal_file)
+        for path in (self.compacting_file, self.journal_file):
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                for line_no, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        print(f"操作日志 {os.path.basename(path)} 第{line_no}行已损坏，忽略其后的记录")
+                        self.corrupted = True
+                        return
+                    seq = record.get('seq', 0)
+                    self.seq = max(self.seq, seq)
+                    if seq > after_seq:
+                        yield record
+
+    def stage(self, records: List[Dict]) -> int:
+        """
+        为记录分配序号并立即编码，暂存在内存中等待 flush
+        立即编码保证记录反映的是提交时的状态，返回编码后的字节数
+        """
+        if not records:
+            return 0
+        lines = []
+        with self._lock:
+            for record in records:
+                self.seq += 1
+                record['seq'] = self.seq
+                lines.append(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+            data = ('\n'.join(lines) + '\n').encode('utf-8')
+            self._pending.append(data)
+        return len(data)
+
+    def flush(self) -> int:
+        """把暂存的记录一次性写入日志文件，返回写入的字节数"""
+        with self._lock:
+            if not self._pending:
+                return 0
+            data = b''.join(self._pending)
+            self._pending = []
+            fp = self._open()
+            fp.write(data)
+            fp.flush()
+            if self.fsync:
+                os.fsync(fp.fileno())
+            self.size += len(data)
+            self.bytes_written += len(data)
+        return len(data)
+
+    def append(self, records: List[Dict]) -> int:
+        """追加记录并立即写盘，返回写入的字节数"""
+        self.stage(records)
+        return self.flush()
+
+    def needs_compaction(self) -> bool:
+        """日志是否已超过合并阈值（且当前没有正在进行的合并）"""
+        return self.size >= self.compact_threshold and not self.is_compacting()
+
+    def is_compacting(self) -> bool:
+        return self._compaction_thread is not None and self._compaction_thread.is_alive()
+
+    def compact(self, snapshot_json: str, background: bool = True):
+        """
+        用已序列化的快照替换 filesystem.json 并丢弃已被快照覆盖的日志
+        snapshot_json 必须在调用线程中生成，保证与日志序号一致
+        """
+        self.wait_for_compaction()
+        self.flush()
+        self._rotate()
+        if background:
+            self._compaction_thread = threading.Thread(
+                target=self._write_snapshot, args=(snapshot_json,),
+                name='journal-compaction', daemon=True)
+            self._compaction_thread.start()
+        else:
+            self._write_snapshot(snapshot_json)
+
+    def wait_for_compaction(self):
+        """等待后台合并结束"""
+        if self._compaction_thread is not None:
+            self._compaction_thread.join()
+            self._compaction_thread = None
+
+    def close(self):
+        self.flush()
+        self.wait_for_compaction()
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+    def _open(self):
+        if self._fp is None:
+            os.makedirs(os.path.dirname(self.journal_file) or '.', exist_ok=True)
+            self._fp = open(self.journal_file, 'ab')
+        return self._fp
+
+    def _rotate(self):
+        """把当前日志段移到合并段，之后的记录写入新的日志段"""
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+        if not os.path.exists(self.journal_file):
+            self.size = 0
+            return
+        if os.path.exists(self.compacting_file):
+            # 上一次合并未完成（例如进程崩溃），把当前日志接到它后面
+            with open(self.journal_file, 'rb') as src, open(self.compacting_file, 'ab') as dst:
+                dst.write(src.read())
+            os.remove(self.journal_file)
+        else:
+            os.replace(self.journal_file, self.compacting_file)
+        self.size = 0
+
+    def _write_snapshot(self, snapshot_json: str):
+        tmp_file = self.fs_file + '.tmp'
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(snapshot_json)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.fs_file)
+            self.snapshot_count += 1
+            self.snapshot_bytes += os.path.getsize(self.fs_file)
+            if os.path.exists(self.compacting_file):
+                os.remove(self.compacting_file)
+        except Exception as e:
+            # 合并段保留在磁盘上，下次启动时仍会被重放
+            print(f"合并操作日志失败: {e}")
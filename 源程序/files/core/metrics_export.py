@@ -0,0 +1,179 @@
+##########################################
+#            监控指标导出模块
+#             作者：李嘉
+#           学号：3123009043
+#          班级：23人工智能1班
+#         指导教师：苏畅、李剑锋
+###########################################
+"""
+以 Prometheus 文本格式（text/plain; version=0.0.4）导出监控指标
+可选的本机 HTTP 服务（GET /metrics）和定时写出的指标文件（可供 node_exporter 的 textfile 收集器读取）
+都在后台线程中运行；指标只读取各组件已维护的计数器，不遍历目录树，也不测量 CPU 使用率
+"""
+
+import os
+import math
+import atexit
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+Sample = Tuple[Dict[str, str], float]  # (标签, 值)
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+class MetricsText:
+    """按指标族收集样本并生成文本格式"""
+
+    def __init__(self, prefix: str = ''):
+        self.prefix = prefix
+        self._families: List[Tuple[str, str, str, List[Tuple[str, Dict[str, str], float]]]] = []
+
+    def add(self, name: str, metric_type: str, help_text: str, samples: List[Sample], suffix: str = ''):
+        """添加一个指标族；suffix 用于 summary 的 _sum/_count 等附属样本（与主样本放在同一族中）"""
+        full_name = self.prefix + name
+        for family_name, _, _, family_samples in self._families:
+            if family_name == full_name:
+                family_samples.extend((suffix, labels, value) for labels, value in samples)
+                return
+        self._families.append((full_name, metric_type, help_text,
+                               [(suffix, labels, value) for labels, value in samples]))
+
+    def gauge(self, name: str, help_text: str, value: float, labels: Optional[Dict[str, str]] = None):
+        self.add(name, 'gauge', help_text, [(labels or {}, value)])
+
+    def counter(self, name: str, help_text: str, value: float, labels: Optional[Dict[str, str]] = None):
+        self.add(name, 'counter', help_text, [(labels or {}, value)])
+
+    def render(self) -> str:
+        lines = []
+        for name, metric_type, help_text, samples in self._families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for suffix, labels, value in samples:
+                label_text = ','.join(f'{key}="{_escape_label(label)}"' for key, label in labels.items())
+                sample_name = name + suffix
+                if label_text:
+                    sample_name += '{' + label_text + '}'
+                lines.append(f"{sample_name} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsExporter:
+    """本机 HTTP 服务和定时写出的指标文件，render_callback 在后台线程中调用"""
+
+    def __init__(self, render_callback: Callable[[], str], host: str = '127.0.0.1', port: int = 0,
+                 dump_file: Optional[str] = None, dump_interval: float = 0.0):
+        self._render_callback = render_callback
+        self.host = host
+        self.port = port
+        self.dump_file = dump_file
+        self.dump_interval = dump_interval
+
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._server_thread: Optional[threading.Thread] = None
+        self._dump_thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+        # 统计信息
+        self.scrapes = 0
+        self.dumps = 0
+
+    def render(self) -> str:
+        return self._render_callback()
+
+    def start(self):
+        """按配置启动 HTTP 服务（port 大于0时）和定时写文件（dump_interval 大于0时）"""
+        if self.port > 0 and self._server is None:
+            try:
+                self._server = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+                self._server.daemon_threads = True
+            except OSError as e:
+                print(f"启动监控指标服务失败: {e}")
+                self._server = None
+            else:
+                self._server_thread = threading.Thread(target=self._server.serve_forever,
+                                                       name='metrics-http', daemon=True)
+                self._server_thread.start()
+        if self.dump_file and self.dump_interval > 0 and self._dump_thread is None:
+            self._dump_thread = threading.Thread(target=self._dump_loop, name='metrics-dump', daemon=True)
+            self._dump_thread.start()
+        if self._server is not None or self._dump_thread is not None:
+            atexit.register(self.stop)
+
+    def stop(self):
+        self._stopped.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @property
+    def address(self) -> Optional[Tuple[str, int]]:
+        """HTTP 服务实际监听的地址（port 为0时由系统分配）"""
+        return self._server.server_address[:2] if self._server is not None else None
+
+    def dump(self, file_path: Optional[str] = None) -> bool:
+        """写出指标文件（先写临时文件再替换，读取方不会读到写了一半的文件）"""
+        file_path = file_path or self.dump_file
+        if not file_path:
+            return False
+        try:
+            text = self.render()
+            os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+            tmp_file = file_path + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_file, file_path)
+        except Exception as e:
+            print(f"写出监控指标失败: {e}")
+            return False
+        self.dumps += 1
+        return True
+
+    def _dump_loop(self):
+        while not self._stopped.wait(self.dump_interval):
+            self.dump()
+
+    def _handler_class(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                try:
+                    body = exporter.render().encode('utf-8')
+                except Exception as e:
+                    print(f"生成监控指标失败: {e}")
+                    self.send_error(500)
+                    return
+                exporter.scrapes += 1
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # 不在控制台输出每次抓取
+
+        return Handler
@@ -0,0 +1,246 @@
+##########################################
+#            操作耗时统计模块
+#             作者：李嘉
+#           学号：3123009043
+#          班级：23人工智能1班
+#         指导教师：苏畅、李剑锋
+###########################################
+"""
+文件系统操作的调用次数、失败次数和耗时分布
+耗时按微秒记入对数-线性分桶的直方图（每个2的幂区间再等分为16个桶，相对误差不超过 1/16），
+内存占用与调用次数无关，可以随时计算 p50/p95/p99。
+开启时在文件系统实例上用计时包装覆盖各公开方法（MethodHooks，慢操作记录也通过它挂接）；
+关闭时删除这些实例属性，方法调用恢复为直接调用类中的方法，没有任何额外开销
+"""
+
+import time
+import inspect
+import functools
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# 默认统计的文件系统公开方法
+FILE_SYSTEM_OPERATIONS = (
+    'get_directory_content', 'get_file_content', 'read_file', 'write_file',
+    'create_item', 'create_file', 'create_file_with_content', 'create_directory',
+    'delete_item', 'rename_item', 'copy_items', 'cut_items', 'paste_items',
+    'copy_item', 'move_item', 'set_item_hidden', 'set_item_acl',
+    'get_item_info', 'get_directory_usage', 'search_items', 'search_content',
+    'verify_user_password', 'save_file_system', 'flush', 'compact_journal',
+)
+
+
+class LatencyHistogram:
+    """对数-线性分桶的耗时直方图（单位：微秒）"""
+
+    SUB_BUCKET_BITS = 4
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS  # 每个2的幂区间的桶数
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}  # 桶编号 -> 次数
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @classmethod
+    def bucket_index(cls, value: int) -> int:
+        """小于 2*SUB_BUCKETS 的值每个值一个桶，更大的值按最高的 SUB_BUCKET_BITS+1 位分桶"""
+        if value < 2 * cls.SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - cls.SUB_BUCKET_BITS - 1
+        return shift * cls.SUB_BUCKETS + (value >> shift)
+
+    @classmethod
+    def bucket_upper(cls, index: int) -> int:
+        """桶中最大的值"""
+        if index < 2 * cls.SUB_BUCKETS:
+            return index
+        shift = index // cls.SUB_BUCKETS - 1
+        return ((index - shift * cls.SUB_BUCKETS + 1) << shift) - 1
+
+    def record(self, value: int):
+        index = self.bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentiles(self, quantiles: Iterable[float]) -> List[int]:
+        """各分位数的值（所在桶的上界，不超过实际最大值），quantiles 须从小到大排列"""
+        quantiles = list(quantiles)
+        results = []
+        if not self.count:
+            return [0] * len(quantiles)
+        cumulative = 0
+        buckets = iter(sorted(self.counts.items()))
+        index = 0
+        for quantile in quantiles:
+            target = max(1, int(quantile * self.count + 0.999999))
+            while cumulative < target:
+                index, count = next(buckets)
+                cumulative += count
+            results.append(min(self.bucket_upper(index), self.max))
+        return results
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class OperationStats:
+    """一种操作（或某用户的一种操作）的调用次数、失败次数和耗时分布"""
+
+    __slots__ = ('calls', 'errors', 'histogram')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.histogram = LatencyHistogram()
+
+    def to_dict(self) -> Dict:
+        """耗时换算为毫秒"""
+        p50, p95, p99 = self.histogram.percentiles((0.5, 0.95, 0.99))
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'mean_ms': self.histogram.mean() / 1000,
+            'p50_ms': p50 / 1000,
+            'p95_ms': p95 / 1000,
+            'p99_ms': p99 / 1000,
+            'max_ms': self.histogram.max / 1000,
+        }
+
+
+class MethodHooks:
+    """
+    在目标实例上用包装覆盖指定的方法，包装由各观察者的 wrap(name, method) 逐层生成。
+    没有观察者时删除这些实例属性，方法调用恢复为直接调用类中的方法，没有任何额外开销
+    """
+
+    def __init__(self, target, methods: Iterable[str]):
+        self.target = target
+        self.methods = tuple(name for name in methods if hasattr(type(target), name))
+        self._observers: List = []
+
+    def attach(self, observer):
+        if observer not in self._observers:
+            self._observers.append(observer)
+            self._install()
+
+    def detach(self, observer):
+        if observer in self._observers:
+            self._observers.remove(observer)
+            self._install()
+
+    def is_attached(self, observer) -> bool:
+        return observer in self._observers
+
+    def _install(self):
+        for name in self.methods:
+            if not self._observers:
+                self.target.__dict__.pop(name, None)
+                continue
+            # 总是从类中的方法开始包装，先加入的观察者在最内层
+            cls = type(self.target)
+            method = inspect.getattr_static(cls, name).__get__(self.target, cls)
+            for observer in self._observers:
+                method = observer.wrap(name, method)
+            setattr(self.target, name, method)
+
+
+def user_argument_position(method: Callable) -> Optional[int]:
+    """绑定方法中 current_user 参数的位置，没有该参数时为None"""
+    try:
+        parameters = list(inspect.signature(method).parameters)
+    except (TypeError, ValueError):
+        return None
+    return parameters.index('current_user') if 'current_user' in parameters else None
+
+
+class OperationMetrics:
+    """
+    按操作和按（用户, 操作）统计文件系统方法的耗时。
+    抛出异常或返回 False 的调用记为失败；嵌套调用的方法各自计时（外层包含内层的时间）
+    """
+
+    def __init__(self, hooks: MethodHooks):
+        self.hooks = hooks
+        self.started = time.time()
+        self._ops: Dict[str, OperationStats] = {}
+        self._users: Dict[Tuple[str, str], OperationStats] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.hooks.is_attached(self)
+
+    def record(self, operation: str, username: Optional[str], seconds: float, error: bool = False):
+        micros = int(seconds * 1000000)
+        with self._lock:
+            stats = self._ops.get(operation)
+            if stats is None:
+                stats = self._ops[operation] = OperationStats()
+            stats.calls += 1
+            stats.errors += error
+            stats.histogram.record(micros)
+            if username:
+                key = (username, operation)
+                stats = self._users.get(key)
+                if stats is None:
+                    stats = self._users[key] = OperationStats()
+                stats.calls += 1
+                stats.errors += error
+                stats.histogram.record(micros)
+
+    def wrap(self, name: str, method: Callable) -> Callable:
+        """包装绑定方法：计时并取出 current_user 参数（按位置或关键字传入）"""
+        user_position = user_argument_position(method)
+        perf_counter = time.perf_counter
+        record = self.record
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            username = kwargs.get('current_user')
+            if username is None and user_position is not None and len(args) > user_position:
+                username = args[user_position]
+            start = perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            except BaseException:
+                record(name, username, perf_counter() - start, True)
+                raise
+            record(name, username, perf_counter() - start, result is False)
+            return result
+        return timed
+
+    def enable(self):
+        """在目标实例上安装计时包装"""
+        self.hooks.attach(self)
+
+    def disable(self):
+        """删除计时包装（已有的统计保留）"""
+        self.hooks.detach(self)
+
+    def reset(self):
+        with self._lock:
+            self._ops.clear()
+            self._users.clear()
+            self.started = time.time()
+
+    def snapshot(self) -> List[Dict]:
+        """各操作的统计，按总耗时从大到小排列"""
+        with self._lock:
+            items = [(operation, stats.histogram.total, stats.to_dict()) for operation, stats in self._ops.items()]
+        items.sort(key=lambda item: -item[1])
+        return [dict(stats, operation=operation) for operation, _, stats in items]
+
+    def user_snapshot(self, username: Optional[str] = None) -> List[Dict]:
+        """各用户各操作的统计（可只取一个用户），按用户名和总耗时排列"""
+        with self._lock:
+            items = [(user, operation, stats.histogram.total, stats.to_dict())
+                     for (user, operation), stats in self._users.items()
+                     if username is None or user == username]
+        items.sort(key=lambda item: (item[0], -item[2]))
+        return [dict(stats, username=user, operation=operation) for user, operation, _, stats in items]
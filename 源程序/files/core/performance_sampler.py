@@ -0,0 +1,74 @@
+##########################################
+#            性能采样模块
+#             作者：李嘉
+#           学号：3123009043
+#          班级：23人工智能1班
+#         指导教师：苏畅、李剑锋
+###########################################
+"""
+后台性能采样线程
+按固定间隔调用采样函数，把结果放入环形缓冲区，界面线程只读取最近一次的采样结果，
+不再在界面线程中等待 CPU 使用率的测量
+"""
+
+import atexit
+import threading
+from collections import deque
+from typing import Callable, Dict, Optional
+
+
+class PerformanceSampler:
+    """定时采样，结果保存在固定长度的环形缓冲区中"""
+
+    def __init__(self, sample_callback: Callable[[], Dict], interval: float = 5.0, history_size: int = 100):
+        self._sample_callback = sample_callback
+        self.interval = interval
+        self.history = deque(maxlen=history_size)  # 最近的采样结果（环形缓冲区）
+
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+        # 统计信息
+        self.sample_count = 0
+        self.error_count = 0
+
+    def start(self):
+        """启动采样线程（启动时立即采样一次）"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='performance-sampler', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+
+    def latest(self) -> Optional[Dict]:
+        """最近一次的采样结果，尚未采样时返回None"""
+        try:
+            return self.history[-1]
+        except IndexError:
+            return None
+
+    def sample_now(self) -> Optional[Dict]:
+        """立即采样一次并放入缓冲区"""
+        try:
+            sample = self._sample_callback()
+        except Exception as e:
+            self.error_count += 1
+            print(f"性能采样失败: {e}")
+            return None
+        self.history.append(sample)
+        self.sample_count += 1
+        return sample
+
+    def _run(self):
+        while not self._stopped:
+            self.sample_now()
+            if self._wake.wait(self.interval):
+                # 被 stop 或修改间隔后唤醒
+                self._wake.clear()
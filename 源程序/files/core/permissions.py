@@ -0,0 +1,180 @@
+##########################################
+#            权限检查模块
+#             作者：李嘉
+#           学号：3123009043
+#          班级：23人工智能1班
+#         指导教师：苏畅、李剑锋
+###########################################
+"""
+访问权限引擎
+内置规则（管理员、自己的主目录、共享目录、/home）与目录上的访问控制列表（acl，向下继承）
+按用户编译成一棵路径前缀树，判断结果按 (用户, 路径) 缓存；
+访问控制列表或用户数据变化时代数（generation）加一，缓存和前缀树随之失效
+"""
+
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+
+def _components(path: str) -> List[str]:
+    return [part for part in path.split('/') if part]
+
+
+class PathPrefixTrie:
+    """路径前缀树：subtree 授权覆盖该路径及其所有后代，exact 授权只覆盖该路径本身"""
+
+    def __init__(self):
+        self._root: Dict = {}
+
+    def add(self, path: str, subtree: bool = True):
+        node = self._root
+        for part in _components(path):
+            node = node.setdefault('children', {}).setdefault(part, {})
+        node['subtree' if subtree else 'exact'] = True
+
+    def _walk(self, path: str) -> Tuple[bool, Optional[Dict]]:
+        """返回 (途中是否遇到子树授权, 路径对应的树节点)"""
+        node = self._root
+        if node.get('subtree'):
+            return True, node
+        for part in _components(path):
+            node = node.get('children', {}).get(part)
+            if node is None:
+                return False, None
+            if node.get('subtree'):
+                return True, node
+        return False, node
+
+    def allows(self, path: str) -> bool:
+        covered, node = self._walk(path)
+        return covered or (node is not None and node.get('exact', False))
+
+    def allows_subtree(self, path: str) -> bool:
+        """path 之下的所有路径是否都可访问"""
+        return self._walk(path)[0]
+
+
+class PermissionEngine:
+    """编译后的访问权限检查，判断结果带代数缓存"""
+
+    MAX_CACHED_DECISIONS = 65536
+
+    def __init__(self, file_system):
+        self.file_system = file_system
+        self.generation = 0
+        self._acl_ids: Set[int] = set()   # 设置了访问控制列表的节点编号
+        self._tries: Dict[str, PathPrefixTrie] = {}
+        self._decisions: Dict[Tuple[str, str], bool] = {}
+        self._stamp = None
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        for node in list(file_system._nodes.values()):
+            if node.get('acl'):
+                self._acl_ids.add(node['id'])
+        file_system.add_listener(self._on_file_system_change)
+
+    def invalidate(self):
+        """访问控制列表或用户数据变化后调用，使所有缓存失效"""
+        with self._lock:
+            self.generation += 1
+
+    def _on_file_system_change(self, event: str, node: Dict):
+        if event == 'update':
+            if node.get('acl'):
+                self._acl_ids.add(node['id'])
+                self.invalidate()
+            elif node.get('id') in self._acl_ids:
+                self._acl_ids.discard(node['id'])
+                self.invalidate()
+        elif event in ('add', 'remove'):
+            changed = False
+            stack = [node]
+            while stack:
+                current = stack.pop()
+                if current.get('acl'):
+                    changed = True
+                    if event == 'add':
+                        self._acl_ids.add(current['id'])
+                    else:
+                        self._acl_ids.discard(current.get('id'))
+                stack.extend(current.get('children', []))
+            if changed:
+                self.invalidate()
+        elif event in ('rename', 'move') and node.get('type') == 'dir' and self._acl_ids:
+            # 目录改名或移动后，其下设置了访问控制列表的路径随之改变
+            self.invalidate()
+
+    def _current_stamp(self):
+        registry = self.file_system.user_registry
+        registry.get_data()  # 按需重新读取用户数据
+        return self.generation, registry.reload_count
+
+    def _compile(self, username: str) -> PathPrefixTrie:
+        """把内置规则和访问控制列表编译成该用户的前缀树"""
+        trie = PathPrefixTrie()
+        if self.file_system.user_registry.is_admin(username):
+            # 管理员可以访问所有路径
+            trie.add('/')
+            return trie
+        # 用户总是可以访问自己的目录和共享目录
+        trie.add(f"/home/{username}")
+        trie.add("/home/shared")
+        # 用户总是可以访问home目录（但只能看到自己的目录和共享目录）
+        trie.add("/home", subtree=False)
+        # 目录的访问控制列表对其所有后代生效
+        for node_id in self._acl_ids:
+            node = self.file_system.get_node_by_id(node_id)
+            if node is not None and username in (node.get('acl') or {}).get('users', []):
+                trie.add(self.file_system.get_node_path(node))
+        return trie
+
+    def _trie_for(self, username: str) -> PathPrefixTrie:
+        return self._trie_and_stamp(username)[0]
+
+    def _trie_and_stamp(self, username: str) -> Tuple[PathPrefixTrie, Tuple[int, int]]:
+        """该用户当前的前缀树，以及它所对应的（代数, 用户数据重新读取次数）"""
+        with self._lock:
+            stamp = self._current_stamp()
+            if stamp != self._stamp:
+                self._stamp = stamp
+                self._tries = {}
+                self._decisions = {}
+            trie = self._tries.get(username)
+        if trie is None:
+            trie = self._compile(username)
+            with self._lock:
+                if self._stamp == stamp and self.generation == stamp[0]:
+                    self._tries[username] = trie
+        return trie, stamp
+
+    def check(self, username: str, path: str) -> bool:
+        """username 能否访问 path"""
+        trie, stamp = self._trie_and_stamp(username)
+        key = (username, path)
+        with self._lock:
+            decision = self._decisions.get(key) if self._stamp == stamp else None
+            if decision is not None:
+                self.cache_hits += 1
+                return decision
+            self.cache_misses += 1
+        decision = trie.allows(path)
+        with self._lock:
+            # 计算期间权限已变化（缓存已清空或即将清空）时结果不放入缓存
+            if self._stamp == stamp and self.generation == stamp[0]:
+                if len(self._decisions) >= self.MAX_CACHED_DECISIONS:
+                    self._decisions = {}
+                self._decisions[key] = decision
+        return decision
+
+    def check_subtree(self, username: str, path: str) -> bool:
+        """username 能否访问 path 及其之下的所有路径（成立时对整棵子树无需再逐个检查）"""
+        return self._trie_for(username).allows_subtree(path)
+
+    def checker(self, username: str):
+        """返回判断 username 能否访问某路径的函数，用于批量检查"""
+        trie = self._trie_for(username)
+        return trie.allows
@@ -0,0 +1,238 @@
+##########################################
+#            性能分析模块
+#             作者：李嘉
+#           学号：3123009043
+#          班级：23人工智能1班
+#         指导教师：苏畅、李剑锋
+###########################################
+"""
+运行中按需开启的性能分析
+sampling：后台线程每隔 interval 秒用 sys._current_frames() 采集所有线程的调用栈（不需要信号，任何平台可用），
+开销与程序正在执行的代码无关；cprofile：对调用 start 的线程（通常是界面线程）做确定性分析。
+结束后写出 flamegraph.pl / speedscope 等工具可读的折叠调用栈文件（每行 "帧;帧;帧 数值"），
+并按累计时间列出最耗时的函数
+"""
+
+import os
+import sys
+import time
+import pstats
+import cProfile
+import datetime
+import threading
+from typing import Dict, List, Optional, Tuple
+
+PROFILE_MODES = ('sampling', 'cprofile')
+
+FunctionKey = Tuple[str, int, str]  # (文件名, 行号, 函数名)，与 pstats 相同
+
+
+def function_label(key: FunctionKey) -> str:
+    filename, line, name = key
+    label = f"{name} ({os.path.basename(filename)}:{line})" if line else name
+    return label.replace(';', ':')  # 分号是折叠格式的分隔符
+
+
+class SessionProfiler:
+    """一次只运行一个分析会话，结果保留到下一次会话结束"""
+
+    def __init__(self, output_dir: str, interval: float = 0.005, top_n: int = 30, max_depth: int = 64):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.top_n = top_n
+        self.max_depth = max_depth
+        self.last_result: Optional[Dict] = None
+
+        self._lock = threading.Lock()
+        self._mode: Optional[str] = None
+        self._started = 0.0
+        self._deadline: Optional[float] = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._stop_sampling = threading.Event()
+        self._stacks: Dict[Tuple[str, ...], int] = {}
+        self._samples = 0
+
+    @property
+    def running(self) -> bool:
+        return self._mode is not None
+
+    def status(self) -> Dict:
+        """当前会话的模式、已运行秒数和剩余秒数"""
+        if self._mode is None:
+            return {'running': False}
+        now = time.time()
+        return {
+            'running': True,
+            'mode': self._mode,
+            'elapsed': now - self._started,
+            'remaining': max(0.0, self._deadline - now) if self._deadline is not None else None,
+            'samples': self._samples,
+        }
+
+    def start(self, mode: str = 'sampling', duration: Optional[float] = None) -> bool:
+        """开始分析，duration 秒后自动结束（为None时需调用 stop）；已在运行或无法开启时返回False"""
+        if mode not in PROFILE_MODES:
+            print(f"未知的性能分析模式 {mode}")
+            return False
+        with self._lock:
+            if self._mode is not None:
+                return False
+            self._started = time.time()
+            self._deadline = self._started + duration if duration else None
+            self._stacks = {}
+            self._samples = 0
+            if mode == 'cprofile':
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                except ValueError as e:  # 已有其他分析工具（如调试器）在运行
+                    print(f"开启性能分析失败: {e}")
+                    return False
+                self._profile = profile
+            else:
+                self._stop_sampling.clear()
+                self._sampler = threading.Thread(target=self._sample_loop, name='profiler-sampler', daemon=True)
+                self._sampler.start()
+            self._mode = mode
+        return True
+
+    def poll(self) -> bool:
+        """到时间时结束会话（cProfile 需要在开启它的线程中结束，由界面定时器调用），返回会话是否已结束"""
+        if self._mode is None:
+            return True
+        if self._deadline is not None and time.time() >= self._deadline:
+            self.stop()
+            return True
+        return False
+
+    def stop(self) -> Optional[Dict]:
+        """结束分析，写出折叠调用栈文件，返回结果"""
+        with self._lock:
+            mode = self._mode
+            if mode is None:
+                return self.last_result
+            if mode == 'cprofile':
+                self._profile.disable()
+            else:
+                self._stop_sampling.set()
+                if self._sampler is not threading.current_thread():
+                    self._sampler.join(timeout=5)
+            seconds = time.time() - self._started
+            try:
+                if mode == 'cprofile':
+                    stats = pstats.Stats(self._profile)
+                    stacks, unit = self._cprofile_stacks(stats), 1e-6
+                    top_functions = self._cprofile_top(stats)
+                else:
+                    # 每次采样代表的实际时间（采样本身也要耗时，略长于 interval）
+                    stacks, unit = self._stacks, seconds / self._samples if self._samples else self.interval
+                    top_functions = self._sampling_top(stacks, unit)
+                result = {
+                    'mode': mode,
+                    'started': datetime.datetime.fromtimestamp(self._started).isoformat(),
+                    'seconds': seconds,
+                    'samples': self._samples,
+                    'collapsed_file': self._write_collapsed(stacks, mode),
+                    'collapsed_unit': unit,  # 折叠文件中每个计数代表的秒数
+                    'top_functions': top_functions,
+                }
+            except Exception as e:
+                print(f"生成性能分析结果失败: {e}")
+                result = None
+            finally:
+                self._mode = None
+                self._profile = None
+                self._sampler = None
+                self._stacks = {}
+            if result is not None:
+                self.last_result = result
+            return result
+
+    # 采样
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        while not self._stop_sampling.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(function_label((code.co_filename, code.co_firstlineno, code.co_name)))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}").replace(';', ':'))
+                key = tuple(reversed(stack))
+                self._stacks[key] = self._stacks.get(key, 0) + 1
+            self._samples += 1
+            if self._deadline is not None and time.time() >= self._deadline:
+                threading.Thread(target=self.stop, name='profiler-stop', daemon=True).start()
+                return
+
+    def _sampling_top(self, stacks: Dict[Tuple[str, ...], int], unit: float) -> List[Dict]:
+        """按累计采样数（函数出现在调用栈中的次数）排列，线程名不计入"""
+        cumulative: Dict[str, int] = {}
+        own: Dict[str, int] = {}
+        for stack, count in stacks.items():
+            for label in set(stack[1:]):
+                cumulative[label] = cumulative.get(label, 0) + count
+            if len(stack) > 1:
+                own[stack[-1]] = own.get(stack[-1], 0) + count
+        ranked = sorted(cumulative.items(), key=lambda item: -item[1])[:self.top_n]
+        return [{'function': label, 'calls': count, 'self_seconds': own.get(label, 0) * unit,
+                 'cumulative_seconds': count * unit} for label, count in ranked]
+
+    # cProfile
+
+    def _cprofile_top(self, stats: pstats.Stats) -> List[Dict]:
+        ranked = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:self.top_n]
+        return [{'function': function_label(key), 'calls': calls, 'self_seconds': own_time,
+                 'cumulative_seconds': cumulative_time}
+                for key, (_, calls, own_time, cumulative_time, _) in ranked]
+
+    def _cprofile_stacks(self, stats: pstats.Stats) -> Dict[Tuple[str, ...], int]:
+        """
+        由调用关系重建调用栈（微秒）：函数经某条调用边获得的时间按该边占函数累计时间的比例分摊自身时间和子调用，
+        cProfile 不记录完整调用栈，所以多处调用的函数下面的分布是近似值；递归调用只展开一层，
+        不到总时间万分之一的分支不再展开，避免调用图中的路径数爆炸
+        """
+        entries = stats.stats
+        callees: Dict[FunctionKey, List[Tuple[FunctionKey, float]]] = {}
+        for key, (_, _, _, _, callers) in entries.items():
+            for caller, edge in callers.items():
+                callees.setdefault(caller, []).append((key, edge[3]))
+        roots = [key for key, entry in entries.items() if not any(caller in entries for caller in entry[4])]
+        stacks: Dict[Tuple[str, ...], int] = {}
+        work = [((key,), entries[key][3]) for key in roots]
+        min_time = max(1e-6, sum(cumulative for _, cumulative in work) * 1e-4)
+        while work:
+            path, cumulative = work.pop()
+            key = path[-1]
+            total = entries[key][3]
+            share = cumulative / total if total > 0 else 0.0
+            own = int(entries[key][2] * share * 1e6)
+            if own > 0:
+                labels = tuple(function_label(item) for item in path)
+                stacks[labels] = stacks.get(labels, 0) + own
+            if len(path) >= self.max_depth:
+                continue
+            for callee, edge_cumulative in callees.get(key, ()):
+                if callee in path or edge_cumulative * share < min_time:
+                    continue
+                work.append((path + (callee,), edge_cumulative * share))
+        return stacks
+
+    def _write_collapsed(self, stacks: Dict[Tuple[str, ...], int], mode: str) -> Optional[str]:
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            name = datetime.datetime.fromtimestamp(self._started).strftime('%Y%m%d-%H%M%S')
+            file_path = os.path.join(self.output_dir, f"profile-{name}-{mode}.folded")
+            with open(file_path, 'w', encoding='utf-8') as f:
+                for stack, count in sorted(stacks.items()):
+                    f.write(';'.join(stack) + f" {count}\n")
+            return file_path
+        except OSError as e:
+            print(f"写入折叠调用栈文件失败: {e}")
+            return None
@@ -0,0 +1,128 @@
+##########################################
+#            延迟保存调度模块
+#             作者：李嘉
+#           学号：3123009043
+#          班级：23人工智能1班
+#         指导教师：苏畅、李剑锋
+###########################################
+"""
+脏标记 + 批量提交的保存调度器
+修改只标记为脏，到达保存间隔或累计修改次数后统一写盘，
+两次写盘之间至少间隔 min_interval 秒，保证突发操作下写盘频率有上限
+"""
+
+import time
+import atexit
+import threading
+from typing import Callable, Optional
+
+
+class SaveScheduler:
+    """定时 / 定量合并保存"""
+
+    def __init__(self, flush_callback: Callable[[], None], interval: float = 60.0,
+                 max_pending: int = 100, min_interval: float = 1.0):
+        self._flush_callback = flush_callback
+        self.interval = interval          # 第一次修改后最多等待多少秒写盘
+        self.max_pending = max_pending    # 累计多少次修改后尽快写盘
+        self.min_interval = min_interval  # 两次写盘之间的最小间隔
+
+        self.pending = 0
+        self._first_dirty: Optional[float] = None
+        self._last_flush = 0.0
+
+        # 统计信息
+        self.flush_count = 0
+        self.total_operations = 0
+        self.flush_seconds = 0.0       # 写盘累计耗时
+        self.last_flush_seconds = 0.0  # 最近一次写盘的耗时
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """启动后台保存线程，并保证进程退出时写盘"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='save-scheduler', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """停止后台线程并写出所有未保存的修改"""
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def mark_dirty(self):
+        """记录一次修改；累计修改达到上限时立即（或在最小间隔后）写盘"""
+        now = time.monotonic()
+        with self._lock:
+            self.pending += 1
+            self.total_operations += 1
+            became_dirty = self._first_dirty is None
+            if became_dirty:
+                self._first_dirty = now
+            batch_full = self.pending >= self.max_pending
+        if became_dirty:
+            # 唤醒后台线程开始计时
+            self._wake.set()
+        if batch_full:
+            if now - self._last_flush >= self.min_interval:
+                self.flush()
+            else:
+                self._wake.set()
+        elif self._stopped:
+            self.flush()
+
+    def is_dirty(self) -> bool:
+        return self.pending > 0
+
+    def flush(self) -> bool:
+        """立即写出所有未保存的修改，没有修改时返回False"""
+        # 回调本身由调用方的锁串行化，这里不持锁调用，避免与修改操作的锁顺序相反
+        with self._lock:
+            if not self.pending:
+                return False
+            self.pending = 0
+            self._first_dirty = None
+        started = time.perf_counter()
+        try:
+            self._flush_callback()
+        except Exception as e:
+            print(f"保存文件系统失败: {e}")
+            # 保持脏标记，下次再试
+            with self._lock:
+                self.pending += 1
+                if self._first_dirty is None:
+                    self._first_dirty = time.monotonic()
+            return False
+        self._last_flush = time.monotonic()
+        self.last_flush_seconds = time.perf_counter() - started
+        self.flush_seconds += self.last_flush_seconds
+        self.flush_count += 1
+        return True
+
+    def _next_timeout(self) -> Optional[float]:
+        """距离下一次需要写盘还有多少秒，None表示无需唤醒"""
+        with self._lock:
+            if self._first_dirty is None:
+                return None
+            now = time.monotonic()
+            due = self._first_dirty + self.interval
+            if self.pending >= self.max_pending:
+                due = min(due, self._last_flush + self.min_interval)
+            return max(0.0, due - now)
+
+    def _run(self):
+        while not self._stopped:
+            timeout = self._next_timeout()
+            if timeout is None or timeout > 0:
+                self._wake.wait(timeout)
+                self._wake.clear()
+                continue
+            self.flush()
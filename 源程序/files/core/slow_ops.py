@@ -0,0 +1,240 @@
+##########################################
+#            慢操作记录模块
+#             作者：李嘉
+#           学号：3123009043
+#          班级：23人工智能1班
+#         指导教师：苏畅、李剑锋
+###########################################
+"""
+慢操作记录
+耗时超过阈值的文件系统和系统监控器调用连同参数（路径、用户、项目数、字节数）、
+各阶段耗时（lookup 查找、permission 权限检查、mutation 修改目录树、serialize 序列化、
+write 写盘、read 读取内容）和可选的调用栈一起放入有界的环形缓冲区，可以导出为 JSON Lines。
+阶段通过挂接到内部方法上的包装计时：只计最外层的操作调用，阶段之间不嵌套（内层阶段的时间算在外层阶段中）
+"""
+
+import json
+import time
+import inspect
+import datetime
+import functools
+import threading
+import traceback
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .op_metrics import MethodHooks
+
+PHASES = ('lookup', 'permission', 'mutation', 'serialize', 'write', 'read')
+
+# 文件系统内部方法 -> 阶段
+FILE_SYSTEM_PHASES = {
+    '_get_node_by_path': 'lookup',
+    '_get_child': 'lookup',
+    '_unique_name': 'lookup',
+    'check_access_permission': 'permission',
+    '_access_checker': 'permission',
+    'is_admin': 'permission',
+    '_apply_add': 'mutation',
+    '_apply_remove': 'mutation',
+    '_apply_rename': 'mutation',
+    '_apply_move': 'mutation',
+    '_apply_copy': 'mutation',
+    '_apply_update': 'mutation',
+    '_copy_node': 'mutation',
+    '_serialize_file_system': 'serialize',
+    '_write_file_system': 'write',
+}
+# 操作日志：stage 编码记录，flush/compact 写盘
+JOURNAL_PHASES = {'stage': 'serialize', 'flush': 'write', 'compact': 'write'}
+BLOB_STORE_PHASES = {'put': 'write', 'get': 'read'}
+
+# 默认记录的系统监控器方法
+SYSTEM_MONITOR_OPERATIONS = (
+    'save_data', 'save_content_index', 'build_file_index', 'get_disk_usage_stats',
+    'get_access_log_summary', 'query_access_log', 'get_system_health_report',
+    'search_files_fast', 'search_content', 'cleanup_old_logs', 'export_cache_manifest',
+)
+
+_PATH_ARGUMENTS = ('path', 'file_path', 'item_path', 'source_path', 'scope_path')
+_NAME_ARGUMENTS = ('item_name', 'filename', 'dirname', 'old_name')
+
+
+class _ActiveCall:
+    """正在执行的最外层操作"""
+
+    __slots__ = ('phases', 'phase')
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.phase: Optional[str] = None  # 正在计时的阶段
+
+
+class _OperationProbe:
+    """挂接到一个组件的操作方法上，操作名加上组件前缀（如 FileSystem.paste_items）"""
+
+    def __init__(self, recorder: 'SlowOpRecorder', component: str):
+        self.recorder = recorder
+        self.component = component
+
+    def wrap(self, name: str, method: Callable) -> Callable:
+        return self.recorder.wrap_operation(f"{self.component}.{name}", name, method)
+
+
+class _PhaseProbe:
+    """挂接到内部方法上，把方法耗时计入当前操作的某个阶段"""
+
+    def __init__(self, recorder: 'SlowOpRecorder', phases: Dict[str, str]):
+        self.recorder = recorder
+        self.phases = phases
+
+    def wrap(self, name: str, method: Callable) -> Callable:
+        phase = self.phases[name]
+        local = self.recorder._local
+        perf_counter = time.perf_counter
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            call = getattr(local, 'call', None)
+            if call is None or call.phase is not None:
+                return method(*args, **kwargs)
+            call.phase = phase
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                call.phases[phase] = call.phases.get(phase, 0.0) + perf_counter() - start
+                call.phase = None
+        return timed
+
+
+class SlowOpRecorder:
+    """记录耗时超过 threshold_ms 的操作，最多保留最近的 capacity 条"""
+
+    def __init__(self, threshold_ms: float = 200.0, capacity: int = 200, capture_stack: bool = False,
+                 stack_limit: int = 12):
+        self.threshold_ms = threshold_ms
+        self.capture_stack = capture_stack
+        self.stack_limit = stack_limit
+        self._records: deque = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # 操作名 -> 调用前收集额外参数的函数（例如粘贴时剪贴板中的项目数）
+        self.context_callbacks: Dict[str, Callable[[], Dict]] = {}
+        self._probes: List[Tuple[MethodHooks, object]] = []
+        self.recorded = 0
+
+    @property
+    def enabled(self) -> bool:
+        return any(hooks.is_attached(probe) for hooks, probe in self._probes)
+
+    def watch(self, hooks: MethodHooks, component: str):
+        """记录 hooks 中的各个方法"""
+        self._probes.append((hooks, _OperationProbe(self, component)))
+
+    def watch_phases(self, hooks: MethodHooks, phases: Dict[str, str]):
+        """把 hooks 中的各个方法计入对应的阶段"""
+        self._probes.append((hooks, _PhaseProbe(self, phases)))
+
+    def enable(self):
+        for hooks, probe in self._probes:
+            hooks.attach(probe)
+
+    def disable(self):
+        for hooks, probe in self._probes:
+            hooks.detach(probe)
+
+    def wrap_operation(self, operation: str, name: str, method: Callable) -> Callable:
+        """包装一个操作方法：只有最外层的调用计时，超过阈值时记录"""
+        local = self._local
+        perf_counter = time.perf_counter
+        context_callback = self.context_callbacks.get(name)
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            if getattr(local, 'call', None) is not None:
+                # 嵌套调用算在最外层的操作中
+                return method(*args, **kwargs)
+            call = local.call = _ActiveCall()
+            context = context_callback() if context_callback is not None else None
+            result = error = None
+            start = perf_counter()
+            try:
+                result = method(*args, **kwargs)
+                return result
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                elapsed = perf_counter() - start
+                local.call = None
+                if elapsed * 1000 >= self.threshold_ms:
+                    self._record(operation, method, args, kwargs, context, call, elapsed, result, error)
+        return timed
+
+    def _record(self, operation: str, method: Callable, args, kwargs, context: Optional[Dict],
+                call: _ActiveCall, elapsed: float, result, error: Optional[BaseException]):
+        phases = {phase: round(seconds * 1000, 3) for phase, seconds in call.phases.items()}
+        record = {
+            'timestamp': datetime.datetime.now().isoformat(),
+            'operation': operation,
+            'duration_ms': round(elapsed * 1000, 3),
+            'success': error is None and result is not False,
+            'args': self._describe_arguments(method, args, kwargs, context, result),
+            'phases': phases,
+            'other_ms': round(max(0.0, elapsed * 1000 - sum(phases.values())), 3),
+        }
+        if error is not None:
+            record['error'] = f"{type(error).__name__}: {error}"
+        if self.capture_stack:
+            # 调用方的调用栈（去掉本模块的两层）
+            record['stack'] = [line.strip() for line in traceback.format_stack(limit=self.stack_limit + 2)[:-2]]
+        with self._lock:
+            self._records.append(record)
+            self.recorded += 1
+
+    @staticmethod
+    def _describe_arguments(method: Callable, args, kwargs, context: Optional[Dict], result) -> Dict:
+        """提取路径、用户、项目数和字节数"""
+        try:
+            arguments = inspect.signature(method).bind_partial(*args, **kwargs).arguments
+        except (TypeError, ValueError):
+            arguments = dict(kwargs)
+        described: Dict = {}
+        path = next((arguments[key] for key in _PATH_ARGUMENTS if isinstance(arguments.get(key), str)), None)
+        name = next((arguments[key] for key in _NAME_ARGUMENTS if isinstance(arguments.get(key), str)), None)
+        if path is not None:
+            described['path'] = path.rstrip('/') + '/' + name if name else path
+        if isinstance(arguments.get('target_path'), str):
+            described['target'] = arguments['target_path']
+        user = arguments.get('current_user') or arguments.get('username')
+        if user:
+            described['user'] = user
+        if isinstance(arguments.get('items'), list):
+            described['items'] = len(arguments['items'])
+        content = arguments.get('content')
+        if isinstance(content, str):
+            described['bytes'] = len(content.encode('utf-8'))
+        elif isinstance(result, str):
+            described['bytes'] = len(result.encode('utf-8'))
+        if context:
+            described.update(context)
+        return described
+
+    def records(self, limit: Optional[int] = None) -> List[Dict]:
+        """最近的慢操作，最新的在最后"""
+        with self._lock:
+            records = list(self._records)
+        return records[-limit:] if limit else records
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def export_jsonl(self, file_path: str) -> int:
+        """把缓冲区中的慢操作写成 JSON Lines 文件，返回条数"""
+        records = self.records()
+        with open(file_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return len(records)
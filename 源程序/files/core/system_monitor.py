@@ -13,10 +13,24 @@
 import os
 import json
 import time
+import atexit
 import psutil
 import datetime
+import threading
 from typing import Dict, List, Optional, Tuple
-from collections import defaultdict, deque
+
+from .trigram_index import TrigramIndex
+from .fulltext_index import FullTextIndex
+from .performance_sampler import PerformanceSampler
+from .content_cache import create_cache
+from .access_log import AccessLogWriter, entry_to_dict
+from .access_log_store import AccessLogStore
+from .access_stats import AccessStats
+from .op_metrics import FILE_SYSTEM_OPERATIONS, MethodHooks, OperationMetrics
+from .slow_ops import (BLOB_STORE_PHASES, FILE_SYSTEM_PHASES, JOURNAL_PHASES,
+                       SYSTEM_MONITOR_OPERATIONS, SlowOpRecorder)
+from .profiler import SessionProfiler
+from .metrics_export import MetricsExporter, MetricsText
 
 class SystemMonitor:
     """系统监控器"""
@@ -26,26 +40,121 @@ class SystemMonitor:
         self.log_file = os.path.join(file_system.data_dir, 'system_log.json')
         self.cache_file = os.path.join(file_system.data_dir, 'file_cache.json')
         self.index_file = os.path.join(file_system.data_dir, 'file_index.json')
-        
-        # 文件访问日志
-        self.access_log = deque(maxlen=1000)  # 最多保存1000条记录
-        
-        # 文件缓存
-        self.file_cache = {}
+        self.content_index_file = os.path.join(file_system.data_dir, 'content_index.json')
+        self.access_stats_file = os.path.join(file_system.data_dir, 'access_stats.json')
+        
+        # 文件访问日志：内存中按列保存最近的 memory_entries 条（字符串驻留，每条约17字节），
+        # 完整的日志由后台线程批量追加到 data/access_logs 下按大小或时长轮换的日志段；
+        # system_log.json 只保存最近的 snapshot_entries 条
+        config = file_system.config
+        self.access_log = AccessLogStore(max_entries=config.getint('AccessLog', 'memory_entries', fallback=100000))
+        self.log_snapshot_entries = config.getint('AccessLog', 'snapshot_entries', fallback=1000)
+        self.access_log_writer = AccessLogWriter(
+            os.path.join(file_system.data_dir, config.get('AccessLog', 'directory', fallback='access_logs')),
+            flush_interval=config.getfloat('AccessLog', 'flush_interval', fallback=1.0),
+            batch_size=config.getint('AccessLog', 'batch_size', fallback=256),
+            max_buffer=config.getint('AccessLog', 'max_buffer', fallback=10000),
+            segment_max_bytes=config.getint('AccessLog', 'segment_max_bytes', fallback=4 * 1024 * 1024),
+            segment_max_age=config.getfloat('AccessLog', 'segment_max_age', fallback=24 * 3600),
+            max_segments=config.getint('AccessLog', 'max_segments', fallback=30),
+            fsync=config.get('AccessLog', 'fsync', fallback='batch'))
+        # 按分钟/小时预聚合的访问计数和访问最多的路径，摘要不再逐条扫描日志
+        self.access_stats = AccessStats(top_k=config.getint('AccessLog', 'top_k', fallback=100))
+        
+        # 文件缓存：按字节数限制大小，淘汰和准入都是 O(1)（策略见 content_cache）
+        # 以文件节点编号为键，值为 (内容摘要, 内容)，摘要与节点当前的摘要一致时才算命中；
+        # 改名和移动不改变节点编号和内容，缓存继续有效，删除和写入通过修改监听器失效
         self.cache_size_limit = 50 * 1024 * 1024  # 50MB缓存限制
-        self.current_cache_size = 0
-        
-        # 文件索引
-        self.file_index = {}
-        
-        # 性能监控数据
-        self.performance_history = deque(maxlen=100)  # 保存最近100次监控数据
+        self.file_cache = create_cache(file_system.config.get('Cache', 'policy', fallback='tinylfu'),
+                                       self.cache_size_limit)
+        # file_cache.json 只保存热点清单（节点编号、内容摘要、访问频率），启动后在后台按清单预热，
+        # 预热的时间和字节数都有上限
+        self._warmup_manifest: List[Dict] = []
+        self.manifest_size = file_system.config.getint('Cache', 'manifest_size', fallback=500)
+        self.warmup_max_seconds = file_system.config.getfloat('Cache', 'warmup_max_seconds', fallback=2.0)
+        self.warmup_max_bytes = min(self.cache_size_limit,
+                                    file_system.config.getint('Cache', 'warmup_max_bytes', fallback=8 * 1024 * 1024))
+        self.warmup_stats = {'entries': 0, 'bytes': 0, 'skipped': 0, 'seconds': 0.0, 'finished': False}
+        self._warmup_thread: Optional[threading.Thread] = None
+        
+        # 文件索引：文件名/扩展名（小写）-> 节点编号集合，路径在查询时由节点编号计算
+        self.file_index: Dict[str, set] = {}
+        self._index_keys: Dict[int, Tuple[str, ...]] = {}  # 节点编号 -> 该文件登记的索引键
+        # 名称索引：文件和目录的名称（小写）-> 节点编号集合，以及名称的三元组索引（用于子串查询）
+        self.name_index: Dict[str, set] = {}
+        self._node_names: Dict[int, str] = {}
+        self.name_trigrams = TrigramIndex()
+        self.hidden_ids = set()  # 被隐藏的节点编号
+
+        # 文件内容的全文索引（保存到 content_index.json，启动时只为内容有变化的文件重建）
+        self.content_index = FullTextIndex()
+        self._content_index_dirty = False
+        
+        # 性能监控数据：由后台采样线程定时写入（保存最近100次监控数据）
+        sample_interval = file_system.config.getfloat('Monitor', 'sample_interval', fallback=5.0)
+        self.performance_sampler = PerformanceSampler(self._collect_performance_sample,
+                                                      interval=sample_interval, history_size=100)
+        self.performance_history = self.performance_sampler.history
+
+        # 文件系统各公开方法的调用次数、失败次数和耗时分布（按操作和按用户），关闭时没有开销
+        self.file_system_hooks = MethodHooks(file_system, FILE_SYSTEM_OPERATIONS)
+        self.operation_metrics = OperationMetrics(self.file_system_hooks)
+        if config.getboolean('Metrics', 'enabled', fallback=True):
+            self.operation_metrics.enable()
+
+        # 慢操作记录：超过阈值的调用连同参数和各阶段耗时放入环形缓冲区，可导出为 JSON Lines
+        self.slow_ops_file = os.path.join(file_system.data_dir, 'slow_ops.jsonl')
+        self.slow_ops = SlowOpRecorder(
+            threshold_ms=config.getfloat('SlowOps', 'threshold_ms', fallback=200.0),
+            capacity=config.getint('SlowOps', 'capacity', fallback=200),
+            capture_stack=config.getboolean('SlowOps', 'capture_stack', fallback=False))
+        self.slow_ops.context_callbacks['paste_items'] = lambda: {'items': len(file_system.clipboard['items'])}
+        self.slow_ops.watch(self.file_system_hooks, 'FileSystem')
+        self.slow_ops.watch(MethodHooks(self, SYSTEM_MONITOR_OPERATIONS), 'SystemMonitor')
+        self.slow_ops.watch_phases(MethodHooks(file_system, FILE_SYSTEM_PHASES), FILE_SYSTEM_PHASES)
+        if file_system.journal is not None:
+            self.slow_ops.watch_phases(MethodHooks(file_system.journal, JOURNAL_PHASES), JOURNAL_PHASES)
+        self.slow_ops.watch_phases(MethodHooks(file_system.blob_store, BLOB_STORE_PHASES), BLOB_STORE_PHASES)
+        if config.getboolean('SlowOps', 'enabled', fallback=True):
+            self.slow_ops.enable()
+
+        # 按需开启的性能分析（采样或 cProfile），结果写成折叠调用栈文件
+        self.profiler = SessionProfiler(
+            os.path.join(file_system.data_dir, config.get('Profiler', 'directory', fallback='profiles')),
+            interval=config.getfloat('Profiler', 'interval', fallback=0.005),
+            top_n=config.getint('Profiler', 'top_n', fallback=30))
+
+        # Prometheus 文本格式的监控指标：可选的本机 HTTP 服务和定时写出的指标文件（均在后台线程）
+        self.started_at = time.time()
+        self.metrics_exporter = MetricsExporter(
+            self.export_prometheus_metrics,
+            host=config.get('MetricsExport', 'host', fallback='127.0.0.1'),
+            port=config.getint('MetricsExport', 'port', fallback=9464)
+            if config.getboolean('MetricsExport', 'http_enabled', fallback=False) else 0,
+            dump_file=os.path.join(file_system.data_dir,
+                                   config.get('MetricsExport', 'dump_file', fallback='metrics.prom')),
+            dump_interval=config.getfloat('MetricsExport', 'dump_interval', fallback=0.0))
         
         # 加载现有数据
         self.load_data()
         
         # 启动后台索引
         self.start_background_indexing()
+
+        # 启动访问日志的后台写入；退出时写出访问统计和日志快照（关闭窗口时由 FileSystem.flush 写出）
+        self.access_log_writer.start()
+        atexit.register(self.save_access_data)
+
+        # 启动性能采样；CPU使用率按两次采样之间的间隔计算，这里先调用一次作为起点
+        psutil.cpu_percent(interval=None)
+        self.performance_sampler.start()
+
+        # 按热点清单在后台预热文件缓存；退出时写出新的清单（关闭窗口时由 FileSystem.flush 写出）
+        self.start_cache_warmup()
+        atexit.register(self.save_cache_manifest)
+
+        # 启动监控指标的导出
+        self.metrics_exporter.start()
     
     def load_data(self):
         """加载现有数据"""
@@ -54,71 +163,130 @@ class SystemMonitor:
             if os.path.exists(self.log_file):
                 with open(self.log_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                    self.access_log = deque(data.get('access_log', []), maxlen=1000)
+                    self.access_log.clear()
+                    self.access_log.import_entries(data.get('access_log', []))
         except Exception as e:
             print(f"加载访问日志失败: {e}")
+
+        # 加载访问统计，并补计日志中比统计更新的记录（统计和日志不是同时写出的）；
+        # 没有统计文件时（旧版本的数据）由已加载的访问日志补建
+        try:
+            if os.path.exists(self.access_stats_file):
+                with open(self.access_stats_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.access_stats.load_dict(data)
+                since = data.get('last_timestamp')  # 旧版本的统计文件没有记录时间，不补计
+                if since is not None:
+                    for timestamp, file_path, operation, username, _ in self.access_log.iter_entries():
+                        if timestamp > since:
+                            self.access_stats.record(timestamp, file_path, operation, username)
+            else:
+                for timestamp, file_path, operation, username, _ in self.access_log.iter_entries():
+                    self.access_stats.record(timestamp, file_path, operation, username)
+        except Exception as e:
+            print(f"加载访问统计失败: {e}")
         
-        # 加载文件缓存
+        # 加载文件缓存的热点清单（旧版本保存的缓存内容不再读取）
         try:
             if os.path.exists(self.cache_file):
                 with open(self.cache_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                    self.file_cache = data.get('cache', {})
-                    self.current_cache_size = data.get('size', 0)
+                    self._warmup_manifest = data.get('manifest', [])
         except Exception as e:
-            print(f"加载文件缓存失败: {e}")
+            print(f"加载文件缓存清单失败: {e}")
         
-        # 加载文件索引
+        # 文件索引不从 file_index.json 加载，启动时根据内存中的目录树建立，之后增量维护
+
+        # 加载全文索引
         try:
-            if os.path.exists(self.index_file):
-                with open(self.index_file, 'r', encoding='utf-8') as f:
-                    self.file_index = json.load(f)
+            if os.path.exists(self.content_index_file):
+                with open(self.content_index_file, 'r', encoding='utf-8') as f:
+                    self.content_index = FullTextIndex.from_dict(json.load(f))
         except Exception as e:
-            print(f"加载文件索引失败: {e}")
+            print(f"加载全文索引失败: {e}")
     
     def save_data(self):
         """保存数据"""
-        # 保存访问日志
+        # 保存访问统计和访问日志
+        self.save_access_data()
+
+        # 保存文件缓存的热点清单
+        self.save_cache_manifest()
+        
+        # 保存文件索引
+        try:
+            with open(self.index_file, 'w', encoding='utf-8') as f:
+                json.dump(self.export_file_index(), f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            print(f"保存文件索引失败: {e}")
+
+        # 保存全文索引
+        self._content_index_dirty = True
+        self.save_content_index()
+
+    def save_access_data(self):
+        """
+        把访问统计写入 access_stats.json、最近的 log_snapshot_entries 条访问日志写入 system_log.json；
+        先写统计，两次写出之间新增的记录在下次加载时按统计中的 last_timestamp 补计
+        """
+        try:
+            tmp_file = self.access_stats_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.access_stats.to_dict(), f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_file, self.access_stats_file)
+        except Exception as e:
+            print(f"保存访问统计失败: {e}")
+
         try:
-            with open(self.log_file, 'w', encoding='utf-8') as f:
+            tmp_file = self.log_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
                 json.dump({
-                    'access_log': list(self.access_log),
+                    'access_log': self.access_log.export_entries(self.log_snapshot_entries),
                     'last_update': datetime.datetime.now().isoformat()
                 }, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_file, self.log_file)
         except Exception as e:
             print(f"保存访问日志失败: {e}")
-        
-        # 保存文件缓存
+
+    def save_cache_manifest(self):
+        """把文件缓存的热点清单写入 file_cache.json（不保存内容，内容以内容存储为准）"""
         try:
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
+            tmp_file = self.cache_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
                 json.dump({
-                    'cache': self.file_cache,
+                    'manifest': self.export_cache_manifest(),
                     'size': self.current_cache_size,
                     'last_update': datetime.datetime.now().isoformat()
                 }, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_file, self.cache_file)
         except Exception as e:
-            print(f"保存文件缓存失败: {e}")
-        
-        # 保存文件索引
+            print(f"保存文件缓存清单失败: {e}")
+
+    def save_content_index(self):
+        """全文索引有变化时写入 content_index.json"""
+        if not self._content_index_dirty:
+            return
         try:
-            with open(self.index_file, 'w', encoding='utf-8') as f:
-                json.dump(self.file_index, f, indent=2, ensure_ascii=False)
+            tmp_file = self.content_index_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.content_index.to_dict(), f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_file, self.content_index_file)
+            self._content_index_dirty = False
         except Exception as e:
-            print(f"保存文件索引失败: {e}")
+            print(f"保存全文索引失败: {e}")
     
     def log_file_access(self, file_path: str, operation: str, username: str, success: bool = True):
-        """记录文件访问日志"""
-        log_entry = {
-            'timestamp': datetime.datetime.now().isoformat(),
-            'file_path': file_path,
-            'operation': operation,  # read, write, delete, create, etc.
-            'username': username,
-            'success': success
-        }
-        self.access_log.append(log_entry)
+        """记录文件访问日志（operation: read, write, delete, create 等；写盘由后台线程完成）"""
+        entry = (time.time(), file_path, operation, username, success)
+        self.access_log_writer.append(entry)
+        self.access_stats.record(entry[0], file_path, operation, username)
+        self.access_log.append(*entry)
     
-    def get_disk_usage_stats(self) -> Dict:
-        """获取磁盘使用统计"""
+    def get_disk_usage_stats(self, include_directory_stats: bool = True) -> Dict:
+        """
+        获取磁盘使用统计（读取文件系统增量维护的目录汇总，整棵树的统计为 O(1)）
+        directory_stats 需要列出每个目录，只需要总量时可传 include_directory_stats=False
+        """
         stats = {
             'total_files': 0,
             'total_dirs': 0,
@@ -127,240 +295,515 @@ class SystemMonitor:
             'file_type_stats': {},
             'user_stats': {}
         }
-        
-        def analyze_directory(node, path):
-            """递归分析目录"""
-            if not isinstance(node, dict):
-                return
-            
-            if node.get('type') == 'dir':
-                stats['total_dirs'] += 1
-                dir_name = node.get('name', '')
-                
-                # 按目录统计
-                if path not in stats['directory_stats']:
-                    stats['directory_stats'][path] = {
-                        'files': 0,
-                        'dirs': 0,
-                        'size': 0
-                    }
-                
-                # 分析子项
-                for child in node.get('children', []):
-                    if isinstance(child, dict):
-                        child_path = child.get('path', '')
-                        if child.get('type') == 'file':
-                            stats['total_files'] += 1
-                            stats['directory_stats'][path]['files'] += 1
-                            
-                            # 文件大小
-                            file_size = child.get('size', 0)
-                            stats['total_size'] += file_size
-                            stats['directory_stats'][path]['size'] += file_size
-                            
-                            # 文件类型统计
-                            file_name = child.get('name', '')
-                            if '.' in file_name:
-                                ext = file_name.split('.')[-1].lower()
-                                stats['file_type_stats'][ext] = stats['file_type_stats'].get(ext, 0) + 1
-                            
-                            # 用户统计
-                            owner = child.get('owner', 'unknown')
-                            if owner not in stats['user_stats']:
-                                stats['user_stats'][owner] = {
-                                    'files': 0,
-                                    'size': 0
-                                }
-                            stats['user_stats'][owner]['files'] += 1
-                            stats['user_stats'][owner]['size'] += file_size
-                        else:
-                            stats['directory_stats'][path]['dirs'] += 1
-                            analyze_directory(child, child_path)
-        
-        # 分析根目录
+
         root_node = self.file_system.file_system.get('root')
-        if root_node:
-            analyze_directory(root_node, '/')
-        
+        usage = self.file_system.disk_usage.get(root_node) if root_node else None
+        if usage is None:
+            return stats
+
+        totals = usage.to_dict()
+        stats['total_files'] = totals['files']
+        stats['total_dirs'] = totals['dirs'] + 1  # 包括根目录
+        stats['total_size'] = totals['size']
+        stats['file_type_stats'] = totals['file_type_stats']
+        stats['user_stats'] = totals['user_stats']
+
+        if include_directory_stats:
+            # 按目录统计直接子项
+            rollups = self.file_system.disk_usage
+            for node in list(self.file_system._nodes.values()):
+                dir_usage = rollups.get(node)
+                if dir_usage is None:
+                    continue
+                stats['directory_stats'][self.file_system.get_node_path(node)] = {
+                    'files': dir_usage.direct_files,
+                    'dirs': dir_usage.direct_dirs,
+                    'size': dir_usage.direct_size
+                }
+
         return stats
     
     def get_performance_stats(self) -> Dict:
-        """获取系统性能统计"""
-        # 获取系统信息
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
-        
-        # 计算缓存命中率
-        cache_hits = getattr(self, 'cache_hits', 0)
-        cache_misses = getattr(self, 'cache_misses', 0)
+        """
+        获取系统性能统计（读取后台线程最近一次的采样结果，不会阻塞）；
+        还没有采样结果且立即采样也失败时，主机资源各项为0，调用方不需要判断None
+        """
+        performance_data = self.performance_sampler.latest()
+        if performance_data is None:
+            performance_data = self.performance_sampler.sample_now()
+        if performance_data is None:
+            performance_data = self._default_performance_sample()
+        return performance_data
+
+    def _default_performance_sample(self) -> Dict:
+        """主机资源各项为0的性能数据，缓存和索引的数据直接读取计数器"""
+        cache_hits = self.file_cache.hits
+        cache_misses = self.file_cache.misses
         total_requests = cache_hits + cache_misses
         cache_hit_rate = (cache_hits / total_requests * 100) if total_requests > 0 else 0
         
-        performance_data = {
+        return {
             'timestamp': datetime.datetime.now().isoformat(),
-            'cpu_usage': cpu_percent,
-            'memory_usage': memory.percent,
-            'memory_available': memory.available,
-            'memory_total': memory.total,
-            'disk_usage': disk.percent,
-            'disk_free': disk.free,
-            'disk_total': disk.total,
+            'cpu_usage': 0.0,
+            'memory_usage': 0.0,
+            'memory_available': 0,
+            'memory_total': 0,
+            'disk_usage': 0.0,
+            'disk_free': 0,
+            'disk_total': 0,
             'cache_hit_rate': cache_hit_rate,
             'cache_size': self.current_cache_size,
             'cache_entries': len(self.file_cache),
+            'cache_hits': cache_hits,
+            'cache_misses': cache_misses,
+            'cache_evictions': self.file_cache.evictions,
             'index_entries': len(self.file_index)
         }
+
+    def _collect_performance_sample(self) -> Dict:
+        """采集一次性能数据（在采样线程中调用）"""
+        # 获取系统信息：CPU使用率为距上一次采样以来的平均值，不阻塞等待
+        cpu_percent = psutil.cpu_percent(interval=None)
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage('/')
         
-        self.performance_history.append(performance_data)
+        performance_data = self._default_performance_sample()
+        performance_data.update({
+            'cpu_usage': cpu_percent,
+            'memory_usage': memory.percent,
+            'memory_available': memory.available,
+            'memory_total': memory.total,
+            'disk_usage': disk.percent,
+            'disk_free': disk.free,
+            'disk_total': disk.total
+        })
         return performance_data
     
+    def get_operation_stats(self, by_user: bool = False, username: Optional[str] = None) -> List[Dict]:
+        """文件系统各操作的调用次数、失败次数和耗时（毫秒，p50/p95/p99/最大），by_user 为按用户分别统计"""
+        if by_user or username is not None:
+            return self.operation_metrics.user_snapshot(username)
+        return self.operation_metrics.snapshot()
+
+    def set_operation_metrics_enabled(self, enabled: bool):
+        """开启或关闭操作耗时统计（已有的统计保留）"""
+        if enabled:
+            self.operation_metrics.enable()
+        else:
+            self.operation_metrics.disable()
+
+    def reset_operation_stats(self):
+        self.operation_metrics.reset()
+
+    def get_slow_operations(self, limit: Optional[int] = None) -> List[Dict]:
+        """最近耗时超过阈值的操作（参数、各阶段耗时），最新的在最后"""
+        return self.slow_ops.records(limit)
+
+    def set_slow_ops_enabled(self, enabled: bool):
+        """开启或关闭慢操作记录"""
+        if enabled:
+            self.slow_ops.enable()
+        else:
+            self.slow_ops.disable()
+
+    def export_slow_operations(self, file_path: Optional[str] = None) -> int:
+        """把记录的慢操作导出为 JSON Lines 文件（默认 data/slow_ops.jsonl），返回条数"""
+        try:
+            return self.slow_ops.export_jsonl(file_path or self.slow_ops_file)
+        except Exception as e:
+            print(f"导出慢操作记录失败: {e}")
+            return 0
+
+    def start_profiling(self, mode: str = 'sampling', duration: Optional[float] = None) -> bool:
+        """开始性能分析（sampling 或 cprofile），duration 秒后自动结束；cprofile 只分析调用线程"""
+        return self.profiler.start(mode, duration)
+
+    def stop_profiling(self) -> Optional[Dict]:
+        """结束性能分析，返回耗时最多的函数和折叠调用栈文件路径"""
+        return self.profiler.stop()
+
+    def poll_profiling(self) -> Dict:
+        """到时间时结束性能分析（由界面定时器调用），返回当前状态"""
+        self.profiler.poll()
+        return self.profiler.status()
+
+    def get_profile_result(self) -> Optional[Dict]:
+        return self.profiler.last_result
+
+    def export_prometheus_metrics(self) -> str:
+        """
+        以 Prometheus 文本格式导出各项计数器（可在任意线程调用）
+        只读取已维护的计数和汇总：CPU、内存取后台采样线程最近一次的结果，节点数取根目录的汇总
+        """
+        metrics = MetricsText('vfs_')
+        fs = self.file_system
+        metrics.gauge('start_time_seconds', '系统监控器启动的时间（Unix 时间戳）', self.started_at)
+
+        # 文件内容缓存
+        cache = self.file_cache
+        metrics.counter('cache_hits_total', '文件内容缓存命中次数', cache.hits)
+        metrics.counter('cache_misses_total', '文件内容缓存未命中次数', cache.misses)
+        metrics.counter('cache_evictions_total', '文件内容缓存淘汰次数', cache.evictions)
+        metrics.counter('cache_rejections_total', '未被缓存准入的条目数', cache.rejections)
+        metrics.gauge('cache_entries', '文件内容缓存的条目数', len(cache))
+        metrics.gauge('cache_size_bytes', '文件内容缓存的字节数', cache.size)
+        metrics.gauge('cache_capacity_bytes', '文件内容缓存的容量', cache.capacity)
+
+        # 索引
+        metrics.add('index_entries', 'gauge', '各索引的条目数', [
+            ({'index': 'file'}, len(self.file_index)),
+            ({'index': 'name'}, len(self.name_index)),
+            ({'index': 'name_trigram'}, len(self.name_trigrams)),
+            ({'index': 'content'}, len(self.content_index)),
+        ])
+
+        # 目录树（根目录的增量汇总）
+        root_node = fs.file_system.get('root')
+        usage = fs.disk_usage.get(root_node) if root_node else None
+        if usage is not None:
+            metrics.add('tree_nodes', 'gauge', '目录树中的节点数', [
+                ({'type': 'file'}, usage.files), ({'type': 'dir'}, usage.dirs + 1)])
+            metrics.gauge('tree_size_bytes', '所有文件的总字节数', usage.size)
+
+        # 保存
+        scheduler = fs.save_scheduler
+        if scheduler is not None:
+            metrics.counter('save_flushes_total', '保存调度器写盘次数', scheduler.flush_count)
+            metrics.counter('save_flush_seconds_total', '保存调度器写盘的累计耗时', scheduler.flush_seconds)
+            metrics.gauge('save_last_flush_seconds', '最近一次写盘的耗时', scheduler.last_flush_seconds)
+            metrics.counter('save_operations_total', '提交的修改次数', scheduler.total_operations)
+            metrics.gauge('save_pending_operations', '尚未写盘的修改次数', scheduler.pending)
+        journal = fs.journal
+        metrics.counter('journal_bytes_written_total', '追加到操作日志的字节数',
+                        journal.bytes_written if journal else 0)
+        metrics.counter('snapshots_written_total', '写出的文件系统快照数',
+                        (journal.snapshot_count if journal else 0) + fs.snapshot_count)
+        metrics.counter('snapshot_bytes_written_total', '写出的文件系统快照字节数',
+                        (journal.snapshot_bytes if journal else 0) + fs.snapshot_bytes)
+        metrics.counter('blobs_written_total', '写入的文件内容数', fs.blob_store.blobs_written)
+        metrics.counter('blob_bytes_written_total', '写入的文件内容字节数', fs.blob_store.bytes_written)
+
+        # 访问日志
+        writer = self.access_log_writer
+        metrics.counter('access_log_entries_written_total', '写入日志段的访问记录数', writer.written)
+        metrics.counter('access_log_entries_dropped_total', '丢弃的访问记录数', writer.dropped)
+        metrics.counter('access_log_flushes_total', '访问日志批量写入次数', writer.flush_count)
+        metrics.gauge('access_log_pending_entries', '等待写入的访问记录数', writer.pending())
+        metrics.gauge('access_log_memory_entries', '内存中保留的访问记录数', len(self.access_log))
+
+        # 操作耗时（按操作的 summary，分位数来自对数-线性直方图）
+        for stats in self.operation_metrics.snapshot():
+            labels = {'operation': stats['operation']}
+            metrics.add('operation_duration_seconds', 'summary', '文件系统操作的耗时',
+                        [(dict(labels, quantile=quantile), stats[key] / 1000)
+                         for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms'), ('0.99', 'p99_ms'))])
+            metrics.add('operation_duration_seconds', 'summary', '文件系统操作的耗时',
+                        [(labels, stats['mean_ms'] * stats['calls'] / 1000)], suffix='_sum')
+            metrics.add('operation_duration_seconds', 'summary', '文件系统操作的耗时',
+                        [(labels, stats['calls'])], suffix='_count')
+            metrics.add('operation_errors_total', 'counter', '失败的文件系统操作次数', [(labels, stats['errors'])])
+        metrics.counter('slow_operations_total', '记录的慢操作次数', self.slow_ops.recorded)
+
+        # 主机资源（后台采样线程最近一次的结果，尚无采样时不输出）
+        performance = self.performance_sampler.latest()
+        if performance is not None:
+            metrics.gauge('host_cpu_percent', 'CPU 使用率（两次采样之间的平均值）', performance['cpu_usage'])
+            metrics.gauge('host_memory_percent', '内存使用率', performance['memory_usage'])
+            metrics.gauge('host_disk_percent', '磁盘使用率', performance['disk_usage'])
+        return metrics.render()
+
+    def dump_prometheus_metrics(self, file_path: Optional[str] = None) -> bool:
+        """把监控指标写成文件（默认 data/metrics.prom）"""
+        return self.metrics_exporter.dump(file_path)
+
     def get_access_log_summary(self, hours: int = 24) -> Dict:
-        """获取访问日志摘要"""
-        now = datetime.datetime.now()
-        cutoff_time = now - datetime.timedelta(hours=hours)
-        
-        recent_logs = []
-        for log in self.access_log:
-            try:
-                log_time = datetime.datetime.fromisoformat(log['timestamp'])
-                if log_time >= cutoff_time:
-                    recent_logs.append(log)
-            except:
-                continue
-        
-        # 统计操作类型
-        operation_stats = defaultdict(int)
-        user_stats = defaultdict(int)
-        file_stats = defaultdict(int)
-        
-        for log in recent_logs:
-            operation_stats[log['operation']] += 1
-            user_stats[log['username']] += 1
-            file_stats[log['file_path']] += 1
-        
-        return {
-            'total_operations': len(recent_logs),
-            'operation_stats': dict(operation_stats),
-            'user_stats': dict(user_stats),
-            'most_accessed_files': sorted(file_stats.items(), key=lambda x: x[1], reverse=True)[:10],
-            'time_range': f"最近{hours}小时"
-        }
-    
-    def cache_file_content(self, file_path: str, content: str) -> bool:
-        """缓存文件内容"""
-        content_size = len(content.encode('utf-8'))
-        
-        # 检查缓存大小限制
-        if self.current_cache_size + content_size > self.cache_size_limit:
-            # 清理最旧的缓存项
-            self.cleanup_cache()
-        
-        # 如果仍然超出限制，不缓存
-        if self.current_cache_size + content_size > self.cache_size_limit:
-            return False
-        
-        # 添加到缓存
-        self.file_cache[file_path] = {
-            'content': content,
-            'size': content_size,
-            'timestamp': datetime.datetime.now().isoformat(),
-            'access_count': 0
-        }
-        self.current_cache_size += content_size
-        return True
+        """获取访问日志摘要（合并预聚合的时间桶，与日志条数无关）"""
+        summary = self.access_stats.summary(time.time() - hours * 3600)
+        summary['time_range'] = f"最近{hours}小时"
+        return summary
+
+    def query_access_log(self, hours: Optional[float] = None, username: Optional[str] = None,
+                         path_prefix: Optional[str] = None) -> List[Dict]:
+        """按时间（最近 hours 小时）、用户和路径前缀查询内存中的访问日志，返回 system_log.json 格式的记录"""
+        start = time.time() - hours * 3600 if hours is not None else None
+        return [entry_to_dict(entry) for entry in
+                self.access_log.query(start=start, username=username, path_prefix=path_prefix)]
+
+    def get_top_accessed_files(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """全部时间内访问最多的文件（Space-Saving 近似计数）"""
+        return self.access_stats.heavy_hitters.top(limit)
     
-    def get_cached_content(self, file_path: str) -> Optional[str]:
-        """获取缓存的文件内容"""
-        if file_path in self.file_cache:
-            self.file_cache[file_path]['access_count'] += 1
-            self.cache_hits = getattr(self, 'cache_hits', 0) + 1
-            return self.file_cache[file_path]['content']
-        
-        self.cache_misses = getattr(self, 'cache_misses', 0) + 1
-        return None
+    @property
+    def current_cache_size(self) -> int:
+        """已缓存的字节数"""
+        return self.file_cache.size
+
+    def cache_file_content(self, file_node: Dict, content: str) -> bool:
+        """缓存文件内容，返回是否被缓存（超过容量或未被准入时不缓存）"""
+        return self.file_cache.put(file_node['id'], (file_node.get('blob'), content),
+                                   len(content.encode('utf-8')))
     
-    def cleanup_cache(self):
-        """清理缓存"""
-        if not self.file_cache:
+    def get_cached_content(self, file_node: Dict) -> Optional[str]:
+        """获取缓存的文件内容（调用方应已检查访问权限）"""
+        version = file_node.get('blob')
+        cached = self.file_cache.get(file_node.get('id'), lambda value: value[0] == version)
+        return cached[1] if cached is not None else None
+
+    def invalidate_cached_content(self, node: Dict):
+        """删除节点（目录则为其下所有文件）的缓存"""
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current.get('type') == 'dir':
+                stack.extend(current.get('children', []))
+            else:
+                self.file_cache.pop(current.get('id'))
+
+    def get_cache_stats(self) -> Dict:
+        """缓存的命中、未命中、淘汰次数和容量，以及启动预热的情况"""
+        stats = self.file_cache.stats()
+        stats['warmup'] = dict(self.warmup_stats)
+        return stats
+
+    def export_cache_manifest(self) -> List[Dict]:
+        """当前缓存中最热的 manifest_size 个条目：节点编号、内容摘要、字节数和访问频率，最热的在前"""
+        entries = []
+        for node_id, (version, _), size in self.file_cache.items():
+            if version is None:
+                continue
+            entries.append({'id': node_id, 'blob': version, 'size': size,
+                            'frequency': self.file_cache.frequency(node_id)})
+        # items() 从冷到热排列，反转后按频率稳定排序
+        entries.reverse()
+        entries.sort(key=lambda entry: entry['frequency'], reverse=True)
+        return entries[:self.manifest_size]
+
+    def start_cache_warmup(self):
+        """启动后台预热线程（没有清单时不启动）"""
+        if not self._warmup_manifest or self._warmup_thread is not None:
+            self.warmup_stats['finished'] = True
             return
-        
-        # 按访问次数和时间排序，删除最不常用的
-        sorted_cache = sorted(
-            self.file_cache.items(),
-            key=lambda x: (x[1]['access_count'], x[1]['timestamp'])
-        )
-        
-        # 删除前20%的缓存项
-        items_to_remove = int(len(sorted_cache) * 0.2)
-        for i in range(items_to_remove):
-            file_path, cache_data = sorted_cache[i]
-            self.current_cache_size -= cache_data['size']
-            del self.file_cache[file_path]
+        self._warmup_thread = threading.Thread(target=self._warm_cache, name='cache-warmup', daemon=True)
+        self._warmup_thread.start()
+
+    def _warm_cache(self):
+        """
+        按清单从内容存储读取文件放入缓存，超过 warmup_max_seconds 或 warmup_max_bytes 即停止；
+        节点已删除或内容已改变的条目跳过（缓存值带内容摘要，预热期间文件被修改也不会读到旧内容）
+        """
+        manifest, self._warmup_manifest = self._warmup_manifest, []
+        started = time.monotonic()
+        loaded_bytes = 0
+        try:
+            for entry in manifest:
+                if time.monotonic() - started > self.warmup_max_seconds:
+                    break
+                if loaded_bytes + entry.get('size', 0) > self.warmup_max_bytes:
+                    self.warmup_stats['skipped'] += 1
+                    continue
+                node = self.file_system.get_node_by_id(entry.get('id'))
+                if node is None or node.get('blob') != entry.get('blob') or node.get('id') in self.file_cache:
+                    self.warmup_stats['skipped'] += 1
+                    continue
+                content = self.file_system.blob_store.get(entry['blob'])
+                if content is None:
+                    self.warmup_stats['skipped'] += 1
+                    continue
+                self.file_cache.restore_frequency(node['id'], entry.get('frequency', 0))
+                if self.cache_file_content(node, content):
+                    loaded_bytes += len(content.encode('utf-8'))
+                    self.warmup_stats['entries'] += 1
+                    self.warmup_stats['bytes'] = loaded_bytes
+        except Exception as e:
+            print(f"预热文件缓存失败: {e}")
+        self.warmup_stats['seconds'] = time.monotonic() - started
+        self.warmup_stats['finished'] = True
     
     def start_background_indexing(self):
-        """启动后台索引"""
-        # 这里可以启动一个线程来定期重建索引
-        # 为了简化，我们在这里直接构建索引
+        """建立文件索引，并订阅文件系统的修改以增量更新索引"""
         self.build_file_index()
+        self.file_system.add_listener(self._on_file_system_change)
     
     def build_file_index(self):
-        """构建文件索引"""
+        """全量重建文件索引（启动时和修复索引时使用，平时由修改事件增量维护）"""
         self.file_index = {}
-        
-        def index_directory(node, path):
-            """递归索引目录"""
-            if not isinstance(node, dict):
-                return
-            
-            if node.get('type') == 'file':
-                file_name = node.get('name', '').lower()
-                file_path = node.get('path', '')
-                
-                # 按文件名索引
-                if file_name not in self.file_index:
-                    self.file_index[file_name] = []
-                self.file_index[file_name].append(file_path)
-                
-                # 按扩展名索引
-                if '.' in file_name:
-                    ext = file_name.split('.')[-1]
-                    ext_key = f"*.{ext}"
-                    if ext_key not in self.file_index:
-                        self.file_index[ext_key] = []
-                    self.file_index[ext_key].append(file_path)
-            
-            # 递归处理子项
-            for child in node.get('children', []):
-                if isinstance(child, dict):
-                    child_path = child.get('path', '')
-                    index_directory(child, child_path)
-        
-        # 索引根目录
+        self._index_keys = {}
+        self.name_index = {}
+        self._node_names = {}
+        self.name_trigrams = TrigramIndex()
+        self.hidden_ids = set()
         root_node = self.file_system.file_system.get('root')
         if root_node:
-            index_directory(root_node, '/')
+            # 根目录本身不参与搜索
+            for child in root_node.get('children', []):
+                self._index_subtree(child)
+        # 全文索引中已不存在的文件
+        for doc_id in [doc_id for doc_id in self.content_index.doc_ids() if doc_id not in self._index_keys]:
+            self.content_index.remove_document(doc_id)
+            self._content_index_dirty = True
+
+    @staticmethod
+    def _index_keys_for(file_name: str) -> Tuple[str, ...]:
+        """文件名对应的索引键：小写文件名，以及 *.扩展名"""
+        file_name = file_name.lower()
+        if '.' in file_name:
+            return (file_name, f"*.{file_name.split('.')[-1]}")
+        return (file_name,)
+
+    def _index_subtree(self, node: Dict):
+        """登记节点及其所有后代"""
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if not isinstance(current, dict):
+                continue
+            if current.get('hidden'):
+                self.hidden_ids.add(current.get('id'))
+            self._index_node(current)
+            if current.get('type') == 'dir':
+                stack.extend(current.get('children', []))
+
+    def _unindex_subtree(self, node: Dict):
+        """移除节点及其所有后代的索引"""
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if not isinstance(current, dict):
+                continue
+            self.hidden_ids.discard(current.get('id'))
+            self._unindex_node(current.get('id'))
+            if current.get('type') == 'dir':
+                stack.extend(current.get('children', []))
+
+    def _index_node(self, node: Dict):
+        """按当前名称登记单个节点（已登记过时先移除旧名称）"""
+        node_id = node.get('id')
+        if node_id in self._node_names:
+            # 改名、移动等：只更新名称，内容未变时不重建全文索引
+            self._unindex_node(node_id, keep_content=True)
+        name = node.get('name', '').lower()
+        self.name_index.setdefault(name, set()).add(node_id)
+        self.name_trigrams.add(name)
+        self._node_names[node_id] = name
+        if node.get('type') == 'file':
+            keys = self._index_keys_for(name)
+            for key in keys:
+                self.file_index.setdefault(key, set()).add(node_id)
+            self._index_keys[node_id] = keys
+            self._index_content(node)
+
+    def _index_content(self, node: Dict):
+        """把文件内容加入全文索引；内容摘要与已索引的相同时跳过，相同内容的其他文件直接复用切分结果"""
+        node_id = node.get('id')
+        blob = node.get('blob')
+        if blob is not None and node_id in self.content_index and self.content_index.blob_of(node_id) == blob:
+            return
+        terms = self.content_index.terms_for_blob(blob) if blob is not None else None
+        if terms is None:
+            if blob is not None:
+                content = self.file_system.blob_store.get(blob) or ''
+            else:
+                content = node.get('content', '')
+            terms = FullTextIndex.analyze(content)
+        self.content_index.add_document(node_id, terms, blob)
+        self._content_index_dirty = True
+
+    def _unindex_node(self, node_id: int, keep_content: bool = False):
+        name = self._node_names.pop(node_id, None)
+        if name is not None:
+            ids = self.name_index[name]
+            ids.discard(node_id)
+            if not ids:
+                del self.name_index[name]
+                self.name_trigrams.remove(name)
+        for key in self._index_keys.pop(node_id, ()):
+            ids = self.file_index.get(key)
+            if ids is not None:
+                ids.discard(node_id)
+                if not ids:
+                    del self.file_index[key]
+        if not keep_content and node_id in self.content_index:
+            self.content_index.remove_document(node_id)
+            self._content_index_dirty = True
+
+    def _on_file_system_change(self, event: str, node: Dict):
+        """文件系统修改事件：只更新受影响的节点（目录改名/移动不影响文件名，路径查询时计算）"""
+        if event == 'add':
+            self._index_subtree(node)
+        elif event == 'remove':
+            self._unindex_subtree(node)
+            self.invalidate_cached_content(node)
+        elif event in ('rename', 'move', 'update'):
+            if event == 'update' and node.get('type') == 'file':
+                cached = self.file_cache.peek(node.get('id'))
+                if cached is not None and cached[0] != node.get('blob'):
+                    self.file_cache.pop(node['id'])
+            if node.get('hidden'):
+                self.hidden_ids.add(node.get('id'))
+            else:
+                self.hidden_ids.discard(node.get('id'))
+            self._index_node(node)
+
+    def is_hidden(self, node: Dict) -> bool:
+        """节点本身或其任一祖先目录被隐藏"""
+        if not self.hidden_ids:
+            return False
+        if node.get('id') in self.hidden_ids:
+            return True
+        return any(parent.get('id') in self.hidden_ids for parent in self.file_system.iter_ancestors(node))
+
+    def _node_paths(self, node_ids, show_hidden: bool = True) -> List[str]:
+        paths = []
+        for node_id in node_ids:
+            node = self.file_system.get_node_by_id(node_id)
+            if node is None or (not show_hidden and self.is_hidden(node)):
+                continue
+            paths.append(self.file_system.get_node_path(node))
+        return paths
+
+    def export_file_index(self) -> Dict[str, List[str]]:
+        """导出为 文件名/扩展名 -> 路径列表 的形式（用于保存 file_index.json）"""
+        return {key: self._node_paths(ids) for key, ids in self.file_index.items()}
     
-    def search_files_fast(self, query: str) -> List[str]:
-        """快速文件搜索（使用索引）"""
+    def search_files_fast(self, query: str, show_hidden: bool = True) -> List[str]:
+        """
+        快速文件搜索（使用索引），结果按 完全匹配、前缀匹配、包含匹配 排序
+        "*.扩展名" 形式的查询直接命中扩展名索引
+        """
         query = query.lower()
-        results = []
+        names = []
         
-        # 精确匹配
-        if query in self.file_index:
-            results.extend(self.file_index[query])
+        # 扩展名精确匹配
+        if query.startswith('*.') and query in self.file_index:
+            names.append(query)
         
-        # 模糊匹配
-        for file_name, file_paths in self.file_index.items():
-            if query in file_name and file_name != query:
-                results.extend(file_paths)
+        node_ids = []
+        for name in names:
+            node_ids.extend(sorted(self.file_index[name]))
         
-        return list(set(results))  # 去重
+        # 文件名：三元组索引求候选后确认，并排序
+        node_ids.extend(node['id'] for node in self.search_nodes(query) if node.get('type') == 'file')
+        return self._node_paths(dict.fromkeys(node_ids), show_hidden)
+
+    def search_content(self, query: str, limit: int = None):
+        """按文件内容搜索（BM25 排序），逐个返回文件节点"""
+        for node_id, _ in self.content_index.search(query, limit):
+            node = self.file_system.get_node_by_id(node_id)
+            if node is not None:
+                yield node
+
+    def search_nodes(self, query: str):
+        """按名称搜索文件和目录，按 完全匹配、前缀匹配、包含匹配 的顺序逐个返回节点"""
+        for name in self.name_trigrams.search_ranked(query.lower()):
+            for node_id in sorted(self.name_index.get(name, ())):
+                node = self.file_system.get_node_by_id(node_id)
+                if node is not None:
+                    yield node
     
     def get_system_health_report(self) -> Dict:
         """获取系统健康报告"""
         performance = self.get_performance_stats()
-        disk_usage = self.get_disk_usage_stats()
+        disk_usage = self.get_disk_usage_stats(include_directory_stats=False)
         access_summary = self.get_access_log_summary()
         
         # 健康评分
@@ -415,16 +858,10 @@ class SystemMonitor:
         cutoff_time = datetime.datetime.now() - datetime.timedelta(days=days)
         
         # 清理访问日志
-        new_logs = []
-        for log in self.access_log:
-            try:
-                log_time = datetime.datetime.fromisoformat(log['timestamp'])
-                if log_time >= cutoff_time:
-                    new_logs.append(log)
-            except:
-                continue
-        
-        self.access_log = deque(new_logs, maxlen=1000)
+        self.access_log.remove_before(cutoff_time.timestamp())
+
+        # 删除过期的日志段
+        self.access_log_writer.remove_segments_before(cutoff_time.timestamp())
         
         # 保存更新后的数据
         self.save_data() 
\ No newline at end of file
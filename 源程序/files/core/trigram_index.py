@@ -0,0 +1,95 @@
+##########################################
+#            文件名三元组索引模块
+#             作者：李嘉
+#           学号：3123009043
+#          班级：23人工智能1班
+#         指导教师：苏畅、李剑锋
+###########################################
+"""
+文件名的三元组（trigram）倒排索引
+每个名称按连续的三个字符切分，查询时取查询串所有三元组的倒排表求交集得到候选，
+再逐个确认是否真的包含查询串，避免每次查询都扫描全部文件名
+"""
+
+from typing import Dict, Iterable, List, Set
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """名称的三元组倒排索引（名称应已转为小写）"""
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._postings: Dict[str, Set[str]] = {}  # 三元组 -> 包含它的名称
+        self._short_names: Set[str] = set()       # 不足三个字符的名称没有三元组，单独保存
+        self._count = 0
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, name: str):
+        if len(name) < 3:
+            if name not in self._short_names:
+                self._short_names.add(name)
+                self._count += 1
+            return
+        grams = _trigrams(name)
+        if name in self._postings.get(next(iter(grams)), ()):
+            return
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(name)
+        self._count += 1
+
+    def remove(self, name: str):
+        if len(name) < 3:
+            if name in self._short_names:
+                self._short_names.discard(name)
+                self._count -= 1
+            return
+        removed = False
+        for gram in _trigrams(name):
+            names = self._postings.get(gram)
+            if names is None or name not in names:
+                continue
+            names.discard(name)
+            removed = True
+            if not names:
+                del self._postings[gram]
+        if removed:
+            self._count -= 1
+
+    def search(self, query: str) -> Set[str]:
+        """返回包含 query 的所有名称"""
+        if not query:
+            return set(self._short_names).union(*self._postings.values())
+        if len(query) >= 3:
+            postings = []
+            for gram in _trigrams(query):
+                names = self._postings.get(gram)
+                if not names:
+                    return set()
+                postings.append(names)
+            # 从最短的倒排表开始求交集
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for names in postings[1:]:
+                candidates &= names
+                if not candidates:
+                    return candidates
+        else:
+            # 一两个字符的查询：包含它的三元组的倒排表之并，加上短名称
+            candidates = {name for name in self._short_names if query in name}
+            for gram, names in self._postings.items():
+                if query in gram:
+                    candidates |= names
+            return candidates
+        return {name for name in candidates if query in name}
+
+    def search_ranked(self, query: str) -> List[str]:
+        """按 完全匹配、前缀匹配、包含匹配 的顺序返回名称，同一档内短名称优先"""
+        matches = self.search(query)
+        return sorted(matches, key=lambda name: (name != query, not name.startswith(query), len(name), name))
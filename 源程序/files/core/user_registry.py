@@ -0,0 +1,86 @@
+##########################################
+#            用户数据缓存模块
+#             作者：李嘉
+#           学号：3123009043
+#          班级：23人工智能1班
+#         指导教师：苏畅、李剑锋
+###########################################
+"""
+users.json 的进程内缓存
+只在文件的修改时间或大小变化时重新读取，且最多每 check_interval 秒检查一次文件状态，
+权限检查因此基本只是内存操作；其他模块保存用户数据后可调用 invalidate 立即生效
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+
+class UserRegistry:
+    """用户数据缓存（按文件修改时间和大小判断是否需要重新读取）"""
+
+    def __init__(self, users_file: str, check_interval: float = 1.0):
+        self.users_file = users_file
+        self.check_interval = check_interval
+        self._data: Any = None
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._last_check: Optional[float] = None
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.reload_count = 0
+
+    def invalidate(self):
+        """强制下次访问时重新检查文件（保存用户数据后调用）"""
+        with self._lock:
+            self._last_check = None
+            self._stamp = None
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.users_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def get_data(self) -> Any:
+        """返回解析后的 users.json 内容（共享对象，调用方不应修改）"""
+        with self._lock:
+            now = time.monotonic()
+            if self._last_check is not None and now - self._last_check < self.check_interval:
+                return self._data
+            self._last_check = now
+            stamp = self._file_stamp()
+            if stamp is not None and stamp == self._stamp:
+                return self._data
+            self._stamp = stamp
+            self._data = None
+            if stamp is not None:
+                try:
+                    with open(self.users_file, 'r', encoding='utf-8') as f:
+                        self._data = json.load(f)
+                except Exception as e:
+                    print(f"加载用户数据失败: {e}")
+                    # 文件可能正在被写入，下次访问时重试
+                    self._stamp = None
+            self.reload_count += 1
+            return self._data
+
+    def get_users(self) -> Dict:
+        """返回 {用户名: 用户信息} 形式的用户数据，格式不符时返回空字典"""
+        data = self.get_data()
+        if isinstance(data, dict):
+            return data
+        if data is not None:
+            print("用户数据格式错误，返回空字典")
+        return {}
+
+    def get_user(self, username: str) -> Optional[Dict]:
+        user_info = self.get_users().get(username)
+        return user_info if isinstance(user_info, dict) else None
+
+    def is_admin(self, username: str) -> bool:
+        user_info = self.get_user(username)
+        return user_info is not None and user_info.get("role", "user") == "admin"
@@ -0,0 +1,68 @@
+"""
+性能采样的测试：采样函数抛出异常时，采样器返回None，
+系统监控器的性能统计、健康报告和监控指标仍然可用
+"""
+
+import atexit
+import shutil
+import tempfile
+import unittest
+
+from core.performance_sampler import PerformanceSampler
+from core.file_system import FileSystem
+
+
+def _failing_sample():
+    raise RuntimeError("模拟采样失败")
+
+
+class PerformanceSamplerTest(unittest.TestCase):
+
+    def test_sample_now_returns_none_when_callback_raises(self):
+        sampler = PerformanceSampler(_failing_sample, interval=60)
+        self.assertIsNone(sampler.sample_now())
+        self.assertIsNone(sampler.latest())
+        self.assertEqual(sampler.error_count, 1)
+        self.assertEqual(sampler.sample_count, 0)
+
+
+class SystemMonitorPerformanceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.file_system = FileSystem(self.data_dir)
+        self.monitor = self.file_system.system_monitor
+        self.monitor.performance_sampler.stop()
+        self.monitor.performance_sampler._sample_callback = _failing_sample
+        self.monitor.performance_history.clear()
+
+    def tearDown(self):
+        self.file_system.flush()
+        # 数据目录随后删除，退出时不再写出
+        for component in (self.monitor.access_log_writer, self.file_system.save_scheduler):
+            if component is not None:
+                component.stop()
+                atexit.unregister(component.stop)
+        atexit.unregister(self.monitor.save_access_data)
+        atexit.unregister(self.monitor.save_cache_manifest)
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def test_performance_stats_default_when_sample_fails(self):
+        performance = self.monitor.get_performance_stats()
+        self.assertIsNotNone(performance)
+        self.assertEqual(performance['cpu_usage'], 0)
+        self.assertEqual(performance['memory_usage'], 0)
+        self.assertEqual(performance['disk_usage'], 0)
+        self.assertEqual(performance['cache_entries'], len(self.monitor.file_cache))
+        self.assertEqual(self.monitor.performance_sampler.error_count, 1)
+
+    def test_health_report_and_metrics_when_sample_fails(self):
+        report = self.monitor.get_system_health_report()
+        self.assertIn('health_score', report)
+        self.assertIsInstance(report['recommendations'], list)
+        # 没有采样结果时不输出主机资源的指标
+        self.assertNotIn('host_cpu_percent', self.monitor.export_prometheus_metrics())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -19,7 +19,7 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QTreeWidgetItem, QLineEdit, QInputDialog, QDialog,
                              QTextEdit, QDialogButtonBox, QTableWidget, QTableWidgetItem,
                              QFileDialog, QSizePolicy, QFormLayout, QCheckBox, QSpinBox,
-                             QGroupBox, QTabWidget)
+                             QGroupBox, QTabWidget, QApplication)
 from PyQt5.QtCore import Qt, QSize, QTimer
 from PyQt5.QtGui import QIcon, QFont, QPixmap
 
@@ -82,6 +82,10 @@ class AdminWindow(QMainWindow):
         search_layout.addWidget(QLabel("搜索:"))
         search_layout.addWidget(self.search_edit)
         
+        # 勾选后按文件内容搜索（全文索引）
+        self.content_search_checkbox = QCheckBox("搜索内容")
+        search_layout.addWidget(self.content_search_checkbox)
+        
         self.search_button = QPushButton("搜索")
         self.search_button.clicked.connect(self.search_files)
         search_layout.addWidget(self.search_button)
@@ -296,7 +300,7 @@ class AdminWindow(QMainWindow):
 
     def open_user_management(self):
         """打开用户管理对话框"""
-        dialog = UserManagementDialog(self)
+        dialog = UserManagementDialog(self, self.file_system)
         dialog.user_updated.connect(self.on_users_updated)
         dialog.exec_()
         
@@ -327,6 +331,11 @@ Python版本: {platform.python_version()}
         self.monitor_dialog = SystemMonitorDialog(self.file_system, self.file_system.system_monitor, self)
         self.monitor_dialog.show()
 
+    def closeEvent(self, event):
+        """关闭窗口前写出尚未保存的修改"""
+        self.file_system.flush()
+        event.accept()
+
     def show_about(self):
         """显示关于对话框"""
         QMessageBox.about(self, "关于", 
@@ -516,11 +525,17 @@ Python版本: {platform.python_version()}
         # 清空当前列表
         self.list_widget.clear()
         
-        # 递归搜索
-        results = self._search_recursive(self.current_path, search_text)
-        
-        # 显示搜索结果
+        # 使用索引搜索当前目录之下的项目（包括隐藏项目），边搜索边显示
+        content_search = self.content_search_checkbox.isChecked()
+        if content_search:
+            results = self.file_system.search_content(search_text, self.current_path, self.username)
+        else:
+            results = self.file_system.search_items(search_text, self.current_path, self.username)
+        result_count = 0
         for item_data in results:
+            result_count += 1
+            if result_count % 200 == 0:
+                QApplication.processEvents()
             # 构建显示名称：文件名 + 修改时间 + 大小（仅文件）
             display_name = item_data['name']
             
@@ -541,36 +556,16 @@ Python版本: {platform.python_version()}
             list_item.setData(Qt.UserRole, item_data)
             list_item.setIcon(self.icon_provider.get(item_data['type'], self.icon_provider['unknown']))
             
-            # 高亮显示匹配的文件
-            if search_text.lower() in item_data['name'].lower():
+            # 高亮显示匹配的文件（按内容搜索时结果均为匹配项）
+            if content_search or search_text.lower() in item_data['name'].lower():
                 font = list_item.font()
                 font.setBold(True)
                 list_item.setFont(font)
             
             self.list_widget.addItem(list_item)
         
-        self.statusBar().showMessage(f"搜索结果：共找到 {len(results)} 项")
-        
-    def _search_recursive(self, path, search_text):
-        """递归搜索文件和文件夹"""
-        results = []
-        content = self.file_system.get_directory_content(path, self.username, True)  # 显示隐藏文件
+        self.statusBar().showMessage(f"搜索结果：共找到 {result_count} 项")
         
-        if not content:
-            return results
-            
-        for item in content:
-            # 检查当前项是否匹配
-            if search_text.lower() in item['name'].lower():
-                results.append(item)
-            
-            # 如果是目录，递归搜索
-            if item['type'] == 'dir':
-                sub_results = self._search_recursive(item['path'], search_text)
-                results.extend(sub_results)
-        
-        return results
-
     def show_statistics(self):
         """显示统计信息"""
         content = self.file_system.get_directory_content(self.current_path, self.username, self.show_hidden_files)
@@ -883,6 +878,10 @@ class FolderPropertiesDialog(QDialog):
         total_count = file_count + folder_count
         form_layout.addRow('总项目数:', QLabel(str(total_count)))
         
+        # 总大小（整棵子树，读取目录汇总）
+        usage = self.file_system.get_directory_usage(self.folder_data["path"])
+        form_layout.addRow('总大小:', QLabel(f"{usage['size'] if usage else 0} 字节"))
+        
         # 创建时间
         created_time = self.folder_data.get("created", "未知")
         form_layout.addRow('创建时间:', QLabel(created_time))
@@ -352,6 +352,8 @@ class LoginWindow(QWidget):
             os.makedirs(os.path.dirname(users_file), exist_ok=True)
             with open(users_file, 'w', encoding='utf-8') as f:
                 json.dump(users, f, ensure_ascii=False, indent=2)
+            # 让文件系统的用户缓存立即失效
+            self.file_system.user_registry.invalidate()
         except Exception as e:
             print(f"保存用户数据失败: {e}")
     
@@ -8,7 +8,8 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
                              QPushButton, QTextEdit, QTabWidget, QWidget,
                              QListWidget, QListWidgetItem, QProgressBar,
                              QTableWidget, QTableWidgetItem, QGroupBox,
-                             QGridLayout, QSplitter, QFrame, QHeaderView)
+                             QGridLayout, QSplitter, QFrame, QHeaderView, QCheckBox,
+                             QComboBox, QSpinBox)
 from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5.QtGui import QIcon, QFont, QColor
 
@@ -57,6 +58,14 @@ class SystemMonitorDialog(QDialog):
         log_tab = self.create_log_tab()
         tab_widget.addTab(log_tab, "访问日志")
         
+        # 操作耗时标签页
+        operations_tab = self.create_operations_tab()
+        tab_widget.addTab(operations_tab, "操作耗时")
+        
+        # 性能分析标签页
+        profiler_tab = self.create_profiler_tab()
+        tab_widget.addTab(profiler_tab, "性能分析")
+        
         # 系统健康标签页
         health_tab = self.create_health_tab()
         tab_widget.addTab(health_tab, "系统健康")
@@ -130,6 +139,9 @@ class SystemMonitorDialog(QDialog):
         cache_layout.addWidget(QLabel("缓存条目:"), 2, 0)
         self.cache_entries_label = QLabel("0")
         cache_layout.addWidget(self.cache_entries_label, 2, 1)
+        cache_layout.addWidget(QLabel("缓存淘汰:"), 3, 0)
+        self.cache_evictions_label = QLabel("0")
+        cache_layout.addWidget(self.cache_evictions_label, 3, 1)
         cache_group.setLayout(cache_layout)
         layout.addWidget(cache_group)
         
@@ -202,6 +214,105 @@ class SystemMonitorDialog(QDialog):
         widget.setLayout(layout)
         return widget
     
+    def create_operations_tab(self):
+        """创建操作耗时标签页"""
+        widget = QWidget()
+        layout = QVBoxLayout()
+        
+        # 开关
+        control_layout = QHBoxLayout()
+        self.metrics_enabled_checkbox = QCheckBox("统计操作耗时")
+        self.metrics_enabled_checkbox.setChecked(self.system_monitor.operation_metrics.enabled)
+        self.metrics_enabled_checkbox.toggled.connect(self.toggle_operation_metrics)
+        reset_button = QPushButton("清零")
+        reset_button.clicked.connect(self.reset_operation_stats)
+        control_layout.addWidget(self.metrics_enabled_checkbox)
+        control_layout.addStretch()
+        control_layout.addWidget(reset_button)
+        layout.addLayout(control_layout)
+        
+        headers = ["调用次数", "失败", "平均(ms)", "P50(ms)", "P95(ms)", "P99(ms)", "最大(ms)"]
+        
+        # 按操作统计
+        operation_group = QGroupBox("按操作统计")
+        operation_layout = QVBoxLayout()
+        self.operation_stats_table = QTableWidget()
+        self.operation_stats_table.setColumnCount(len(headers) + 1)
+        self.operation_stats_table.setHorizontalHeaderLabels(["操作"] + headers)
+        self.operation_stats_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        operation_layout.addWidget(self.operation_stats_table)
+        operation_group.setLayout(operation_layout)
+        layout.addWidget(operation_group)
+        
+        # 按用户统计
+        user_group = QGroupBox("按用户统计")
+        user_layout = QVBoxLayout()
+        self.user_operation_table = QTableWidget()
+        self.user_operation_table.setColumnCount(len(headers) + 2)
+        self.user_operation_table.setHorizontalHeaderLabels(["用户", "操作"] + headers)
+        self.user_operation_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        user_layout.addWidget(self.user_operation_table)
+        user_group.setLayout(user_layout)
+        layout.addWidget(user_group)
+        
+        widget.setLayout(layout)
+        return widget
+    
+    def create_profiler_tab(self):
+        """创建性能分析标签页"""
+        widget = QWidget()
+        layout = QVBoxLayout()
+        
+        # 分析控制
+        control_group = QGroupBox("分析控制")
+        control_layout = QHBoxLayout()
+        control_layout.addWidget(QLabel("方式:"))
+        self.profile_mode_combo = QComboBox()
+        self.profile_mode_combo.addItem("采样（所有线程）", "sampling")
+        self.profile_mode_combo.addItem("cProfile（界面线程）", "cprofile")
+        control_layout.addWidget(self.profile_mode_combo)
+        control_layout.addWidget(QLabel("时长:"))
+        self.profile_duration_spin = QSpinBox()
+        self.profile_duration_spin.setRange(0, 600)
+        self.profile_duration_spin.setValue(10)
+        self.profile_duration_spin.setSuffix(" 秒")
+        self.profile_duration_spin.setSpecialValueText("手动停止")
+        control_layout.addWidget(self.profile_duration_spin)
+        self.profile_start_button = QPushButton("开始")
+        self.profile_start_button.clicked.connect(self.start_profiling)
+        self.profile_stop_button = QPushButton("停止")
+        self.profile_stop_button.clicked.connect(self.stop_profiling)
+        self.profile_stop_button.setEnabled(False)
+        control_layout.addWidget(self.profile_start_button)
+        control_layout.addWidget(self.profile_stop_button)
+        control_layout.addStretch()
+        control_group.setLayout(control_layout)
+        layout.addWidget(control_group)
+        
+        self.profile_status_label = QLabel("未在分析")
+        layout.addWidget(self.profile_status_label)
+        self.profile_file_label = QLabel("")
+        self.profile_file_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(self.profile_file_label)
+        
+        # 耗时最多的函数
+        top_group = QGroupBox("累计耗时最多的函数")
+        top_layout = QVBoxLayout()
+        self.profile_table = QTableWidget()
+        self.profile_table.setColumnCount(4)
+        self.profile_table.setHorizontalHeaderLabels(["函数", "调用/采样次数", "自身(秒)", "累计(秒)"])
+        self.profile_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        top_layout.addWidget(self.profile_table)
+        top_group.setLayout(top_layout)
+        layout.addWidget(top_group)
+        
+        # 分析进行中时定时检查是否到时间（cProfile 需要在界面线程中结束）
+        self.profile_timer = QTimer()
+        self.profile_timer.timeout.connect(self.update_profiling)
+        
+        widget.setLayout(layout)
+        return widget
+    
     def create_health_tab(self):
         """创建系统健康标签页"""
         widget = QWidget()
@@ -235,6 +346,7 @@ class SystemMonitorDialog(QDialog):
         # 每5秒更新性能数据
         self.performance_timer = QTimer()
         self.performance_timer.timeout.connect(self.update_performance)
+        self.performance_timer.timeout.connect(self.update_operation_stats)
         self.performance_timer.start(5000)
     
     def refresh_data(self):
@@ -242,6 +354,8 @@ class SystemMonitorDialog(QDialog):
         self.update_performance()
         self.update_disk_usage()
         self.update_access_log()
+        self.update_operation_stats()
+        self.update_profiling()
         self.update_health_report()
     
     def update_performance(self):
@@ -272,6 +386,7 @@ class SystemMonitorDialog(QDialog):
             self.cache_size_label.setText(f"{cache_size_mb:.1f} MB")
             
             self.cache_entries_label.setText(str(performance['cache_entries']))
+            self.cache_evictions_label.setText(str(performance['cache_evictions']))
             
         except Exception as e:
             print(f"更新性能数据失败: {e}")
@@ -279,7 +394,7 @@ class SystemMonitorDialog(QDialog):
     def update_disk_usage(self):
         """更新磁盘使用数据"""
         try:
-            disk_stats = self.system_monitor.get_disk_usage_stats()
+            disk_stats = self.system_monitor.get_disk_usage_stats(include_directory_stats=False)
             
             # 总体统计
             self.total_files_label.setText(str(disk_stats['total_files']))
@@ -317,6 +432,92 @@ class SystemMonitorDialog(QDialog):
         except Exception as e:
             print(f"更新访问日志数据失败: {e}")
     
+    def update_operation_stats(self):
+        """更新操作耗时数据"""
+        try:
+            columns = ('calls', 'errors', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms')
+            
+            def fill_row(table, row, labels, stats):
+                for column, text in enumerate(labels):
+                    table.setItem(row, column, QTableWidgetItem(text))
+                for column, key in enumerate(columns, len(labels)):
+                    value = stats[key]
+                    text = str(value) if isinstance(value, int) else f"{value:.2f}"
+                    table.setItem(row, column, QTableWidgetItem(text))
+            
+            operations = self.system_monitor.get_operation_stats()
+            self.operation_stats_table.setRowCount(len(operations))
+            for i, stats in enumerate(operations):
+                fill_row(self.operation_stats_table, i, [stats['operation']], stats)
+            
+            user_operations = self.system_monitor.get_operation_stats(by_user=True)
+            self.user_operation_table.setRowCount(len(user_operations))
+            for i, stats in enumerate(user_operations):
+                fill_row(self.user_operation_table, i, [stats['username'], stats['operation']], stats)
+            
+        except Exception as e:
+            print(f"更新操作耗时数据失败: {e}")
+    
+    def toggle_operation_metrics(self, enabled):
+        """开启或关闭操作耗时统计"""
+        self.system_monitor.set_operation_metrics_enabled(enabled)
+    
+    def reset_operation_stats(self):
+        """清零操作耗时统计"""
+        self.system_monitor.reset_operation_stats()
+        self.update_operation_stats()
+    
+    def start_profiling(self):
+        """开始性能分析"""
+        mode = self.profile_mode_combo.currentData()
+        duration = self.profile_duration_spin.value() or None
+        if not self.system_monitor.start_profiling(mode, duration):
+            self.profile_status_label.setText("无法开始性能分析（已在分析或有其他分析工具）")
+            return
+        self.profile_start_button.setEnabled(False)
+        self.profile_stop_button.setEnabled(True)
+        self.profile_timer.start(500)
+        self.update_profiling()
+    
+    def stop_profiling(self):
+        """停止性能分析并显示结果"""
+        self.system_monitor.stop_profiling()
+        self.update_profiling()
+    
+    def update_profiling(self):
+        """更新性能分析状态，结束后显示结果"""
+        try:
+            status = self.system_monitor.poll_profiling()
+            if status['running']:
+                self.profile_start_button.setEnabled(False)
+                self.profile_stop_button.setEnabled(True)
+                if not self.profile_timer.isActive():
+                    self.profile_timer.start(500)
+                text = f"正在分析: {status['elapsed']:.1f} 秒"
+                if status['remaining'] is not None:
+                    text += f"，剩余 {status['remaining']:.0f} 秒"
+                self.profile_status_label.setText(text)
+                return
+            self.profile_timer.stop()
+            self.profile_start_button.setEnabled(True)
+            self.profile_stop_button.setEnabled(False)
+            result = self.system_monitor.get_profile_result()
+            if result is None:
+                self.profile_status_label.setText("未在分析")
+                return
+            self.profile_status_label.setText(
+                f"上次分析: {result['started'][:19]}，{result['seconds']:.1f} 秒，方式 {result['mode']}")
+            self.profile_file_label.setText(f"折叠调用栈文件: {result['collapsed_file'] or '写入失败'}")
+            functions = result['top_functions']
+            self.profile_table.setRowCount(len(functions))
+            for i, function in enumerate(functions):
+                self.profile_table.setItem(i, 0, QTableWidgetItem(function['function']))
+                self.profile_table.setItem(i, 1, QTableWidgetItem(str(function['calls'])))
+                self.profile_table.setItem(i, 2, QTableWidgetItem(f"{function['self_seconds']:.3f}"))
+                self.profile_table.setItem(i, 3, QTableWidgetItem(f"{function['cumulative_seconds']:.3f}"))
+        except Exception as e:
+            print(f"更新性能分析结果失败: {e}")
+    
     def update_health_report(self):
         """更新系统健康报告"""
         try:
@@ -347,4 +548,8 @@ class SystemMonitorDialog(QDialog):
     def closeEvent(self, event):
         """关闭事件"""
         self.performance_timer.stop()
+        self.profile_timer.stop()
+        # 关闭窗口后没有定时器检查到期时间，结束正在进行的分析（结果仍写入折叠调用栈文件）
+        if self.system_monitor.profiler.running:
+            self.system_monitor.stop_profiling()
         event.accept() 
\ No newline at end of file
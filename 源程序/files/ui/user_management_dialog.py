@@ -11,8 +11,9 @@ class UserManagementDialog(QDialog):
     """用户管理对话框"""
     user_updated = pyqtSignal()  # 用户信息更新信号
     
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, file_system=None):
         super().__init__(parent)
+        self.file_system = file_system
         self.users_file = "data/users.json"
         self.users = self.load_users()
         self.init_ui()
@@ -103,6 +104,9 @@ class UserManagementDialog(QDialog):
             os.makedirs(os.path.dirname(self.users_file), exist_ok=True)
             with open(self.users_file, 'w', encoding='utf-8') as f:
                 json.dump(users, f, ensure_ascii=False, indent=2)
+            # 让文件系统的用户缓存立即失效
+            if self.file_system:
+                self.file_system.user_registry.invalidate()
         except Exception as e:
             print(f"保存用户数据失败: {e}")
             
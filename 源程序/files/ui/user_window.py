@@ -18,7 +18,7 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QTreeWidgetItem, QLineEdit, QInputDialog, QDialog,
                              QTextEdit, QDialogButtonBox, QFormLayout,
                              QSizePolicy, QCheckBox, QFileDialog, QSpinBox,
-                             QGroupBox, QTabWidget)
+                             QGroupBox, QTabWidget, QApplication)
 from PyQt5.QtCore import Qt, QSize, QTimer
 from PyQt5.QtGui import QIcon, QFont
 
@@ -78,6 +78,10 @@ class UserWindow(QMainWindow):
         search_layout.addWidget(QLabel("搜索:"))
         search_layout.addWidget(self.search_edit)
         
+        # 勾选后按文件内容搜索（全文索引）
+        self.content_search_checkbox = QCheckBox("搜索内容")
+        search_layout.addWidget(self.content_search_checkbox)
+        
         self.search_button = QPushButton("搜索")
         self.search_button.clicked.connect(self.search_files)
         search_layout.addWidget(self.search_button)
@@ -191,7 +195,7 @@ class UserWindow(QMainWindow):
         self.tree_widget.clear()
         
         # 获取/home目录下的所有子目录
-        home_node = self.file_system._get_node_by_path("/home")
+        home_node = self.file_system.get_directory_tree("/home")
         if not home_node:
             return
             
@@ -514,6 +518,11 @@ class UserWindow(QMainWindow):
         self.monitor_dialog = SystemMonitorDialog(self.file_system, self.file_system.system_monitor, self)
         self.monitor_dialog.show()
 
+    def closeEvent(self, event):
+        """关闭窗口前写出尚未保存的修改"""
+        self.file_system.flush()
+        event.accept()
+
     def show_about(self):
         """显示关于对话框"""
         QMessageBox.about(self, "关于", 
@@ -606,11 +615,17 @@ class UserWindow(QMainWindow):
         # 清空当前列表
         self.list_widget.clear()
         
-        # 递归搜索
-        results = self._search_recursive(self.current_path, search_text)
-        
-        # 显示搜索结果
+        # 使用索引搜索当前目录之下的项目（包括隐藏项目），边搜索边显示
+        content_search = self.content_search_checkbox.isChecked()
+        if content_search:
+            results = self.file_system.search_content(search_text, self.current_path, self.username)
+        else:
+            results = self.file_system.search_items(search_text, self.current_path, self.username)
+        result_count = 0
         for item_data in results:
+            result_count += 1
+            if result_count % 200 == 0:
+                QApplication.processEvents()
             # 构建显示名称：文件名 + 修改时间 + 大小（仅文件）
             display_name = item_data['name']
             
@@ -631,36 +646,16 @@ class UserWindow(QMainWindow):
             list_item.setData(Qt.UserRole, item_data)
             list_item.setIcon(self.icon_provider.get(item_data['type'], self.icon_provider['unknown']))
             
-            # 高亮显示匹配的文件
-            if search_text.lower() in item_data['name'].lower():
+            # 高亮显示匹配的文件（按内容搜索时结果均为匹配项）
+            if content_search or search_text.lower() in item_data['name'].lower():
                 font = list_item.font()
                 font.setBold(True)
                 list_item.setFont(font)
             
             self.list_widget.addItem(list_item)
         
-        self.statusBar().showMessage(f"搜索结果：共找到 {len(results)} 项")
-        
-    def _search_recursive(self, path, search_text):
-        """递归搜索文件和文件夹"""
-        results = []
-        content = self.file_system.get_directory_content(path, self.username, True)  # 显示隐藏文件
+        self.statusBar().showMessage(f"搜索结果：共找到 {result_count} 项")
         
-        if not content:
-            return results
-            
-        for item in content:
-            # 检查当前项是否匹配
-            if search_text.lower() in item['name'].lower():
-                results.append(item)
-            
-            # 如果是目录，递归搜索
-            if item['type'] == 'dir':
-                sub_results = self._search_recursive(item['path'], search_text)
-                results.extend(sub_results)
-        
-        return results
-
     def sort_items(self, sort_key, sort_order='asc'):
         """排序功能"""
         self.current_sort_key = sort_key
@@ -935,6 +930,8 @@ class FolderPropertiesDialog(QDialog):
         
         folder_count, file_count = self.get_contents_count(self.folder_data)
         form_layout.addRow("包含:", QLabel(f"{file_count} 个文件, {folder_count} 个文件夹"))
+        usage = self.file_system.get_directory_usage(self.folder_data['path'])
+        form_layout.addRow("大小:", QLabel(f"{usage['size'] if usage else 0} 字节"))
         
         form_layout.addRow("创建时间:", QLabel(self.folder_data.get('created', '')))
         form_layout.addRow("修改时间:", QLabel(self.folder_data.get('modified', '')))
@@ -965,16 +962,11 @@ class FolderPropertiesDialog(QDialog):
         self.accept()
 
     def get_contents_count(self, node):
-        f_count, d_count = 0, 0
-        for child in node.get('children', []):
-            if child['type'] == 'dir':
-                d_count += 1
-                sub_d, sub_f = self.get_contents_count(child)
-                d_count += sub_d
-                f_count += sub_f
-            else:
-                f_count += 1
-        return d_count, f_count
+        """整棵子树中的目录数和文件数（读取文件系统维护的目录汇总，无需遍历）"""
+        usage = self.file_system.get_directory_usage(node['path'])
+        if usage is None:
+            return 0, 0
+        return usage['dirs'], usage['files']
 
 
 class FilePreviewDialog(QDialog):